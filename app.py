@@ -1,94 +1,110 @@
 # app.py
 
 import os
+import logging
 from flask import Flask, request, jsonify, g
 from flask_cors import CORS
-from firebase_admin import credentials, auth, initialize_app
 from functools import wraps
-from sqlalchemy.orm import Session
+from typing import TYPE_CHECKING
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
-import json # ¡IMPORTANTE! Necesario para trabajar con JSON
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
 
 
 # Importar de database.py
-from database import get_db, create_all_tables, Product # Asegúrate de que Product esté definido en database.py
+from database import create_all_tables # Product y SessionLocal (orm.py) se importan en el primer uso
+
+# Blueprints de la API (/api/productos, /api/planes, /api/clases) y metricas internas
+from routes.producto_routes import productos_bp
+from routes.plan_routes import planes_bp
+from routes.clase_routes import clases_bp
+from routes.metricas_routes import metricas_bp
+from routes.autocompletado_routes import autocompletado_bp
+from routes.suscripcion_routes import suscripciones_bp
+from routes.checkin_routes import checkin_bp
+# Verificación con cache de tokens ya verificados; Firebase Admin SDK se inicializa solo si hace falta
+from routes.auth_middleware import verificar_token, AutenticacionNoDisponible, FIREBASE_VERIFICACION_LOCAL
+from routes.claves_firma import almacen_claves
+from cache import incrementar_version
+from indice_productos import indice_productos # Indice de /api/productos/search
+from auditoria import registrar_auditoria # Quien escribio cada producto (se inserta en lotes)
+from routes.etag_middleware import con_etag
+from utils import CAMPOS_PRODUCTO, usa_paginacion, parsear_parametros_paginacion
+from proveedor_json import ProveedorJSONRapido
+from registro import configurar_logging
+
+# Logging con cola y escritura en un hilo de fondo (nivel con LOG_LEVEL; ver registro.py)
+configurar_logging()
+logger = logging.getLogger(__name__)
 
 
 # --- Configuración de Flask ---
 app = Flask(__name__)
+# JSON con orjson (si esta instalado) que codifica Decimal, fechas y horas sin conversiones en los handlers
+app.json = ProveedorJSONRapido(app)
 # CORS: Asegúrate de que las URLs de origen sean correctas.
 # "http://localhost:4200" para desarrollo local de Angular.
 # "https://reactives.netlify.app" para tu frontend desplegado en Netlify.
-CORS(app, resources={r"/*": {"origins": ["http://localhost:4200", "https://reactives.netlify.app"]}})
-
-# --- Inicialización de Firebase Admin SDK con Variables de Entorno y Fallback Local ---
-firebase_initialized = False # Bandera para verificar si Firebase se ha inicializado con éxito
-
-try:
-    # 1. Intenta leer el contenido JSON de las credenciales de Firebase desde una variable de entorno
-    #    (Esto es para entornos de despliegue como Render, donde configurarás FIREBASE_CREDENTIALS_JSON).
-    firebase_credentials_json_str = os.getenv("FIREBASE_CREDENTIALS_JSON")
-
-    if firebase_credentials_json_str:
-        cred_dict = json.loads(firebase_credentials_json_str)
-        cred = credentials.Certificate(cred_dict)
-        initialize_app(cred)
-        firebase_initialized = True
-        print("Firebase Admin SDK inicializado exitosamente desde variables de entorno.")
-    elif app.debug and os.path.exists('firebase_credentials.json'):
-        # 2. Si la variable de entorno NO está configurada, PERO estamos en modo debug Y
-        #    el archivo 'firebase_credentials.json' existe localmente, úsalo.
-        #    (Esto es para facilitar el desarrollo local sin necesidad de variables de entorno).
-        cred = credentials.Certificate('firebase_credentials.json')
-        initialize_app(cred)
-        firebase_initialized = True
-        print("Firebase Admin SDK inicializado exitosamente desde archivo local (modo debug).")
-    else:
-        # 3. Si no se encuentra en ninguno de los dos casos, Firebase no se inicializará.
-        print("Advertencia: No se encontraron credenciales para Firebase Admin SDK.")
-        print("Firebase Admin SDK no se inicializará. Las funciones de autenticación de Firebase fallarán.")
-        print("Asegúrate de configurar 'FIREBASE_CREDENTIALS_JSON' en tu entorno de despliegue (Render) o")
-        print("de tener 'firebase_credentials.json' en la raíz de tu proyecto para desarrollo local (con debug=True).")
-
-except Exception as e:
-    print(f"ERROR al inicializar Firebase Admin SDK: {e}")
-    print("Asegúrate de que 'FIREBASE_CREDENTIALS_JSON' esté bien formado (JSON válido) en las variables de entorno,")
-    print("o que el archivo 'firebase_credentials.json' no esté corrupto en desarrollo local.")
-
-
-# --- Middleware para manejar la sesión de DB por cada solicitud ---
-@app.before_request
-def before_request():
-    # Abre una nueva sesión de DB para cada solicitud y la guarda en `g`
-    g.db = next(get_db())
-
-@app.after_request
-def after_request(response):
-    # Cierra la sesión de DB después de cada solicitud
-    if hasattr(g, 'db'):
-        g.db.close()
-    return response
+ORIGENES_CORS = ["http://localhost:4200", "https://reactives.netlify.app"] # Tambien los usa asgi.py
+CORS(app, resources={r"/*": {"origins": ORIGENES_CORS}})
+
+# --- Registro de Blueprints ---
+app.register_blueprint(productos_bp)
+app.register_blueprint(planes_bp)
+app.register_blueprint(clases_bp)
+app.register_blueprint(autocompletado_bp)
+app.register_blueprint(suscripciones_bp)
+app.register_blueprint(checkin_bp)
+# Metricas internas (/api/metricas): solo si se habilitan explicitamente, y siempre con token
+if os.getenv("METRICAS_HABILITADAS", "0").lower() in ("1", "true", "si"):
+    app.register_blueprint(metricas_bp)
+
+# Certificados de firma de Firebase: la descarga arranca con la app (flask run, gunicorn, asgi) en un
+# hilo de fondo, para que ninguna solicitud la espere (ver routes/claves_firma.py)
+if FIREBASE_VERIFICACION_LOCAL:
+    almacen_claves.iniciar()
+
+# --- Sesión de DB por solicitud, creada solo cuando una ruta la usa ---
+# Las preflight OPTIONS, "/", "/health" y las rutas de los blueprints (que usan sus propias
+# conexiones del engine) nunca crean una sesión.
+def obtener_sesion_db() -> "Session":
+    """Devuelve la sesión de DB de la solicitud actual, creándola en el primer uso."""
+    if 'db' not in g:
+        from orm import SessionLocal
+        g.db = SessionLocal()
+    return g.db
+
+@app.teardown_appcontext
+def cerrar_sesion_db(exception=None):
+    # Cierra la sesión de DB al terminar la solicitud, solo si se llegó a crear
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
 
 
 # --- Decorador para proteger rutas con token de Firebase ---
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        # Asegúrate de que Firebase se haya inicializado antes de intentar verificar el token
-        if not firebase_initialized:
-            print("DEBUG: Intento de usar token_required sin Firebase inicializado. Respondiendo 503.")
-            return jsonify({'message': 'Servicio de autenticación no disponible'}), 503
+        # Las preflight CORS no llevan token: se dejan pasar sin verificar nada
+        if request.method == 'OPTIONS':
+            return f(*args, **kwargs)
 
         if 'Authorization' not in request.headers:
             return jsonify({'message': 'Token de autorización es requerido'}), 401
 
         token = request.headers['Authorization'].split(' ')[1]
         try:
-            # Verifica el token de Firebase usando Firebase Admin SDK
-            decoded_token = auth.verify_id_token(token)
+            # Cache de tokens ya verificados, luego verificación local de la firma; Firebase Admin SDK
+            # solo se inicializa si hace falta (sin FIREBASE_PROJECT_ID o con FIREBASE_VERIFICACION_LOCAL=0)
+            decoded_token = verificar_token(token)
             request.user_id = decoded_token['uid']
             request.user_email = decoded_token.get('email')
+        except AutenticacionNoDisponible:
+            logger.debug("Intento de usar token_required sin Firebase inicializado. Respondiendo 503.")
+            return jsonify({'message': 'Servicio de autenticación no disponible'}), 503
         except Exception as e:
             return jsonify({'message': f'Token inválido o expirado: {e}'}), 401
         return f(*args, **kwargs)
@@ -102,14 +118,20 @@ def token_required(f):
 def home():
     return "¡Bienvenido a la API del gimnasio!"
 
+# Ruta de salud para el balanceador/monitor: no toca la DB ni requiere token
+@app.route("/health", methods=["GET"])
+def health():
+    return jsonify({"status": "ok"}), 200
+
 # Ruta de Login
 @app.route("/login", methods=["POST", "OPTIONS"])
 def login():
-    print(f"DEBUG: Solicitud recibida en /login. Método: {request.method}")
-    print(f"DEBUG: Headers de la solicitud: {request.headers}")
+    # Solo en DEBUG: con LOG_LEVEL=INFO no se formatean los headers ni el token
+    logger.debug("Solicitud recibida en /login. Método: %s", request.method)
+    logger.debug("Headers de la solicitud: %s", request.headers)
 
     if request.method == 'OPTIONS':
-        print("DEBUG: Manejando solicitud OPTIONS (preflight CORS).")
+        logger.debug("Manejando solicitud OPTIONS (preflight CORS).")
         response = jsonify({"message": "CORS preflight OK"})
         # Las cabeceras CORS son gestionadas por Flask-CORS configurado arriba,
         # pero es bueno asegurarse para las preflight.
@@ -118,47 +140,46 @@ def login():
         response.headers.add("Access-Control-Allow-Methods", "POST")
         return response
 
-    # Asegúrate de que Firebase se haya inicializado antes de intentar el login
-    if not firebase_initialized:
-        print("DEBUG: Intento de login sin Firebase inicializado. Respondiendo 503.")
-        return jsonify({'message': 'Servicio de autenticación no disponible'}), 503
-
     if request.method == 'POST':
-        print("DEBUG: Manejando solicitud POST.")
+        logger.debug("Manejando solicitud POST.")
         try:
             data = request.get_json()
             if data is None:
-                print("DEBUG: Request body is not JSON or is empty.")
+                logger.debug("Request body is not JSON or is empty.")
                 return jsonify({"error": "Contenido de la solicitud no es JSON válido o está vacío"}), 400
 
             # Es crucial que el frontend envíe el idToken que obtiene de Firebase Authentication
             id_token = data.get('idToken') # <-- Se espera un campo 'idToken'
-            print(f"DEBUG: idToken recibido: {id_token[:30]}..." if id_token else "DEBUG: No se recibió idToken.")
+            if id_token and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("idToken recibido: %s...", id_token[:30])
 
             if not id_token:
-                print("DEBUG: idToken no proporcionado en la solicitud.")
+                logger.debug("idToken no proporcionado en la solicitud.")
                 return jsonify({"error": "idToken es requerido"}), 400
 
-            # Verificar el token de Firebase usando Firebase Admin SDK
-            decoded_token = auth.verify_id_token(id_token)
+            # Verificar el token de Firebase usando Firebase Admin SDK (con cache de tokens ya verificados)
+            decoded_token = verificar_token(id_token)
             uid = decoded_token['uid']
             email = decoded_token.get('email', 'No disponible')
 
-            print(f"DEBUG: Token de Firebase verificado con éxito para UID: {uid}, Email: {email}.")
+            logger.debug("Token de Firebase verificado con éxito para UID: %s, Email: %s.", uid, email)
             return jsonify({
                 "message": "Autenticación exitosa",
                 "uid": uid,
                 "email": email
             }), 200
 
+        except AutenticacionNoDisponible:
+            logger.debug("Intento de login sin Firebase inicializado. Respondiendo 503.")
+            return jsonify({'message': 'Servicio de autenticación no disponible'}), 503
         except ValueError as ve:
-            print(f"ERROR: Error de formato JSON: {ve}")
+            logger.debug("Error de formato JSON: %s", ve)
             return jsonify({"error": f"Formato de datos inválido: {ve}"}), 400
         except Exception as e:
-            print(f"ERROR: Error en la verificación del token de Firebase: {e}")
+            logger.debug("Error en la verificación del token de Firebase: %s", e)
             return jsonify({"error": f"Error de autenticación: {e}"}), 401
     else:
-        print(f"DEBUG: Método {request.method} no permitido explícitamente en /login.")
+        logger.debug("Método %s no permitido explícitamente en /login.", request.method)
         return jsonify({"error": "Método no permitido"}), 405
 
 
@@ -168,16 +189,45 @@ def login():
 
 @app.route("/productos", methods=["GET"])
 #@token_required
+@con_etag("productos") # Responde 304 si el cliente ya tiene la version actual
 def get_productos():
+    # Paginacion por cursor opcional: ?limit=&after_id=&fields=&precio_min=&precio_max=&en_stock=
+    if usa_paginacion(request.args):
+        try:
+            parametros = parsear_parametros_paginacion(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        parametros = None
+
     try:
-        db: Session = g.db
-        productos = db.query(Product).all()
-        return jsonify([p.to_dict() for p in productos]), 200
+        db: Session = obtener_sesion_db()
+        from orm import Product # sqlalchemy.orm se importa recien aqui
+        if parametros is None:
+            productos = db.query(Product).all()
+            return jsonify([p.to_dict() for p in productos]), 200
+
+        # Los filtros y el LIMIT se resuelven en SQL; solo se cargan limite + 1 filas
+        campos = ["id_producto"] + [c for c in (parametros["campos"] or CAMPOS_PRODUCTO) if c != "id_producto"]
+        consulta = db.query(*[getattr(Product, c) for c in campos])
+        if parametros["despues_de_id"] is not None:
+            consulta = consulta.filter(Product.id_producto > parametros["despues_de_id"])
+        if parametros["precio_min"] is not None:
+            consulta = consulta.filter(Product.precio >= parametros["precio_min"])
+        if parametros["precio_max"] is not None:
+            consulta = consulta.filter(Product.precio <= parametros["precio_max"])
+        if parametros["solo_con_stock"]:
+            consulta = consulta.filter(Product.stock > 0)
+        filas = consulta.order_by(Product.id_producto).limit(parametros["limite"] + 1).all()
+
+        items = [dict(zip(campos, fila)) for fila in filas[:parametros["limite"]]]
+        siguiente = items[-1]["id_producto"] if len(filas) > parametros["limite"] else None
+        return jsonify({"items": items, "next": siguiente}), 200
     except SQLAlchemyError as e:
-        print(f"ERROR: Error de SQLAlchemy al obtener productos: {e}")
+        logger.error(f"Error de SQLAlchemy al obtener productos: {e}")
         return jsonify({"error": "Error interno del servidor al cargar productos desde la DB"}), 500
     except Exception as e:
-        print(f"ERROR: Error inesperado al obtener productos: {e}")
+        logger.error(f"Error inesperado al obtener productos: {e}")
         return jsonify({"error": "Error inesperado al cargar productos"}), 500
 
 @app.route("/productos", methods=["POST"])
@@ -197,7 +247,8 @@ def add_producto():
         return jsonify({"error": "Faltan datos obligatorios: nombre, precio, stock"}), 400
 
     try:
-        db: Session = g.db
+        db: Session = obtener_sesion_db()
+        from orm import Product # sqlalchemy.orm se importa recien aqui
         new_product = Product(
             nombre=nombre,
             descripcion=descripcion,
@@ -207,7 +258,10 @@ def add_producto():
         )
         db.add(new_product)
         db.commit()
+        incrementar_version("productos") # Invalida el cache de lecturas de productos
         db.refresh(new_product)
+        indice_productos.actualizar_producto(new_product.to_dict())
+        registrar_auditoria("producto", "crear", new_product.id_producto, new_product.to_dict())
 
         return jsonify({
             "message": "Producto añadido con éxito",
@@ -215,10 +269,10 @@ def add_producto():
         }), 201
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"ERROR: Error de SQLAlchemy al añadir producto: {e}")
+        logger.error(f"Error de SQLAlchemy al añadir producto: {e}")
         return jsonify({"error": "Error interno del servidor al añadir producto"}), 500
     except Exception as e:
-        print(f"ERROR: Error inesperado al añadir producto: {e}")
+        logger.error(f"Error inesperado al añadir producto: {e}")
         return jsonify({"error": "Error inesperado al añadir producto"}), 500
 
 @app.route("/productos/<int:product_id>", methods=["PUT"])
@@ -229,7 +283,8 @@ def update_producto(product_id):
         return jsonify({"error": "Datos de actualización son requeridos"}), 400
 
     try:
-        db: Session = g.db
+        db: Session = obtener_sesion_db()
+        from orm import Product # sqlalchemy.orm se importa recien aqui
         product_to_update = db.query(Product).filter_by(id_producto=product_id).first()
 
         if not product_to_update:
@@ -240,22 +295,26 @@ def update_producto(product_id):
                 setattr(product_to_update, key, value)
 
         db.commit()
+        incrementar_version("productos")
         db.refresh(product_to_update)
+        indice_productos.actualizar_producto(product_to_update.to_dict())
+        registrar_auditoria("producto", "actualizar", product_id, data)
 
         return jsonify({"message": "Producto actualizado con éxito", "producto": product_to_update.to_dict()}), 200
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"ERROR: Error de SQLAlchemy al actualizar producto: {e}")
+        logger.error(f"Error de SQLAlchemy al actualizar producto: {e}")
         return jsonify({"error": "Error interno del servidor al actualizar producto"}), 500
     except Exception as e:
-        print(f"ERROR: Error inesperado al actualizar producto: {e}")
+        logger.error(f"Error inesperado al actualizar producto: {e}")
         return jsonify({"error": "Error inesperado al actualizar producto"}), 500
 
 @app.route("/productos/<int:product_id>", methods=["DELETE"])
 #@token_required
 def delete_producto(product_id):
     try:
-        db: Session = g.db
+        db: Session = obtener_sesion_db()
+        from orm import Product # sqlalchemy.orm se importa recien aqui
         product_to_delete = db.query(Product).filter_by(id_producto=product_id).first()
 
         if not product_to_delete:
@@ -263,30 +322,35 @@ def delete_producto(product_id):
 
         db.delete(product_to_delete)
         db.commit()
+        incrementar_version("productos")
+        indice_productos.eliminar_producto(product_id)
+        registrar_auditoria("producto", "eliminar", product_id)
 
         return jsonify({"message": "Producto eliminado con éxito"}), 200
     except SQLAlchemyError as e:
         db.rollback()
-        print(f"ERROR: Error de SQLAlchemy al eliminar producto: {e}")
+        logger.error(f"Error de SQLAlchemy al eliminar producto: {e}")
         return jsonify({"error": "Error interno del servidor al eliminar producto"}), 500
     except Exception as e:
-        print(f"ERROR: Error inesperado al eliminar producto: {e}")
+        logger.error(f"Error inesperado al eliminar producto: {e}")
         return jsonify({"error": "Error inesperado al eliminar producto"}), 500
 
 @app.route("/productos/<int:product_id>", methods=["GET"])
 #@token_required
+@con_etag("productos")
 def get_producto_by_id(product_id):
     try:
-        db: Session = g.db
+        db: Session = obtener_sesion_db()
+        from orm import Product # sqlalchemy.orm se importa recien aqui
         producto = db.query(Product).filter_by(id_producto=product_id).first()
         if producto:
             return jsonify(producto.to_dict()), 200
         return jsonify({"error": "Producto no encontrado"}), 404
     except SQLAlchemyError as e:
-        print(f"ERROR: Error de SQLAlchemy al obtener producto por ID: {e}")
+        logger.error(f"Error de SQLAlchemy al obtener producto por ID: {e}")
         return jsonify({"error": "Error interno del servidor al obtener producto por ID"}), 500
     except Exception as e:
-        print(f"ERROR: Error inesperado al obtener producto por ID: {e}")
+        logger.error(f"Error inesperado al obtener producto por ID: {e}")
         return jsonify({"error": "Error inesperado al obtener producto por ID"}), 500
 
 
@@ -0,0 +1,151 @@
+# asgi.py
+
+import logging
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from app import app as app_flask, ORIGENES_CORS
+from database_async import engine_async
+from handlers.lectura_async_handlers import obtener_todos_async, obtener_por_id_async, obtener_por_ids_async
+from proveedor_json import a_json_bytes
+from routes.auth_middleware import verificar_token, AutenticacionNoDisponible
+from routes.etag_middleware import calcular_etag
+from utils import parsear_ids
+
+logger = logging.getLogger(__name__)
+
+# --- Punto de entrada ASGI opcional ---
+# Con gunicorn (app:app) cada worker sincrono atiende una solicitud a la vez y queda bloqueado
+# durante toda la ida y vuelta a MySQL. Aqui las lecturas de /api/productos, /api/planes y
+# /api/clases (listado, por id y /batch) se atienden con handlers async sobre aiomysql
+# (database_async.py): un solo proceso mantiene cientos de solicitudes esperando a la DB.
+# Todo lo demas (escrituras, paginacion, streaming, busqueda, horarios, reservas, metricas...)
+# lo sigue atendiendo la app Flask, montada debajo con un adaptador WSGI.
+#
+# Uso:  gunicorn asgi:app -k uvicorn.workers.UvicornWorker --preload --workers 2 --bind 0.0.0.0:$PORT
+#   (dependencias en requirements-asgi.txt; en desarrollo DATABASE_URL_ASYNC=sqlite+aiosqlite:///...)
+# Con --preload los workers salen de un fork del master y comparten las versiones de tabla (cache.py)
+# que validan el cache y los ETag. `uvicorn --workers N` arranca procesos nuevos que no las comparten:
+# cada uno solo ve sus propias escrituras hasta CACHE_TTL_SEGUNDOS y no reconoce los ETag de los demas.
+
+app_wsgi = WSGIMiddleware(app_flask)
+
+
+def _json(contenido, status_code: int = 200, headers: dict | None = None) -> Response:
+    return Response(a_json_bytes(contenido), status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _coincide_etag(encabezado: str | None, etag: str) -> bool:
+    if not encabezado:
+        return False
+    if encabezado.strip() == "*":
+        return True
+    return any(valor.strip().removeprefix("W/").strip('"') == etag for valor in encabezado.split(","))
+
+
+class LecturaAsync:
+    """
+    Endpoint ASGI de una lectura: mismo contrato que la ruta Flask (token, ETag/304, codigos de estado).
+    Si la solicitud trae parametros que solo entiende la ruta Flask (delegar_si), se la pasa a app_wsgi.
+    """
+
+    def __init__(self, tabla: str, manejador, requiere_token: bool, delegar_si=None):
+        self.tabla = tabla
+        self.manejador = manejador
+        self.requiere_token = requiere_token
+        self.delegar_si = delegar_si
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        if self.delegar_si is not None and self.delegar_si(request):
+            await app_wsgi(scope, receive, send)
+            return
+        respuesta = await self._responder(request)
+        await respuesta(scope, receive, send)
+
+    async def _verificar(self, request: Request):
+        """None si la solicitud puede seguir, o la respuesta 401/503 que daria token_required."""
+        auth_header = request.headers.get("Authorization", "")
+        token = auth_header.split(" ")[1] if auth_header.startswith("Bearer ") else None
+        if not token:
+            return _json({'message': 'Token de autenticación es requerido!'}, 401)
+        try:
+            # verificar_token puede descargar certificados o verificar la firma RS256: fuera del event loop
+            await run_in_threadpool(verificar_token, token)
+        except AutenticacionNoDisponible:
+            return _json({'message': 'Servicio de autenticación no disponible'}, 503)
+        except Exception as e:
+            logger.debug("Error al verificar el token de Firebase: %s", e)
+            return _json({'message': 'Token inválido o expirado!', 'error': str(e)}, 401)
+        return None
+
+    async def _responder(self, request: Request) -> Response:
+        if self.requiere_token:
+            rechazo = await self._verificar(request)
+            if rechazo is not None:
+                return rechazo
+
+        # Mismo ETag que con_etag: version compartida de la tabla, 304 sin llamar al handler
+        etag = calcular_etag(self.tabla)
+        encabezados = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+        if _coincide_etag(request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers=encabezados)
+
+        try:
+            resultado = await self.manejador(request)
+        except ValueError as e:
+            return _json({"error": str(e)}, 400)
+        if isinstance(resultado, dict) and "error" in resultado:
+            return _json(resultado, 500)
+        if isinstance(resultado, dict) and "message" in resultado:
+            return _json(resultado, 404)  # {"message": "... no encontrado."} de obtener_por_id_async
+        return _json(resultado, 200, encabezados)
+
+
+def _con_parametros(request: Request) -> bool:
+    # Paginacion, filtros, ?stream=1, ?desde=/?hasta=/?ahora=1: los resuelve la ruta Flask
+    return bool(request.query_params)
+
+
+def _lecturas(prefijo: str, tabla: str, requiere_token: bool) -> list:
+    async def todos(request):
+        return await obtener_todos_async(tabla)
+
+    async def por_id(request):
+        return await obtener_por_id_async(tabla, request.path_params["id_fila"])
+
+    async def por_ids(request):
+        return await obtener_por_ids_async(tabla, parsear_ids(request.query_params.get("ids")))
+
+    return [
+        Route(f"{prefijo}/", LecturaAsync(tabla, todos, requiere_token, _con_parametros), methods=["GET"]),
+        Route(f"{prefijo}/batch", LecturaAsync(tabla, por_ids, requiere_token), methods=["GET"]),
+        Route(f"{prefijo}/{{id_fila:int}}", LecturaAsync(tabla, por_id, requiere_token), methods=["GET"]),
+    ]
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(app):
+    yield
+    await engine_async.dispose()
+
+
+app = Starlette(
+    routes=[
+        # Mismas reglas de acceso que los blueprints: productos es publico, planes y clases con token
+        *_lecturas("/api/productos", "productos", requiere_token=False),
+        *_lecturas("/api/planes", "planes", requiere_token=True),
+        *_lecturas("/api/clases", "clases", requiere_token=True),
+        Mount("/", app=app_wsgi),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=ORIGENES_CORS, allow_methods=["*"], allow_headers=["*"])],
+    lifespan=_ciclo_de_vida,
+)
@@ -0,0 +1,53 @@
+# auditoria.py
+
+import logging
+import os
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import text
+
+from escritura_diferida import BufferEscritura
+from proveedor_json import a_json_bytes
+
+logger = logging.getLogger(__name__)
+
+# --- Auditoria de escrituras del catalogo ---
+# Los handlers de escritura llaman a registrar_auditoria() despues del commit. La fila (con el UID que
+# token_required dejo en request.user_id) va a un buffer de escritura diferida y se inserta en la tabla
+# auditoria en lotes, asi el registro no suma un INSERT a la latencia de cada escritura.
+# Contrapresion: si la DB se atrasa y la cola se llena, la solicitud espera hasta
+# AUDITORIA_ESPERA_SI_LLENO segundos antes de descartar (y contar) el registro.
+AUDITORIA_MAXIMO_PENDIENTES = int(os.getenv("AUDITORIA_MAXIMO_PENDIENTES", "20000"))
+AUDITORIA_ESPERA_SI_LLENO = float(os.getenv("AUDITORIA_ESPERA_SI_LLENO", "0.5"))
+
+SQL_INSERTAR_AUDITORIA = text(
+    "INSERT INTO auditoria (fecha_hora, id_usuario, entidad, id_entidad, accion, detalle) "
+    "VALUES (:fecha_hora, :id_usuario, :entidad, :id_entidad, :accion, :detalle)"
+)
+buffer_auditoria = BufferEscritura(
+    "auditoria", SQL_INSERTAR_AUDITORIA, tamano_lote=200, intervalo=2.0,
+    maximo_pendientes=AUDITORIA_MAXIMO_PENDIENTES, espera_si_lleno=AUDITORIA_ESPERA_SI_LLENO,
+)
+
+
+def _usuario_actual():
+    # Fuera de una solicitud (scripts, hilos de fondo) o en rutas sin token no hay usuario
+    if has_request_context():
+        return getattr(request, "user_id", None)
+    return None
+
+
+def registrar_auditoria(entidad: str, accion: str, id_entidad: int | None = None, detalle: dict | None = None):
+    """Encola un registro de auditoria. Nunca lanza: un fallo de auditoria no debe romper la escritura."""
+    try:
+        buffer_auditoria.agregar({
+            "fecha_hora": datetime.now().replace(microsecond=0),
+            "id_usuario": _usuario_actual(),
+            "entidad": entidad,
+            "id_entidad": id_entidad,
+            "accion": accion,
+            "detalle": a_json_bytes(detalle).decode("utf-8") if detalle is not None else None,
+        })
+    except Exception as e:
+        logger.warning(f"No se pudo registrar la auditoria de {accion} {entidad} {id_entidad}: {e}")
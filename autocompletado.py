@@ -0,0 +1,131 @@
+# autocompletado.py
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from operator import itemgetter
+
+from cache import obtener_version
+from utils import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+# --- Autocompletado de nombres (productos, planes y clases) ---
+# Por cada tipo, dos arreglos de tuplas (clave normalizada, id, nombre) ordenados por clave:
+#   - nombres: una entrada por nombre completo ("proteina whey andes"),
+#   - palabras: una entrada por cada palabra interior del nombre ("whey andes", "andes"),
+# asi "whe" encuentra "Proteína Whey Andes". Con bisect se ubica el primer candidato del prefijo y se
+# leen a lo sumo k entradas por arreglo: O(log n + k) sin tocar MySQL.
+# Se reconstruye en segundo plano cuando cambia la version de alguna de las tablas (compartida por
+# todos los workers, ver cache.py) o cada AUTOCOMPLETADO_TTL segundos (escrituras fuera de la app).
+AUTOCOMPLETADO_TTL = int(os.getenv("AUTOCOMPLETADO_TTL", "60"))
+TABLAS = ("productos", "planes", "clases")
+_clave = itemgetter(0)
+
+
+class IndiceAutocompletado:
+    """Arreglos ordenados de nombres normalizados para buscar por prefijo con bisect."""
+
+    def __init__(self):
+        self._arreglos = {}  # tipo -> (nombres, palabras); el dict se reemplaza entero al reconstruir
+        self._versiones = None
+        self._construido_en = None
+        self._reconstruyendo = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _arreglos_de(registros, campo_id: str) -> tuple:
+        nombres, palabras = [], []
+        for registro in registros:
+            nombre = registro.get("nombre")
+            clave = " ".join(normalizar_texto(nombre).split())
+            if not clave:
+                continue
+            entrada_id = registro.get(campo_id)
+            nombres.append((clave, entrada_id, nombre))
+            posicion = clave.find(" ")
+            while posicion != -1:
+                palabras.append((clave[posicion + 1:], entrada_id, nombre))
+                posicion = clave.find(" ", posicion + 1)
+        nombres.sort(key=_clave)
+        palabras.sort(key=_clave)
+        return nombres, palabras
+
+    def construir(self, fuentes: dict, versiones=None):
+        """fuentes: {tipo: (registros, campo_id)}. Arma los arreglos nuevos y reemplaza los actuales."""
+        self._arreglos = {tipo: self._arreglos_de(registros, campo_id) for tipo, (registros, campo_id) in fuentes.items()}
+        self._versiones = versiones
+        self._construido_en = time.monotonic()
+
+    def asegurar_actualizado(self, cargar_fuentes):
+        """
+        cargar_fuentes() devuelve {tipo: (registros, campo_id)}. La primera vez se construye en esta
+        solicitud; despues, si cambio alguna version o vencio el TTL, se reconstruye en un hilo aparte
+        y mientras tanto se sigue respondiendo con los arreglos anteriores.
+        """
+        versiones = tuple(obtener_version(tabla) for tabla in TABLAS)
+        if self._construido_en is None:
+            with self._lock:
+                if self._construido_en is None:
+                    self.construir(cargar_fuentes(), versiones)
+            return
+        vencido = time.monotonic() - self._construido_en >= AUTOCOMPLETADO_TTL
+        if (versiones != self._versiones or vencido) and not self._reconstruyendo:
+            with self._lock:
+                if self._reconstruyendo:
+                    return
+                self._reconstruyendo = True
+            threading.Thread(target=self._reconstruir, args=(cargar_fuentes, versiones), daemon=True).start()
+
+    def _reconstruir(self, cargar_fuentes, versiones):
+        try:
+            self.construir(cargar_fuentes(), versiones)
+        except Exception as e:
+            logger.warning(f"Error al reconstruir el indice de autocompletado: {e}")
+            self._construido_en = time.monotonic()  # se reintenta en el proximo TTL
+        finally:
+            self._reconstruyendo = False
+
+    def sugerir(self, prefijo: str, k: int = 10, tipos=None) -> list:
+        """
+        Hasta k sugerencias ordenadas por nombre: primero los nombres que empiezan con el prefijo y
+        despues los que tienen alguna palabra que empieza con el.
+        """
+        clave = " ".join(normalizar_texto(prefijo).split())
+        if not clave:
+            return []
+        candidatos = []
+        for tipo, arreglos in self._arreglos.items():
+            if tipos is not None and tipo not in tipos:
+                continue
+            for fase, arreglo in enumerate(arreglos):
+                # Solo hacen falta las primeras k entradas de cada arreglo que empiezan con el prefijo
+                posicion = bisect_left(arreglo, clave, key=_clave)
+                for entrada_clave, entrada_id, nombre in arreglo[posicion:posicion + k]:
+                    if not entrada_clave.startswith(clave):
+                        break
+                    candidatos.append((fase, entrada_clave, tipo, entrada_id, nombre))
+
+        candidatos.sort(key=lambda c: (c[0], c[1]))
+        vistas = set()
+        sugerencias = []
+        for _, _, tipo, entrada_id, nombre in candidatos:
+            if (tipo, entrada_id) in vistas:
+                continue
+            vistas.add((tipo, entrada_id))
+            sugerencias.append({"tipo": tipo, "id": entrada_id, "nombre": nombre})
+            if len(sugerencias) >= k:
+                break
+        return sugerencias
+
+    def estadisticas(self) -> dict:
+        return {
+            "construido": self._construido_en is not None,
+            "nombres": {tipo: len(arreglos[0]) for tipo, arreglos in self._arreglos.items()},
+            "antiguedad_s": round(time.monotonic() - self._construido_en, 1) if self._construido_en is not None else None,
+        }
+
+
+indice_autocompletado = IndiceAutocompletado()
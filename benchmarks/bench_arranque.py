@@ -0,0 +1,91 @@
+# benchmarks/bench_arranque.py
+#
+# Costo de arranque de un worker, medido en procesos nuevos (sin cache de modulos en memoria):
+#   - import app: mediana de REPETICIONES importaciones de app.py,
+#   - modulos diferidos: verifica que importar app no carga firebase_admin, google.auth,
+#     sqlalchemy.orm ni los drivers de MySQL, y que no crea el engine (todo eso ocurre en el primer uso),
+#   - primera respuesta: desde que se lanza gunicorn (un worker, sin gunicorn.conf.py) hasta el primer
+#     200 de /health.
+# Con [max_import_ms] el script termina con codigo 1 si la mediana de import app lo supera o si algun
+# modulo diferido se carga al importar, para detectar regresiones.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_arranque [repeticiones] [max_import_ms]
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.carga_http import puerto_libre
+
+REPETICIONES = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+MAX_IMPORT_MS = float(sys.argv[2]) if len(sys.argv) > 2 else None
+
+MODULOS_DIFERIDOS = ("firebase_admin", "google.auth", "sqlalchemy.orm", "mysql.connector", "pymysql", "orm")
+
+MEDIR_IMPORT = """
+import json, sys, time
+inicio = time.perf_counter()
+import app
+ms = (time.perf_counter() - inicio) * 1000
+import database
+print(json.dumps({"ms": ms, "engine_creado": database.engine_creado(),
+                  "cargados": [m for m in %r if m in sys.modules]}))
+""" % (MODULOS_DIFERIDOS,)
+
+
+def medir_import():
+    entorno = {**os.environ, "LOG_LEVEL": "ERROR"}
+    salida = subprocess.run([sys.executable, "-c", MEDIR_IMPORT], env=entorno, capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_primera_respuesta(configuracion_vacia):
+    puerto = puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", configuracion_vacia, "--bind", f"127.0.0.1:{puerto}", "app:app"],
+        env={**os.environ, "LOG_LEVEL": "ERROR"}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{puerto}/health", timeout=5).read()
+                return (time.perf_counter() - inicio) * 1000
+            except OSError:
+                if proceso.poll() is not None:
+                    raise RuntimeError("gunicorn termino antes de responder")
+                time.sleep(0.005)
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+if __name__ == "__main__":
+    resultados = [medir_import() for _ in range(REPETICIONES)]
+    mediana_import = statistics.median(r["ms"] for r in resultados)
+    cargados = sorted({m for r in resultados for m in r["cargados"]})
+    engine_creado = any(r["engine_creado"] for r in resultados)
+    print(f"import app          mediana {mediana_import:7.0f} ms   (min {min(r['ms'] for r in resultados):.0f}, "
+          f"max {max(r['ms'] for r in resultados):.0f})")
+    print(f"modulos diferidos   cargados al importar: {', '.join(cargados) or 'ninguno'}   engine creado: {engine_creado}")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        configuracion_vacia = os.path.join(directorio, "gunicorn_vacio.py")
+        open(configuracion_vacia, "w").close()
+        tiempos = [medir_primera_respuesta(configuracion_vacia) for _ in range(REPETICIONES)]
+    print(f"primera respuesta   mediana {statistics.median(tiempos):7.0f} ms   (gunicorn app:app, GET /health)")
+
+    if MAX_IMPORT_MS is not None:
+        fallas = []
+        if mediana_import > MAX_IMPORT_MS:
+            fallas.append(f"import app tarda {mediana_import:.0f} ms (maximo {MAX_IMPORT_MS:.0f} ms)")
+        if cargados or engine_creado:
+            fallas.append("importar app carga modulos o crea el engine que deberian ser diferidos")
+        for falla in fallas:
+            print(f"REGRESION: {falla}")
+        sys.exit(1 if fallas else 0)
@@ -0,0 +1,50 @@
+# benchmarks/bench_asgi_vs_wsgi.py
+#
+# Prueba de carga: CLIENTES clientes concurrentes piden /api/productos/batch?ids=... (una consulta
+# IN por solicitud, sin cache) durante SEGUNDOS segundos contra:
+#   - gunicorn app:app con workers sincronos (lo que arrancaba el Procfile),
+#   - uvicorn asgi:app (lecturas async sobre aiosqlite),
+# con el mismo numero de procesos y una latencia simulada de LATENCIA_MS por consulta (ver
+# servidor_latencia.py). Muestra solicitudes/s, latencia p50/p99 y errores.
+#
+# Uso (desde la raiz del proyecto, con requirements-asgi.txt instalado):
+#   python -m benchmarks.bench_asgi_vs_wsgi [clientes] [segundos] [workers] [latencia_ms]
+
+import os
+import random
+import sys
+import tempfile
+
+from benchmarks.carga_http import PRODUCTOS, medir, preparar_db, puerto_libre
+
+CLIENTES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+SEGUNDOS = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+WORKERS = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+LATENCIA_MS = sys.argv[4] if len(sys.argv) > 4 else "20"
+
+
+def ruta_lote():
+    return "/api/productos/batch?ids=" + ",".join(str(random.randrange(1, PRODUCTOS + 1)) for _ in range(10))
+
+
+if __name__ == "__main__":
+    print(f"{CLIENTES} clientes, {SEGUNDOS:.0f} s, {WORKERS} procesos, latencia simulada {LATENCIA_MS} ms por consulta")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "catalogo.db")
+        preparar_db(ruta)
+        entorno = {"BENCH_DB": ruta, "BENCH_LATENCIA_MS": LATENCIA_MS}
+        # Configuracion vacia: sin ella gunicorn cargaria gunicorn.conf.py (gthread, preload...)
+        sin_configuracion = os.path.join(directorio, "gunicorn_vacio.py")
+        open(sin_configuracion, "w").close()
+
+        puerto = puerto_libre()
+        medir(f"gunicorn app:app (sync, {WORKERS} workers)", [
+            sys.executable, "-m", "gunicorn", "--config", sin_configuracion, "--bind", f"127.0.0.1:{puerto}",
+            "--workers", str(WORKERS), "--backlog", "2048", "benchmarks.servidor_latencia:app",
+        ], entorno, puerto, ruta_lote, CLIENTES, SEGUNDOS)
+
+        puerto = puerto_libre()
+        medir(f"uvicorn asgi:app ({WORKERS} workers)", [
+            sys.executable, "-m", "uvicorn", "--host", "127.0.0.1", "--port", str(puerto), "--workers", str(WORKERS),
+            "--no-access-log", "--log-level", "warning", "benchmarks.servidor_latencia:app_asgi",
+        ], entorno, puerto, ruta_lote, CLIENTES, SEGUNDOS)
@@ -0,0 +1,106 @@
+# benchmarks/bench_auditoria.py
+#
+# Costo de auditar EVENTOS escrituras sobre SQLite en archivo:
+#   - sincrono: un INSERT en su propia transaccion por evento (lo que sumaria a cada agregar/actualizar),
+#   - diferido: registrar_auditoria (buffer en memoria + INSERT por lotes en un hilo de fondo).
+# Ademas verifica:
+#   - contrapresion: con una cola de 50 filas y HILOS productores no se descarta nada, solo se espera,
+#   - vaciado al salir: un proceso hijo encola 1000 registros y termina enseguida; deben quedar todos en la tabla.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_auditoria [eventos] [hilos]
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, text
+
+import auditoria
+import database
+import escritura_diferida
+import modelos.auditoria
+
+MODO_HIJO = len(sys.argv) > 2 and sys.argv[1] == "--hijo"
+EVENTOS = int(sys.argv[1]) if len(sys.argv) > 1 and not MODO_HIJO else 5000
+HILOS = int(sys.argv[2]) if len(sys.argv) > 2 and not MODO_HIJO else 8
+
+
+def preparar_engine(ruta):
+    engine = create_engine(f"sqlite:///{ruta}", connect_args={"timeout": 60, "check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _configurar(dbapi_conn, registro):
+        dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    database.Base.metadata.create_all(engine, tables=[modelos.auditoria.RegistroAuditoria.__table__])
+    return engine
+
+
+def contar(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM auditoria")).scalar()
+
+
+def detalle(i):
+    return {"nombre": f"Producto {i}", "precio": "19.99", "stock": i % 100}
+
+
+def hijo(ruta):
+    # Proceso que audita y sale sin esperar: atexit debe vaciar el buffer
+    engine = preparar_engine(ruta)
+    escritura_diferida.engine = engine
+    for i in range(1000):
+        auditoria.registrar_auditoria("producto", "actualizar", i, detalle(i))
+
+
+if __name__ == "__main__":
+    if MODO_HIJO:
+        hijo(sys.argv[2])
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = preparar_engine(os.path.join(directorio, "auditoria.db"))
+        escritura_diferida.engine = engine
+
+        inicio = time.perf_counter()
+        for i in range(EVENTOS):
+            with engine.begin() as conn:
+                conn.execute(auditoria.SQL_INSERTAR_AUDITORIA, {
+                    "fecha_hora": datetime.now(), "id_usuario": "uid-admin", "entidad": "producto", "id_entidad": i,
+                    "accion": "actualizar", "detalle": json.dumps(detalle(i)),
+                })
+        sincrono = (time.perf_counter() - inicio) / EVENTOS
+        print(f"sincrono   {sincrono * 1e6:8.1f} us por escritura auditada")
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM auditoria"))
+        inicio = time.perf_counter()
+        for i in range(EVENTOS):
+            auditoria.registrar_auditoria("producto", "actualizar", i, detalle(i))
+        diferido = (time.perf_counter() - inicio) / EVENTOS
+        auditoria.buffer_auditoria.vaciar()
+        print(f"diferido   {diferido * 1e6:8.1f} us por escritura auditada   filas {contar(engine)}/{EVENTOS}   "
+              f"lotes {auditoria.buffer_auditoria.estadisticas()['lotes']}")
+
+        # Contrapresion: cola diminuta, productores en paralelo
+        chico = escritura_diferida.BufferEscritura("auditoria-chica", auditoria.SQL_INSERTAR_AUDITORIA, tamano_lote=50,
+                                                   intervalo=0.05, maximo_pendientes=50, espera_si_lleno=5.0)
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM auditoria"))
+        fila = {"fecha_hora": datetime.now(), "id_usuario": None, "entidad": "plan", "id_entidad": 1, "accion": "eliminar", "detalle": None}
+        with ThreadPoolExecutor(HILOS) as pool:
+            list(pool.map(lambda _: chico.agregar(fila), range(EVENTOS)))
+        chico.vaciar()
+        estadisticas = chico.estadisticas()
+        print(f"contrapresion  filas {contar(engine)}/{EVENTOS}   esperas {estadisticas['esperas']}   "
+              f"descartadas {estadisticas['descartadas']}")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "salida.db")
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_auditoria", "--hijo", ruta], check=True)
+        print(f"vaciado al salir  filas {contar(create_engine(f'sqlite:///{ruta}'))}/1000")
@@ -0,0 +1,63 @@
+# benchmarks/bench_autocompletado.py
+#
+# Autocompletado sobre el catalogo sintetico de bench_busqueda_productos (100k productos) mas planes
+# y clases: arreglos ordenados con bisect (indice_autocompletado) contra recorrer todos los nombres
+# normalizados con startswith, que es lo que haria un LIKE 'prefijo%' sin indice en cada tecla.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_autocompletado [productos] [consultas]
+
+import random
+import sys
+import time
+
+from autocompletado import IndiceAutocompletado
+from benchmarks.bench_busqueda_productos import generar_catalogo, medir
+from utils import normalizar_texto
+
+CONSULTAS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+PREFIJOS = ["p", "pr", "prot", "proteina", "cre", "guan", "manc", "ban", "col", "bot", "andes", "nand",
+            "titan", "fen", "yoga", "spin", "crossfit", "plan", "anual", "men", "choco", "z"]
+
+
+def generar_fuentes():
+    planes = [{"id_plan": i, "nombre": f"Plan {nombre}"} for i, nombre in
+              enumerate(["Mensual", "Trimestral", "Semestral", "Anual", "Estudiante", "Familiar", "Premium"], 1)]
+    clases = [{"id_clase": i, "nombre": f"{random.choice(['Yoga', 'Spinning', 'CrossFit', 'Pilates', 'Zumba', 'Box'])} "
+                                        f"{random.choice(['inicial', 'intermedio', 'avanzado'])} {i}"}
+              for i in range(1, 201)]
+    return {
+        "producto": (list(generar_catalogo()), "id_producto"),
+        "plan": (planes, "id_plan"),
+        "clase": (clases, "id_clase"),
+    }
+
+
+def recorrido_lineal(nombres, prefijo, k=10):
+    clave = normalizar_texto(prefijo)
+    resultado = []
+    for tipo, entrada_id, normalizado, nombre in nombres:
+        if normalizado.startswith(clave) or f" {clave}" in normalizado:
+            resultado.append({"tipo": tipo, "id": entrada_id, "nombre": nombre})
+    resultado.sort(key=lambda s: normalizar_texto(s["nombre"]))
+    return resultado[:k]
+
+
+if __name__ == "__main__":
+    fuentes = generar_fuentes()
+    indice = IndiceAutocompletado()
+    inicio = time.perf_counter()
+    indice.construir(fuentes)
+    print(f"construccion: {(time.perf_counter() - inicio) * 1000:.0f} ms   {indice.estadisticas()['nombres']}")
+
+    consultas = [random.choice(PREFIJOS) for _ in range(CONSULTAS)]
+    p50, p95, maximo = medir(lambda q: indice.sugerir(q, 10), consultas)
+    print(f"bisect        p50 {p50 * 1000:7.1f} us   p95 {p95 * 1000:7.1f} us   max {maximo * 1000:7.1f} us")
+    p50, p95, maximo = medir(lambda q: indice.sugerir(q, 10, {"plan", "clase"}), consultas)
+    print(f"bisect tipos  p50 {p50 * 1000:7.1f} us   p95 {p95 * 1000:7.1f} us   max {maximo * 1000:7.1f} us")
+
+    nombres = [(tipo, registro[campo_id], normalizar_texto(registro["nombre"]), registro["nombre"])
+               for tipo, (registros, campo_id) in fuentes.items() for registro in registros]
+    p50, p95, maximo = medir(lambda q: recorrido_lineal(nombres, q), consultas[:20])
+    print(f"lineal        p50 {p50 * 1000:7.1f} us   p95 {p95 * 1000:7.1f} us   max {maximo * 1000:7.1f} us   (20 consultas)")
+    for prefijo in ("prot", "yoga", "anu", "ñan"):
+        print(f"  '{prefijo}': {[s['nombre'] for s in indice.sugerir(prefijo, 3)]}")
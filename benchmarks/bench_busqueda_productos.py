@@ -0,0 +1,87 @@
+# benchmarks/bench_busqueda_productos.py
+#
+# Busqueda de productos sobre un catalogo sintetico de 100k productos (nombres y descripciones en
+# espanol, con tildes): indice invertido (indice_productos) contra el filtrado lineal que hacia el
+# frontend (normalizar y buscar cada palabra en cada producto). Tambien mide el costo de una
+# actualizacion incremental frente a reconstruir el indice completo.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_busqueda_productos [productos] [consultas]
+
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+from indice_productos import IndiceProductos
+from utils import normalizar_texto
+
+PRODUCTOS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+CONSULTAS = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+TIPOS = ["Proteína", "Creatina", "Guantes", "Mancuerna", "Banda elástica", "Colchoneta", "Botella", "Cinturón",
+         "Pre-entreno", "Barra energética", "Toalla", "Cuerda", "Rodillera", "Muñequera", "Shaker", "Pesa rusa"]
+MARCAS = ["Titán", "Fénix", "Cóndor", "Jaguar", "Puma", "Andes", "Volcán", "Ñandú", "Halcón", "Océano"]
+ATRIBUTOS = ["sabor chocolate", "sabor vainilla", "talla M", "talla L", "10 kg", "5 kg", "2 kg", "azul", "negro",
+             "sin azúcar", "edición limitada", "acero", "neopreno", "algodón", "1 litro", "500 g", "vegana"]
+PALABRAS_DESCRIPCION = ("ideal para entrenamiento de fuerza resistencia cardio funcional alta calidad "
+                        "durabilidad garantía envío rápido recomendado por entrenadores gimnasio hogar").split()
+
+CONSULTAS_EJEMPLO = ["proteina", "proteína chocolate", "guantes talla m", "mancuerna 10", "nandu", "creatina vegana",
+                     "pesa rusa acero", "botella 1 litro azul", "cinturon", "banda elastica", "toal", "fenix shak"]
+
+
+def generar_catalogo():
+    random.seed(11)
+    for i in range(1, PRODUCTOS + 1):
+        nombre = f"{random.choice(TIPOS)} {random.choice(MARCAS)} {random.choice(ATRIBUTOS)} {i}"
+        descripcion = " ".join(random.sample(PALABRAS_DESCRIPCION, 8))
+        yield {"id_producto": i, "nombre": nombre, "descripcion": descripcion,
+               "precio": Decimal("19.99"), "stock": random.randrange(100), "imagen_url": None}
+
+
+def filtrado_lineal(catalogo, consulta, limite=20):
+    palabras = normalizar_texto(consulta).split()
+    resultado = []
+    for producto in catalogo:
+        texto = normalizar_texto(f"{producto['nombre']} {producto['descripcion']}")
+        if all(palabra in texto for palabra in palabras):
+            resultado.append(producto)
+            if len(resultado) >= limite:
+                break
+    return resultado
+
+
+def medir(funcion, consultas):
+    tiempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        funcion(consulta)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.95) - 1], tiempos[-1]
+
+
+if __name__ == "__main__":
+    catalogo = list(generar_catalogo())
+    indice = IndiceProductos()
+    inicio = time.perf_counter()
+    indice.construir(catalogo)
+    construccion = time.perf_counter() - inicio
+    print(f"{PRODUCTOS} productos, construccion del indice: {construccion * 1000:.0f} ms, "
+          f"{indice.estadisticas()['palabras']} palabras")
+
+    consultas = [random.choice(CONSULTAS_EJEMPLO) for _ in range(CONSULTAS)]
+    p50, p95, maximo = medir(lambda q: indice.buscar(q, 20), consultas)
+    print(f"indice        p50 {p50:7.3f} ms   p95 {p95:7.3f} ms   max {maximo:7.3f} ms")
+    p50, p95, maximo = medir(lambda q: filtrado_lineal(catalogo, q), consultas[:20])
+    print(f"lineal        p50 {p50:7.3f} ms   p95 {p95:7.3f} ms   max {maximo:7.3f} ms   (20 consultas)")
+    for consulta in ("proteina chocolate", "nandu", "toal"):
+        print(f"  '{consulta}': {[p['nombre'] for p in indice.buscar(consulta, 3)]}")
+
+    inicio = time.perf_counter()
+    for i in range(1, 1001):
+        indice.actualizar_producto({**catalogo[i], "nombre": f"Proteína Cóndor renovada {i}"})
+    incremental = (time.perf_counter() - inicio) / 1000
+    print(f"actualizacion incremental: {incremental * 1e6:.1f} us/producto   "
+          f"(reconstruir: {construccion * 1000:.0f} ms por escritura)")
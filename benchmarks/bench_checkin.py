@@ -0,0 +1,96 @@
+# benchmarks/bench_checkin.py
+#
+# Check-ins en la hora pico sobre SQLite en archivo con SOCIOS suscripciones (~10% vencidas):
+#   - directo: por cada pasada, SELECT de la suscripcion vigente + INSERT del check-in en su transaccion,
+#   - mapa + buffer: registrar_checkin (socios_activos en memoria + escritura_diferida por lotes).
+# Verifica que con el buffer se escriben todas las pasadas y que las decisiones coinciden.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_checkin [socios] [checkins] [hilos]
+
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, text
+
+import database
+import escritura_diferida
+import modelos.checkins
+import modelos.planes
+import modelos.suscripciones
+import socios_activos
+from handlers import checkin_handlers
+
+SOCIOS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+CHECKINS = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+HILOS = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+
+def preparar_engine(ruta):
+    engine = create_engine(f"sqlite:///{ruta}", pool_size=HILOS, connect_args={"timeout": 60, "check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _configurar(dbapi_conn, registro):
+        dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    database.Base.metadata.create_all(engine, tables=[
+        modelos.planes.Plan.__table__, modelos.suscripciones.Suscripcion.__table__, modelos.checkins.Checkin.__table__,
+    ])
+    ahora = datetime.now()
+    random.seed(3)
+    filas = [{"u": f"socio-{i}", "v": ahora + timedelta(days=random.randrange(-3, 27) if i % 10 == 0 else random.randrange(1, 30))}
+             for i in range(SOCIOS)]
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO planes (id_plan, nombre, duracion_dias) VALUES (1, 'Mensual', 30)"))
+        conn.execute(text(
+            "INSERT INTO suscripciones (id_usuario, id_plan, fecha_inicio, fecha_vencimiento, estado) "
+            "VALUES (:u, 1, :v, :v, 'activa')"
+        ), filas)
+    return engine
+
+
+def checkin_directo(engine, id_usuario):
+    ahora = datetime.now().replace(microsecond=0)
+    with engine.begin() as conn:
+        vence = conn.execute(socios_activos.SQL_VENCIMIENTO_SOCIO, {"p_id_usuario": id_usuario, "p_ahora": ahora}).scalar()
+        conn.execute(checkin_handlers.SQL_INSERTAR_CHECKINS, {"id_usuario": id_usuario, "fecha_hora": ahora, "permitido": vence is not None})
+    return vence is not None
+
+
+def medir(nombre, funcion, socios):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(HILOS) as pool:
+        resultados = list(pool.map(funcion, socios))
+    total = time.perf_counter() - inicio
+    print(f"{nombre:14s} {len(socios) / total:8.0f} check-ins/s   ({total * 1000:.0f} ms)")
+    return resultados
+
+
+if __name__ == "__main__":
+    socios = [f"socio-{random.randrange(SOCIOS)}" for _ in range(CHECKINS)]
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = preparar_engine(os.path.join(directorio, "checkin.db"))
+        directos = medir("directo", lambda u: checkin_directo(engine, u), socios)
+
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM checkins"))
+        socios_activos.engine = engine
+        escritura_diferida.engine = engine
+        inicio = time.perf_counter()
+        socios_activos.socios_activos.construir()
+        print(f"mapa de socios activos: {(time.perf_counter() - inicio) * 1000:.0f} ms, "
+              f"{socios_activos.socios_activos.estadisticas()['socios']} socios")
+        con_buffer = medir("mapa + buffer", lambda u: checkin_handlers.registrar_checkin(u).get("permitido"), socios)
+
+        inicio = time.perf_counter()
+        checkin_handlers.buffer_checkins.vaciar()
+        print(f"vaciado final del buffer: {(time.perf_counter() - inicio) * 1000:.0f} ms   "
+              f"{checkin_handlers.buffer_checkins.estadisticas()}")
+        with engine.connect() as conn:
+            filas = conn.execute(text("SELECT COUNT(*) FROM checkins")).scalar()
+        print(f"filas escritas {filas}/{CHECKINS}   decisiones iguales: {directos == con_buffer}   "
+              f"permitidos {sum(con_buffer)}")
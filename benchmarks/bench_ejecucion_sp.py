@@ -0,0 +1,81 @@
+# benchmarks/bench_ejecucion_sp.py
+#
+# Micro-benchmark de la capa de ejecucion de procedimientos (utils.ejecutar_sp) contra el patron
+# que repetian los handlers (text() nuevo en cada llamada, dict(zip()) + isinstance por fila).
+# Como SQLite no tiene CALL, el "procedimiento" se registra en el cache de sentencias con un SELECT.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_ejecucion_sp [llamadas] [filas]
+
+import sys
+import time
+from decimal import Decimal
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import database
+import utils
+
+LLAMADAS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+FILAS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+SELECT_SP = "SELECT id_producto, nombre, descripcion, precio, stock, imagen_url FROM productos"
+
+
+def preparar_engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE productos (id_producto INTEGER PRIMARY KEY, nombre VARCHAR(255), "
+            "descripcion VARCHAR(255), precio NUMERIC(10, 2), stock INTEGER, imagen_url VARCHAR(255))"
+        ))
+        conn.execute(
+            text("INSERT INTO productos (nombre, descripcion, precio, stock, imagen_url) "
+                 "VALUES (:nombre, 'descripcion', '19.99', 10, NULL)"),
+            [{"nombre": f"Producto {i}"} for i in range(FILAS)]
+        )
+    return engine
+
+
+def handler_original(engine):
+    """Copia del patron previo de obtener_todos_productos_sp."""
+    conn = None
+    try:
+        conn = engine.connect()
+        sql_call = text(SELECT_SP)
+        lista = []
+        with conn.execute(sql_call) as resultado:
+            column_keys = resultado.keys()
+            filas = resultado.fetchall()
+        for fila in filas:
+            d = dict(zip(column_keys, fila))
+            if isinstance(d.get('precio'), Decimal):
+                d['precio'] = str(d['precio'])
+            d['imagen_url'] = d.get('imagen_url')
+            lista.append(d)
+        return lista
+    finally:
+        if conn:
+            conn.close()
+
+
+def handler_nuevo(engine):
+    return utils.ejecutar_sp("sp_Bench", resultado="todos")
+
+
+def medir(nombre, funcion, engine):
+    funcion(engine)  # calentamiento (compilacion de la sentencia, pool)
+    inicio = time.perf_counter()
+    for _ in range(LLAMADAS):
+        funcion(engine)
+    total = time.perf_counter() - inicio
+    print(f"{nombre:<10} {total / LLAMADAS * 1e6:9.1f} us/llamada")
+
+
+if __name__ == "__main__":
+    engine = preparar_engine()
+    database.engine = engine
+    utils._sentencias_sp[("sp_Bench", ())] = text(SELECT_SP)
+    print(f"{LLAMADAS} llamadas x {FILAS} filas")
+    medir("original", handler_original, engine)
+    medir("nuevo", handler_nuevo, engine)
+    print("tiempos registrados:", utils.estadisticas_sp()["sp_Bench"])
@@ -0,0 +1,62 @@
+# benchmarks/bench_escalado_nucleos.py
+#
+# Escalado de gunicorn.conf.py con los nucleos: para cada cantidad de nucleos N (1, 2, 4... hasta los
+# disponibles) arranca gunicorn limitado a esos N nucleos (sched_setaffinity) con un solo worker y con
+# WEB_CONCURRENCY = 2 x N + 1 (hasta 8, el valor por defecto de gunicorn.conf.py) y mide solicitudes/s con CLIENTES clientes en:
+#   - /api/productos/batch?ids=... : una consulta por solicitud con LATENCIA_MS de latencia simulada,
+#   - /api/productos/search?q=...  : busqueda en el indice en memoria, sin DB (limitada por CPU).
+# Como referencia mide tambien el Procfile anterior (un solo worker sincrono, sin preload).
+# El cliente de carga comparte la maquina: con pocos nucleos parte de la CPU se la lleva el cliente.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_escalado_nucleos [clientes] [segundos] [latencia_ms]
+
+import os
+import random
+import sys
+import tempfile
+
+from benchmarks.carga_http import PRODUCTOS, medir, preparar_db, puerto_libre
+
+CLIENTES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+SEGUNDOS = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+LATENCIA_MS = sys.argv[3] if len(sys.argv) > 3 else "20"
+
+ESCENARIOS = {
+    "batch (DB)": lambda: "/api/productos/batch?ids=" + ",".join(str(random.randrange(1, PRODUCTOS + 1)) for _ in range(10)),
+    "search (memoria)": lambda: f"/api/productos/search?q=producto+{random.randrange(1, 100)}&limit=20",
+}
+
+
+def cantidades_de_nucleos():
+    disponibles = sorted(os.sched_getaffinity(0))
+    cantidades, n = [], 1
+    while n < len(disponibles):
+        cantidades.append(n)
+        n *= 2
+    return [disponibles[:n] for n in cantidades + [len(disponibles)]]
+
+
+if __name__ == "__main__":
+    print(f"{CLIENTES} clientes, {SEGUNDOS:.0f} s por medicion, latencia simulada {LATENCIA_MS} ms por consulta")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "catalogo.db")
+        preparar_db(ruta)
+        entorno = {"BENCH_DB": ruta, "BENCH_LATENCIA_MS": LATENCIA_MS, "VENCIMIENTOS_AUTOMATICOS": "0"}
+        sin_configuracion = os.path.join(directorio, "gunicorn_vacio.py")
+        open(sin_configuracion, "w").close()
+
+        for escenario, generar_ruta in ESCENARIOS.items():
+            print(f"--- {escenario}")
+            puerto = puerto_libre()
+            medir("Procfile anterior (1 worker sync)", [
+                sys.executable, "-m", "gunicorn", "--config", sin_configuracion, "--bind", f"127.0.0.1:{puerto}",
+                "--backlog", "2048", "benchmarks.servidor_latencia:app",
+            ], entorno, puerto, generar_ruta, CLIENTES, SEGUNDOS)
+
+            for nucleos in cantidades_de_nucleos():
+                for workers in sorted({1, min(2 * len(nucleos) + 1, 8)}):
+                    puerto = puerto_libre()
+                    medir(f"gunicorn.conf.py, {len(nucleos)} nucleo(s), {workers} worker(s)", [
+                        sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "--bind", f"127.0.0.1:{puerto}",
+                        "--backlog", "2048", "benchmarks.servidor_latencia:app",
+                    ], {**entorno, "WEB_CONCURRENCY": str(workers)}, puerto, generar_ruta, CLIENTES, SEGUNDOS, nucleos)
@@ -0,0 +1,47 @@
+# benchmarks/bench_indice_horarios.py
+#
+# Consulta "clases entre desde y hasta" con el arbol de intervalos (indice_horarios) contra un
+# recorrido lineal de todas las clases, con franjas de 30 minutos al azar.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_indice_horarios [clases] [consultas]
+
+import random
+import sys
+import time
+from datetime import timedelta
+
+from indice_horarios import IndiceHorarios, a_minutos
+
+CLASES = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+CONSULTAS = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+
+def recorrido_lineal(clases, desde, hasta):
+    resultado = []
+    for clase in clases:
+        inicio = a_minutos(clase["horario"])
+        fin = inicio + clase["duracion"]
+        if inicio < hasta and fin > desde:
+            resultado.append(clase)
+    return resultado
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    clases = [
+        {"id_clase": i, "horario": timedelta(minutes=random.randrange(6 * 60, 22 * 60)), "duracion": random.choice((30, 45, 60, 90))}
+        for i in range(CLASES)
+    ]
+    franjas = [(d, d + 30) for d in (random.randrange(6 * 60, 22 * 60) for _ in range(CONSULTAS))]
+
+    indice = IndiceHorarios()
+    inicio = time.perf_counter()
+    indice.construir(clases)
+    print(f"{CLASES} clases, construccion del indice: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    for nombre, funcion in (("lineal", lambda d, h: recorrido_lineal(clases, d, h)),
+                            ("indice", indice.consultar)):
+        inicio = time.perf_counter()
+        encontradas = sum(len(funcion(d, h)) for d, h in franjas)
+        promedio = (time.perf_counter() - inicio) / CONSULTAS
+        print(f"{nombre:<8} {promedio * 1e6:10.1f} us/consulta   (promedio {encontradas / CONSULTAS:.0f} clases por franja)")
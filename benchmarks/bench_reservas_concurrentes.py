@@ -0,0 +1,83 @@
+# benchmarks/bench_reservas_concurrentes.py
+#
+# Prueba de carga de reservas: SOCIOS socios distintos intentan reservar a la vez la misma clase
+# (cupo CUPO) desde HILOS hilos, sobre SQLite en archivo. Verifica que:
+#   - se confirman exactamente CUPO reservas y el resto recibe "clase_llena",
+#   - el contador de ocupacion_clases coincide con las filas de reservas_clases,
+#   - un socio que reintenta recibe "duplicada" sin consumir cupo y una cancelacion libera el cupo,
+# y muestra el throughput de reservas (confirmadas + rechazadas) por segundo.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_reservas_concurrentes [socios] [cupo] [hilos]
+
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event, text
+
+import database
+import modelos.clases
+import modelos.reservas
+from handlers import reserva_handlers
+
+SOCIOS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+CUPO = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+HILOS = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+
+def preparar_engine(ruta):
+    engine = create_engine(f"sqlite:///{ruta}", pool_size=HILOS, connect_args={"timeout": 60, "check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _configurar(dbapi_conn, registro):
+        dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    database.Base.metadata.create_all(
+        engine, tables=[modelos.clases.Clase.__table__, modelos.reservas.ReservaClase.__table__,
+                        modelos.reservas.OcupacionClase.__table__]
+    )
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO clases (id_clase, nombre, instructor, duracion, cupo_maximo) "
+            "VALUES (1, 'Spinning 7am', 'Ana', 45, :cupo)"
+        ), {"cupo": CUPO})
+    return engine
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = preparar_engine(os.path.join(directorio, "reservas.db"))
+        reserva_handlers.engine = engine
+        fecha = date.today() + timedelta(days=1)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(HILOS) as pool:
+            resultados = list(pool.map(
+                lambda i: reserva_handlers.reservar_clase(1, f"socio-{i}", fecha), range(SOCIOS)
+            ))
+        total = time.perf_counter() - inicio
+
+        motivos = Counter(r.get("motivo", "confirmada") if "error" in r else "confirmada" for r in resultados)
+        confirmados = [i for i, r in enumerate(resultados) if "error" not in r]
+        cancelada = reserva_handlers.cancelar_reserva(1, f"socio-{confirmados[0]}", fecha)
+        repetida = reserva_handlers.reservar_clase(1, f"socio-{confirmados[1]}", fecha)
+        nueva = reserva_handlers.reservar_clase(1, "socio-tardio", fecha)
+        with engine.connect() as conn:
+            filas = conn.execute(text("SELECT COUNT(*) FROM reservas_clases")).scalar()
+            contador = conn.execute(text("SELECT reservados FROM ocupacion_clases")).scalar()
+
+        print(f"{SOCIOS} socios, cupo {CUPO}, {HILOS} hilos")
+        print(f"resultados: {dict(motivos)}")
+        print(f"reservas en tabla: {filas}   contador ocupacion: {contador}")
+        print(f"cancelacion: {cancelada.get('mensaje')}   reintento de un socio ya reservado: {repetida.get('motivo')}   "
+              f"reserva tras la cancelacion: {nueva.get('mensaje', nueva.get('motivo'))}")
+        print(f"throughput: {SOCIOS / total:.0f} reservas/s ({total * 1000:.0f} ms en total)")
+
+        assert motivos["confirmada"] == CUPO == filas == contador, "la clase quedo sobrevendida o sin llenar"
+        assert set(motivos) <= {"confirmada", "clase_llena"}
+        assert repetida.get("motivo") == "duplicada" and "error" not in nueva
+        engine.dispose()
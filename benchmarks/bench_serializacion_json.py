@@ -0,0 +1,79 @@
+# benchmarks/bench_serializacion_json.py
+#
+# Serializacion de un catalogo de 50k filas (tipos como los devuelve MySQL: Decimal, TIME, DATETIME):
+#   - "anterior": conversion por fila a string (mapear_filas previo) + DefaultJSONProvider de Flask,
+#   - "proveedor (json)": filas sin convertir + proveedor_json con la libreria estandar,
+#   - "proveedor (orjson)": filas sin convertir + proveedor_json con orjson.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_serializacion_json [filas] [repeticiones]
+
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import proveedor_json
+from proveedor_json import ProveedorJSONRapido
+
+FILAS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+REPETICIONES = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+COLUMNAS = ("id_clase", "nombre", "descripcion", "precio", "stock", "horario", "fecha_alta")
+
+
+def generar_tuplas():
+    base = datetime(2024, 1, 1, 8, 0, 0)
+    return [
+        (i, f"Producto {i}", "Descripcion del producto", Decimal(f"{i % 500}.99"), i % 40,
+         timedelta(hours=6 + i % 14, minutes=30), base + timedelta(minutes=i))
+        for i in range(FILAS)
+    ]
+
+
+def mapear_filas_anterior(column_keys, filas):
+    """Copia del mapear_filas previo: detecta columnas Decimal/TIME y las convierte a str por fila."""
+    tipos = (Decimal, timedelta)
+    a_convertir = [clave for indice, clave in enumerate(column_keys)
+                   if isinstance(next((f[indice] for f in filas if f[indice] is not None), None), tipos)]
+    lista = []
+    for fila in filas:
+        fila_dict = dict(zip(column_keys, fila))
+        for clave in a_convertir:
+            if fila_dict[clave] is not None:
+                fila_dict[clave] = str(fila_dict[clave])
+        lista.append(fila_dict)
+    return lista
+
+
+def medir(nombre, funcion):
+    funcion()
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        tamano = len(funcion())
+    promedio = (time.perf_counter() - inicio) / REPETICIONES
+    print(f"{nombre:<20} {promedio * 1000:9.1f} ms   ({tamano / 1024 / 1024:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    app = Flask(__name__)
+    tuplas = generar_tuplas()
+    anterior = DefaultJSONProvider(app)
+    nuevo = ProveedorJSONRapido(app)
+    print(f"{FILAS} filas, promedio de {REPETICIONES} repeticiones (mapeo de filas + serializacion)")
+
+    medir("anterior", lambda: anterior.dumps(mapear_filas_anterior(COLUMNAS, tuplas)))
+
+    orjson = proveedor_json.orjson
+    if orjson is not None:
+        medir("proveedor (orjson)", lambda: nuevo.dumps([dict(zip(COLUMNAS, t)) for t in tuplas]))
+        # Misma clase, forzando la rama de la libreria estandar
+        import importlib
+        sys.modules["orjson"] = None
+        importlib.reload(proveedor_json)
+        nuevo_std = proveedor_json.ProveedorJSONRapido(app)
+        medir("proveedor (json)", lambda: nuevo_std.dumps([dict(zip(COLUMNAS, t)) for t in tuplas]))
+        sys.modules["orjson"] = orjson
+    else:
+        medir("proveedor (json)", lambda: nuevo.dumps([dict(zip(COLUMNAS, t)) for t in tuplas]))
@@ -0,0 +1,88 @@
+# benchmarks/bench_streaming.py
+#
+# Compara el listado "clasico" (fetchall + lista de dicts + un solo json.dumps) contra el modo
+# streaming (fetchmany + fragmentos JSON) sobre una tabla de 100k productos en SQLite.
+# Mide tiempo hasta el primer byte, tiempo total y pico de memoria (tracemalloc). SQLite entrega las
+# filas a medida que se piden, igual que el cursor del lado del servidor de pymysql que usa
+# flujo_filas_sp en MySQL (ver database.engine_streaming).
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_streaming [filas]
+
+import json
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+from sqlalchemy import create_engine, text
+
+import database
+from utils import flujo_filas_sp, generar_json_array
+
+FILAS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+SQL = text("SELECT id_producto, nombre, descripcion, precio, stock, imagen_url FROM productos")
+
+
+def preparar_engine(ruta):
+    engine = create_engine(f"sqlite:///{ruta}")
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS productos"))
+        conn.execute(text(
+            "CREATE TABLE productos (id_producto INTEGER PRIMARY KEY, nombre VARCHAR(255), "
+            "descripcion VARCHAR(255), precio NUMERIC(10, 2), stock INTEGER, imagen_url VARCHAR(255))"
+        ))
+        conn.execute(
+            text("INSERT INTO productos (nombre, descripcion, precio, stock, imagen_url) "
+                 "VALUES (:nombre, :descripcion, :precio, :stock, :imagen_url)"),
+            [{"nombre": f"Producto {i}", "descripcion": f"Descripcion del producto numero {i}",
+              "precio": 19.99, "stock": i % 50, "imagen_url": f"https://cdn.ejemplo.com/p/{i}.jpg"}
+             for i in range(FILAS)]
+        )
+    return engine
+
+
+def listado_clasico(engine):
+    """Replica del camino original: fetchall, dict por fila y un solo string JSON."""
+    with engine.connect() as conn:
+        with conn.execute(SQL) as resultado:
+            column_keys = resultado.keys()
+            filas = resultado.fetchall()
+    lista = []
+    for fila in filas:
+        d = dict(zip(column_keys, fila))
+        if isinstance(d.get('precio'), Decimal):
+            d['precio'] = str(d['precio'])
+        lista.append(d)
+    yield json.dumps(lista)
+
+
+def listado_streaming(engine):
+    return generar_json_array(flujo_filas_sp(SQL))
+
+
+def medir(nombre, fabrica, engine):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    primer_byte = None
+    total_bytes = 0
+    for fragmento in fabrica(engine):
+        if primer_byte is None and fragmento not in ("[", b"["):
+            primer_byte = time.perf_counter() - inicio
+        total_bytes += len(fragmento)
+    total = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<10} primer byte: {primer_byte * 1000:8.1f} ms   total: {total * 1000:8.1f} ms   "
+          f"pico memoria: {pico / 1024 / 1024:7.1f} MiB   bytes: {total_bytes}")
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    ruta = os.path.join(tempfile.mkdtemp(), "bench_streaming.db")
+    engine = preparar_engine(ruta)
+    database.engine_streaming = engine  # flujo_filas_sp toma el engine de database en cada llamada
+    print(f"{FILAS} filas")
+    medir("clasico", listado_clasico, engine)
+    medir("streaming", listado_streaming, engine)
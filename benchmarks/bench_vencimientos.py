@@ -0,0 +1,95 @@
+# benchmarks/bench_vencimientos.py
+#
+# Vencimiento de SOCIOS suscripciones (SQLite en archivo) con vencimientos repartidos en los proximos
+# 30 dias y una parte ya vencida. Simula un dia de barridos cada INTERVALO minutos con
+# barrido_vencimientos y lo compara con el barrido diario ingenuo (leer todas las activas y marcar
+# una por una). Verifica que al final no quede ninguna activa vencida ni se marque una vigente.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_vencimientos [socios] [intervalo_minutos]
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text, DateTime
+
+import database
+import modelos.planes
+import modelos.suscripciones
+import vencimientos
+
+SOCIOS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+INTERVALO = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+
+def preparar_engine(ruta, inicio):
+    engine = create_engine(f"sqlite:///{ruta}")
+    database.Base.metadata.create_all(
+        engine, tables=[modelos.planes.Plan.__table__, modelos.suscripciones.Suscripcion.__table__]
+    )
+    random.seed(5)
+    filas = []
+    for i in range(SOCIOS):
+        # ~3% ya vencidas (atrasadas), el resto repartidas en 30 dias
+        vencimiento = inicio + timedelta(minutes=random.randrange(-3 * 24 * 60, 30 * 24 * 60) if i % 33 == 0
+                                         else random.randrange(0, 30 * 24 * 60))
+        filas.append({"u": f"socio-{i}", "i": vencimiento - timedelta(days=30), "v": vencimiento})
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO planes (id_plan, nombre, duracion_dias) VALUES (1, 'Mensual', 30)"))
+        conn.execute(text(
+            "INSERT INTO suscripciones (id_usuario, id_plan, fecha_inicio, fecha_vencimiento, estado) "
+            "VALUES (:u, 1, :i, :v, 'activa')"
+        ), filas)
+    return engine
+
+
+def activas_vencidas(engine, ahora):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT COUNT(*) FROM suscripciones WHERE estado = 'activa' AND fecha_vencimiento <= :a"
+        ), {"a": ahora}).scalar()
+
+
+def barrido_ingenuo(engine, ahora):
+    with engine.begin() as conn:
+        filas = conn.execute(text("SELECT id_suscripcion, fecha_vencimiento FROM suscripciones WHERE estado = 'activa'")
+                             .columns(fecha_vencimiento=DateTime)).all()
+        for id_suscripcion, vencimiento in filas:
+            if vencimiento <= ahora:
+                conn.execute(text("UPDATE suscripciones SET estado = 'vencida' WHERE id_suscripcion = :i"), {"i": id_suscripcion})
+    return len(filas)
+
+
+if __name__ == "__main__":
+    inicio = datetime(2026, 1, 1, 6, 0)
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = preparar_engine(os.path.join(directorio, "barrido.db"), inicio)
+        vencimientos.engine = engine
+        barrido = vencimientos.BarridoVencimientos()
+
+        tiempos, maximo_memoria = [], 0
+        ahora = inicio
+        while ahora <= inicio + timedelta(days=1):
+            t0 = time.perf_counter()
+            barrido.barrer(ahora)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+            maximo_memoria = max(maximo_memoria, barrido.estadisticas()["en_memoria"])
+            ahora += timedelta(minutes=INTERVALO)
+        estadisticas = barrido.estadisticas()
+        pendientes = activas_vencidas(engine, ahora - timedelta(minutes=INTERVALO))
+        tiempos_ordenados = sorted(tiempos)
+        print(f"{SOCIOS} suscripciones, {len(tiempos)} barridos (cada {INTERVALO} min durante un dia)")
+        print(f"heap        primer barrido {tiempos[0]:7.1f} ms   p50 {tiempos_ordenados[len(tiempos) // 2]:6.2f} ms   "
+              f"max {tiempos_ordenados[-1]:7.1f} ms   total {sum(tiempos):7.0f} ms")
+        print(f"            vencidas {estadisticas['vencidas']}   recargas {estadisticas['recargas']}   "
+              f"max en memoria {maximo_memoria}   activas vencidas sin marcar: {pendientes}")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        engine = preparar_engine(os.path.join(directorio, "ingenuo.db"), inicio)
+        t0 = time.perf_counter()
+        leidas = barrido_ingenuo(engine, inicio + timedelta(days=1))
+        print(f"ingenuo     un barrido diario {(time.perf_counter() - t0) * 1000:7.0f} ms   filas leidas {leidas}   "
+              f"activas vencidas sin marcar: {activas_vencidas(engine, inicio + timedelta(days=1))}")
@@ -0,0 +1,52 @@
+# benchmarks/bench_verificacion_token.py
+#
+# Latencia de verificación de ID tokens contra el servidor de claves local (sin red):
+#   - "descarga por llamada": google.oauth2.id_token.verify_token, que descarga los certificados
+#     en cada verificación (lo que paga la solicitud que cae en una expiración del cache de firebase_admin),
+#   - "local": AlmacenClavesFirma.verificar, con certificados precargados en memoria,
+#   - "local + cache": verificar_token, que además reutiliza tokens ya verificados.
+#
+# Uso (desde la raiz del proyecto):  python -m benchmarks.bench_verificacion_token [iteraciones]
+
+import os
+import sys
+import time
+
+from benchmarks.servidor_claves_local import ServidorClavesLocal
+
+ITERACIONES = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+PROJECT_ID = "demo-gimnasio"
+
+
+def medir(nombre, funcion):
+    funcion()
+    inicio = time.perf_counter()
+    for _ in range(ITERACIONES):
+        funcion()
+    promedio = (time.perf_counter() - inicio) / ITERACIONES
+    print(f"{nombre:<22} {promedio * 1e6:10.1f} us/verificación")
+
+
+if __name__ == "__main__":
+    servidor = ServidorClavesLocal().iniciar()
+    os.environ["FIREBASE_CERTS_URL"] = servidor.url
+    os.environ["FIREBASE_PROJECT_ID"] = PROJECT_ID
+
+    import google.auth.transport.requests
+    import google.oauth2.id_token
+    from routes import auth_middleware
+    from routes.claves_firma import AlmacenClavesFirma
+
+    token = servidor.firmar_token("usuario-bench", PROJECT_ID)
+    sesion = google.auth.transport.requests.Request()
+    almacen = AlmacenClavesFirma(servidor.url)
+    auth_middleware.almacen_claves = almacen
+    almacen.refrescar()  # precarga sincronica (en la app la hace el hilo de fondo al arrancar)
+
+    medir("descarga por llamada", lambda: google.oauth2.id_token.verify_token(
+        token, sesion, audience=PROJECT_ID, certs_url=servidor.url))
+    descargas = servidor.descargas
+    medir("local", lambda: almacen.verificar(token, PROJECT_ID))
+    medir("local + cache", lambda: auth_middleware.verificar_token(token))
+    print(f"descargas de certificados durante 'local': {servidor.descargas - descargas}")
+    servidor.detener()
@@ -0,0 +1,125 @@
+# benchmarks/carga_http.py
+#
+# Utilidades compartidas por las pruebas de carga HTTP (bench_asgi_vs_wsgi, bench_escalado_nucleos):
+# base SQLite con el catalogo, arranque de un servidor en un subproceso y un cliente HTTP/1.1
+# minimo sobre asyncio. Un cliente como httpx con 200 conexiones consume tanta CPU que pasa a ser
+# el cuello de botella de la prueba.
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import time
+import urllib.request
+
+from sqlalchemy import create_engine, text
+
+import database
+import modelos.clases
+import modelos.planes
+
+PRODUCTOS = 5000
+
+
+def preparar_db(ruta, productos: int = PRODUCTOS):
+    engine = create_engine(f"sqlite:///{ruta}")
+    database.Base.metadata.create_all(engine, tables=[
+        database.Product.__table__, modelos.planes.Plan.__table__, modelos.clases.Clase.__table__,
+    ])
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO productos (nombre, descripcion, precio, stock, imagen_url) "
+                 "VALUES (:nombre, :descripcion, :precio, :stock, :imagen_url)"),
+            [{"nombre": f"Producto {i}", "descripcion": f"Descripcion del producto numero {i}",
+              "precio": 19.99, "stock": i % 50, "imagen_url": f"https://cdn.ejemplo.com/p/{i}.jpg"}
+             for i in range(productos)]
+        )
+    engine.dispose()
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def arrancar(comando, entorno: dict, puerto, nucleos=None):
+    """Arranca el servidor (limitado a los `nucleos` indicados) y espera a que responda /api/productos/batch?ids=1."""
+    proceso = subprocess.Popen(comando, env={**os.environ, "LOG_LEVEL": "WARNING", **entorno},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               preexec_fn=(lambda: os.sched_setaffinity(0, nucleos)) if nucleos else None)
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{puerto}/api/productos/batch?ids=1", timeout=5).read()
+            return proceso
+        except OSError:
+            time.sleep(0.2)
+    proceso.kill()
+    raise RuntimeError(f"El servidor no arranco: {' '.join(comando)}")
+
+
+async def _leer_respuesta(lector):
+    """(status, si el servidor cierra la conexion) de una respuesta HTTP/1.1 con Content-Length."""
+    cabecera = await lector.readuntil(b"\r\n\r\n")
+    lineas = cabecera.split(b"\r\n")
+    largo, cerrar = 0, False
+    for linea in lineas[1:]:
+        nombre, _, valor = linea.partition(b":")
+        nombre = nombre.strip().lower()
+        if nombre == b"content-length":
+            largo = int(valor)
+        elif nombre == b"connection":
+            cerrar = valor.strip().lower() == b"close"
+    await lector.readexactly(largo)
+    return int(lineas[0].split()[1]), cerrar
+
+
+async def cargar(puerto, generar_ruta, clientes: int, segundos: float):
+    """`clientes` conexiones piden generar_ruta() sin pausa (keep-alive si el servidor lo permite)."""
+    latencias, errores = [], 0
+    limite = time.monotonic() + segundos
+
+    async def cliente():
+        nonlocal errores
+        lector = escritor = None
+        while time.monotonic() < limite:
+            inicio = time.perf_counter()
+            try:
+                if escritor is None:
+                    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+                escritor.write(f"GET {generar_ruta()} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+                status, cerrar = await _leer_respuesta(lector)
+            except (OSError, asyncio.IncompleteReadError):
+                errores += 1
+                escritor = None
+                continue
+            if cerrar:
+                escritor.close()
+                escritor = None
+            if status != 200:
+                errores += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+        if escritor is not None:
+            escritor.close()
+
+    inicio = time.monotonic()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    return latencias, errores, time.monotonic() - inicio
+
+
+def medir(nombre, comando, entorno: dict, puerto, generar_ruta, clientes: int, segundos: float, nucleos=None) -> float:
+    """Arranca el servidor, lo carga, lo detiene e imprime solicitudes/s, p50/p99 y errores."""
+    proceso = arrancar(comando, entorno, puerto, nucleos)
+    try:
+        latencias, errores, total = asyncio.run(cargar(puerto, generar_ruta, clientes, segundos))
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    cuantiles = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else [0] * 99
+    por_segundo = len(latencias) / total
+    print(f"{nombre:<40} {por_segundo:8.0f} sol/s   p50 {cuantiles[49] * 1000:7.0f} ms   "
+          f"p99 {cuantiles[98] * 1000:7.0f} ms   errores {errores}")
+    return por_segundo
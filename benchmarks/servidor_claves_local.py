@@ -0,0 +1,96 @@
+# benchmarks/servidor_claves_local.py
+#
+# Servidor local que imita el endpoint de certificados de Firebase (securetoken@system...),
+# para probar la verificación de ID tokens sin red. Genera una clave RSA y un certificado
+# autofirmado, publica {kid: certificado PEM} con Cache-Control: max-age y firma tokens
+# con las mismas claims que emite Firebase Authentication.
+#
+# Uso manual:  python -m benchmarks.servidor_claves_local [puerto]
+#   y luego arrancar la API con FIREBASE_CERTS_URL=http://127.0.0.1:<puerto>/ FIREBASE_PROJECT_ID=demo
+
+import datetime
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+
+class ServidorClavesLocal:
+    def __init__(self, puerto: int = 0, max_age: int = 3600, kid: str = "clave-local-1"):
+        self.kid = kid
+        self.max_age = max_age
+        self.descargas = 0
+        clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.local")])
+        ahora = datetime.datetime.now(datetime.timezone.utc)
+        certificado = (
+            x509.CertificateBuilder()
+            .subject_name(nombre).issuer_name(nombre)
+            .public_key(clave.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(ahora - datetime.timedelta(days=1))
+            .not_valid_after(ahora + datetime.timedelta(days=7))
+            .sign(clave, hashes.SHA256())
+        )
+        self.certificados = {kid: certificado.public_bytes(serialization.Encoding.PEM).decode("ascii")}
+        clave_pem = clave.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        self._firmante = crypt.RSASigner.from_string(clave_pem, key_id=kid)
+
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.descargas += 1
+                cuerpo = json.dumps(servidor.certificados).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={servidor.max_age}")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+        self.url = f"http://127.0.0.1:{self._http.server_address[1]}/"
+
+    def iniciar(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._http.shutdown()
+
+    def firmar_token(self, uid: str, project_id: str, duracion: int = 3600, **claims) -> str:
+        ahora = int(time.time())
+        payload = {
+            "iss": f"https://securetoken.google.com/{project_id}",
+            "aud": project_id,
+            "auth_time": ahora,
+            "user_id": uid,
+            "sub": uid,
+            "iat": ahora,
+            "exp": ahora + duracion,
+            **claims,
+        }
+        return google_jwt.encode(self._firmante, payload).decode("ascii")
+
+
+if __name__ == "__main__":
+    servidor = ServidorClavesLocal(int(sys.argv[1]) if len(sys.argv) > 1 else 8765).iniciar()
+    print(f"Certificados en {servidor.url}")
+    print("Token de prueba (project id 'demo'):")
+    print(servidor.firmar_token("usuario-local", "demo"))
+    while True:
+        time.sleep(3600)
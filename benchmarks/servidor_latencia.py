@@ -0,0 +1,58 @@
+# benchmarks/servidor_latencia.py
+#
+# La API (app Flask y asgi.py) sobre un SQLite en archivo que imita la latencia de red de MySQL:
+# cada execute() del cursor espera BENCH_LATENCIA_MS antes de ejecutarse. Los dos engines usan la
+# misma conexion "lenta": pysqlite para el engine sincrono y aiosqlite (que corre sqlite3 en un hilo
+# propio por conexion, como aiomysql espera al socket sin bloquear el event loop) para el async.
+#
+# Lo arranca bench_asgi_vs_wsgi:
+#   BENCH_DB=<ruta> gunicorn benchmarks.servidor_latencia:app
+#   BENCH_DB=<ruta> uvicorn benchmarks.servidor_latencia:app_asgi
+
+import os
+import sqlite3
+import time
+
+import aiosqlite
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import asgi
+import database
+from app import app
+from handlers import clase_handlers, lectura_async_handlers, plan_handlers, producto_handlers
+
+RUTA_DB = os.environ["BENCH_DB"]
+LATENCIA = float(os.getenv("BENCH_LATENCIA_MS", "20")) / 1000
+CONEXIONES = int(os.getenv("BENCH_CONEXIONES", "20"))
+
+
+class CursorLento(sqlite3.Cursor):
+    def execute(self, *args, **kwargs):
+        time.sleep(LATENCIA)
+        return super().execute(*args, **kwargs)
+
+
+class ConexionLenta(sqlite3.Connection):
+    def cursor(self, factory=CursorLento):
+        return super().cursor(factory)
+
+
+def _conectar():
+    return sqlite3.connect(RUTA_DB, factory=ConexionLenta, check_same_thread=False)
+
+
+async def _conectar_async():
+    return await aiosqlite.connect(RUTA_DB, factory=ConexionLenta, check_same_thread=False)
+
+
+engine = create_engine("sqlite://", creator=_conectar, poolclass=QueuePool, pool_size=CONEXIONES, max_overflow=0)
+engine_async = create_async_engine("sqlite+aiosqlite://", async_creator=_conectar_async,
+                                   poolclass=AsyncAdaptedQueuePool, pool_size=CONEXIONES, max_overflow=0)
+for modulo in (database, producto_handlers, plan_handlers, clase_handlers):
+    modulo.engine = engine
+lectura_async_handlers.engine_async = engine_async
+asgi.engine_async = engine_async
+
+app_asgi = asgi.app
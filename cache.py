@@ -0,0 +1,206 @@
+# cache.py
+
+import mmap
+import multiprocessing
+import os
+import secrets
+import struct
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# --- Cache en memoria (por proceso) para las lecturas del catalogo ---
+# Cada tabla ('productos', 'planes', 'clases') tiene un contador de version que los
+# handlers de escritura (agregar/actualizar/eliminar) incrementan tras un commit exitoso.
+# Una entrada del cache solo es valida si fue cargada con la version actual de su tabla.
+#
+# Las entradas son de cada worker, pero los contadores de version no: viven en memoria compartida
+# (mmap anonimo) que el master de gunicorn crea al importar la app (preload_app) y que los workers
+# heredan al hacer fork. Una escritura en cualquier worker invalida el cache de todos, y leer una
+# version es leer 8 bytes, sin ir a la DB. EPOCA_ARRANQUE distingue las versiones de un arranque
+# de las del anterior (los contadores vuelven a 0): la usan los ETag (routes/etag_middleware.py).
+# Sin preload (o con procesos que no salen de un fork, como los workers de uvicorn) cada proceso
+# tiene sus propios contadores y solo ve sus escrituras.
+#
+# Los indices en memoria que se actualizan en el momento con las escrituras de su propio proceso
+# (indice_productos, socios_activos) necesitan saber si ademas escribio otro worker: obtener_sello y
+# hubo_escrituras_ajenas comparan cuanto avanzo la version compartida con cuantas de esas escrituras
+# hizo este proceso.
+#
+# Las entradas tambien caducan cuando cambia la "ventana" de tiempo (CACHE_TTL_SEGUNDOS): acota lo
+# que se tarda en ver escrituras que no pasan por incrementar_version (otros procesos, SQL a mano,
+# workers sin memoria compartida). La marca (version, ventana) es la que decide si una entrada sigue
+# valida. Con CACHE_TTL_SEGUNDOS=0 las entradas no caducan por tiempo.
+#
+# Los valores cacheados se comparten entre solicitudes: son de solo lectura. Quien necesite
+# modificar una lista o dict devuelto por un handler @cacheado debe copiarlo primero.
+#
+# Cada tabla guarda como maximo CACHE_MAXIMO_ENTRADAS entradas: las lecturas por id crean una
+# entrada por id consultado, asi que al pasar el limite se descarta la usada hace mas tiempo (LRU).
+CACHE_TTL_SEGUNDOS = int(os.getenv("CACHE_TTL_SEGUNDOS", "30"))
+CACHE_MAXIMO_ENTRADAS = int(os.getenv("CACHE_MAXIMO_ENTRADAS", "1000"))
+
+TABLAS_VERSIONADAS = ("productos", "planes", "clases", "suscripciones")
+EPOCA_ARRANQUE = secrets.token_hex(4)
+
+
+class VersionesCompartidas:
+    """Un contador de 64 bits por tabla en memoria compartida con los procesos hijos (fork)."""
+
+    def __init__(self, tablas=TABLAS_VERSIONADAS):
+        self._posiciones = {tabla: i * 8 for i, tabla in enumerate(tablas)}
+        self._memoria = mmap.mmap(-1, 8 * len(tablas))  # anonimo y MAP_SHARED: sobrevive al fork
+        self._lock = multiprocessing.Lock()
+
+    def __iter__(self):
+        return iter(self._posiciones)
+
+    def obtener(self, tabla: str) -> int:
+        return struct.unpack_from("q", self._memoria, self._posiciones[tabla])[0]
+
+    def incrementar(self, tabla: str) -> int:
+        posicion = self._posiciones[tabla]
+        with self._lock:
+            nueva_version = struct.unpack_from("q", self._memoria, posicion)[0] + 1
+            struct.pack_into("q", self._memoria, posicion, nueva_version)
+        return nueva_version
+
+
+_lock = threading.Lock()
+_versiones = VersionesCompartidas()
+_escrituras_propias = {}  # tabla -> versiones incrementadas por este proceso
+_entradas = {}   # tabla -> OrderedDict(clave -> (marca, valor)), de la menos a la mas usada
+_estadisticas = {}  # tabla -> {"hits": int, "misses": int}
+
+
+def _ventana_actual():
+    if CACHE_TTL_SEGUNDOS <= 0:
+        return 0
+    return int(time.monotonic() // CACHE_TTL_SEGUNDOS)
+
+
+def obtener_version(tabla: str) -> int:
+    """Devuelve la version actual de la tabla (0 si no se ha escrito desde el arranque)."""
+    return _versiones.obtener(tabla)
+
+
+def obtener_marca(tabla: str) -> tuple:
+    """Devuelve la marca (version, ventana de TTL) con la que se validan las entradas de la tabla."""
+    return (_versiones.obtener(tabla), _ventana_actual())
+
+
+def incrementar_version(tabla: str) -> int:
+    """Invalida las entradas cacheadas de la tabla en todos los workers. Llamar despues de un commit exitoso."""
+    with _lock:
+        nueva_version = _versiones.incrementar(tabla)
+        _escrituras_propias[tabla] = _escrituras_propias.get(tabla, 0) + 1
+        # Las entradas viejas ya no pueden ser validas: las descartamos para liberar memoria
+        _entradas.pop(tabla, None)
+    return nueva_version
+
+
+def obtener_sello(tabla: str) -> tuple:
+    """(version compartida, escrituras de este proceso) de la tabla: tomarlo antes de leer la DB."""
+    with _lock:
+        return (_versiones.obtener(tabla), _escrituras_propias.get(tabla, 0))
+
+
+def hubo_escrituras_ajenas(tabla: str, sello: tuple) -> bool:
+    """True si otro proceso incremento la version de la tabla despues de tomar el sello."""
+    version, propias = sello
+    with _lock:
+        return _versiones.obtener(tabla) - version > _escrituras_propias.get(tabla, 0) - propias
+
+
+def _contar(tabla: str, campo: str):
+    contadores = _estadisticas.setdefault(tabla, {"hits": 0, "misses": 0})
+    contadores[campo] += 1
+
+
+def _buscar(tabla: str, clave, marca):
+    with _lock:
+        entradas = _entradas.get(tabla)
+        entrada = entradas.get(clave) if entradas is not None else None
+        acierto = entrada is not None and entrada[0] == marca
+        if acierto:
+            entradas.move_to_end(clave)
+        _contar(tabla, "hits" if acierto else "misses")
+    return entrada if acierto else None
+
+
+def _guardar(tabla: str, clave, marca, valor):
+    # Los fallos de la DB ("error") y los no encontrados ("message") no se guardan: un id
+    # inexistente no debe ocupar una entrada ni quedar cacheado si luego se crea
+    if isinstance(valor, dict) and ("error" in valor or "message" in valor):
+        return
+    with _lock:
+        # Si hubo una escritura mientras cargabamos, la marca cambio y no guardamos el valor viejo
+        if obtener_marca(tabla) == marca:
+            entradas = _entradas.setdefault(tabla, OrderedDict())
+            entradas[clave] = (marca, valor)
+            entradas.move_to_end(clave)
+            while len(entradas) > CACHE_MAXIMO_ENTRADAS:
+                entradas.popitem(last=False)
+
+
+def obtener_o_cargar(tabla: str, clave, cargar):
+    """
+    Devuelve el valor cacheado para (tabla, clave) o lo carga con `cargar()`.
+    Los resultados con "error" o "message" (fallos de la DB, no encontrados) no se guardan.
+    El valor devuelto es el mismo objeto para todas las solicitudes: no modificarlo.
+    """
+    marca = obtener_marca(tabla)
+    entrada = _buscar(tabla, clave, marca)
+    if entrada is not None:
+        return entrada[1]
+    valor = cargar()
+    _guardar(tabla, clave, marca, valor)
+    return valor
+
+
+async def obtener_o_cargar_async(tabla: str, clave, cargar):
+    """Igual que obtener_o_cargar para los handlers async (asgi.py): `cargar()` es una corrutina."""
+    marca = obtener_marca(tabla)
+    entrada = _buscar(tabla, clave, marca)
+    if entrada is not None:
+        return entrada[1]
+    valor = await cargar()
+    _guardar(tabla, clave, marca, valor)
+    return valor
+
+
+def cacheado(tabla: str):
+    """
+    Decorador read-through: cachea el resultado del handler segun su nombre y argumentos.
+    El resultado se comparte entre solicitudes y no debe modificarse (ver obtener_o_cargar).
+    """
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            clave = (f.__name__, args, tuple(sorted(kwargs.items())))
+            return obtener_o_cargar(tabla, clave, lambda: f(*args, **kwargs))
+        return envoltura
+    return decorador
+
+
+def estadisticas_cache() -> dict:
+    """Contadores de hits/misses, version y numero de entradas por tabla."""
+    with _lock:
+        tablas = set(_estadisticas) | set(_versiones) | set(_entradas)
+        return {
+            tabla: {
+                "hits": _estadisticas.get(tabla, {}).get("hits", 0),
+                "misses": _estadisticas.get(tabla, {}).get("misses", 0),
+                "version": _versiones.obtener(tabla),
+                "entradas": len(_entradas.get(tabla, ())),
+            }
+            for tabla in sorted(tablas)
+        }
+
+
+def limpiar_cache():
+    """Vacia el cache y reinicia los contadores (util para pruebas manuales)."""
+    with _lock:
+        _entradas.clear()
+        _estadisticas.clear()
@@ -1,8 +1,16 @@
 # database.py
 
-from sqlalchemy import create_engine, Column, Integer, String, Float
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
+import os
+import threading
+from sqlalchemy import create_engine
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+
+from metricas_pool import QueuePoolMedido, registrar_eventos_pool, estadisticas_pool
+from instrumentacion_sql import instrumentar_engine
+
+logger = logging.getLogger(__name__)
 
 # --- Configuración de Conexión a MySQL ---
 # ¡IMPORTANTE! Cambia la contraseña '1234' por una más segura para producción.
@@ -18,74 +26,151 @@ MYSQL_DB = "bpngdi36dwtobigkpb9r"
 # Usamos mysql+mysqlconnector porque es la implementación recomendada para MySQL con SQLAlchemy
 DATABASE_URL = f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
 
-# Crear el engine. Es el punto de entrada para interactuar con la base de datos.
+# --- Configuración del pool de conexiones (desde variables de entorno) ---
+# Cada worker de gunicorn tiene su propio pool: el máximo de conexiones por worker es
+# DB_POOL_SIZE + DB_MAX_OVERFLOW, y eso multiplicado por los workers no debe superar el
+# límite de conexiones de MySQL en Clever Cloud.
 # pool_recycle=3600 es una buena práctica para conexiones a MySQL para evitar problemas de timeout.
-# echo=True mostrará las queries SQL generadas por SQLAlchemy en la consola (útil para depuración)
-engine = create_engine(
-    DATABASE_URL,
-    pool_recycle=3600,
-    echo=True
+CONFIGURACION_POOL = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "0").lower() in ("1", "true", "si"),
+}
+
+# Crear el engine. Es el punto de entrada para interactuar con la base de datos.
+# QueuePoolMedido registra el tiempo de espera de cada checkout (ver /api/metricas/pool).
+# echo queda desactivado por defecto: imprimir cada query bloquea la solicitud. Para depurar se
+# puede activar con SQL_ECHO=1; en producción se usa instrumentacion_sql (log de queries lentas
+# y latencias por sentencia en /api/metricas/sql).
+#
+# El engine se crea en el primer uso y no al importar este módulo: create_engine importa el driver
+# (mysql.connector) y eso se pagaba en cada arranque de worker aunque la primera solicitud no tocara
+# la DB. `engine` es un EngineDiferido que crea el engine real con obtener_engine() la primera vez
+# que se usa cualquiera de sus atributos (connect, begin, pool, dispose...), así que los módulos que
+# hacen `from database import engine` al importarse siguen funcionando sin cambios.
+_engine = None
+_lock_engine = threading.Lock()
+
+
+def obtener_engine():
+    """Devuelve el engine de MySQL, creándolo (una vez por proceso) en la primera llamada."""
+    global _engine
+    if _engine is None:
+        with _lock_engine:
+            if _engine is None:
+                nuevo = create_engine(
+                    DATABASE_URL,
+                    poolclass=QueuePoolMedido,
+                    **CONFIGURACION_POOL,
+                    echo=os.getenv("SQL_ECHO", "0").lower() in ("1", "true", "si")
+                )
+                registrar_eventos_pool(nuevo)
+                instrumentar_engine(nuevo)
+                _engine = nuevo
+    return _engine
+
+
+def engine_creado() -> bool:
+    """True si el engine ya se creó en este proceso (para no crearlo solo para descartarlo)."""
+    return _engine is not None
+
+
+# --- Engine para las lecturas en streaming (utils.flujo_filas_sp) ---
+# El dialecto mysqlconnector de SQLAlchemy abre siempre cursores con buffer: execute() trae todo el
+# resultado a memoria antes de devolver, aunque se pida stream_results. El dialecto de pymysql, en
+# cambio, atiende stream_results=True con un SSCursor (cursor del lado del servidor) y las filas
+# llegan de MySQL a medida que se leen con fetchmany(). Las lecturas en streaming usan por eso este
+# segundo engine. Mientras un flujo esta abierto su conexion no puede ejecutar otra sentencia, asi que
+# es un pool aparte y pequeño: sumar DB_STREAMING_POOL_SIZE + DB_STREAMING_MAX_OVERFLOW por worker
+# al limite de conexiones de MySQL.
+DATABASE_URL_STREAMING = os.getenv(
+    "DATABASE_URL_STREAMING",
+    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}?charset=utf8mb4"
 )
+CONFIGURACION_POOL_STREAMING = {
+    **CONFIGURACION_POOL,
+    "pool_size": int(os.getenv("DB_STREAMING_POOL_SIZE", "2")),
+    "max_overflow": int(os.getenv("DB_STREAMING_MAX_OVERFLOW", "3")),
+}
+_engine_streaming = None
+
 
-# Base declarativa para tus modelos de SQLAlchemy
-Base = declarative_base()
+def obtener_engine_streaming():
+    """Devuelve el engine (pymysql, cursores del lado del servidor) de las lecturas en streaming."""
+    global _engine_streaming
+    if _engine_streaming is None:
+        with _lock_engine:
+            if _engine_streaming is None:
+                nuevo = create_engine(DATABASE_URL_STREAMING, poolclass=QueuePool, **CONFIGURACION_POOL_STREAMING)
+                instrumentar_engine(nuevo)
+                _engine_streaming = nuevo
+    return _engine_streaming
 
-# --- Definición del Modelo de Producto ---
-# Este modelo se mapeará a una tabla llamada 'productos' en tu base de datos MySQL.
-# Asegúrate de que los nombres de las columnas coincidan con los de tu tabla existente.
-class Product(Base):
-    __tablename__ = 'productos' # Nombre de tu tabla en la base de datos
 
-    id_producto = Column(Integer, primary_key=True, autoincrement=True)
-    nombre = Column(String(255), nullable=False)
-    descripcion = Column(String(255), nullable=True)
-    precio = Column(Float, nullable=False)
-    stock = Column(Integer, nullable=False)
-    imagen_url = Column(String(255), nullable=True)
+def engine_streaming_creado() -> bool:
+    return _engine_streaming is not None
+
+
+class EngineDiferido:
+    """Delegado de un engine: reenvía cada atributo al engine real, que se crea en el primer uso."""
+
+    def __init__(self, obtener=obtener_engine, creado=engine_creado):
+        self._obtener = obtener
+        self._creado = creado
+
+    def __getattr__(self, nombre):
+        return getattr(self._obtener(), nombre)
 
     def __repr__(self):
-        return f"<Product(id={self.id_producto}, nombre='{self.nombre}')>"
-
-    # Método para convertir el objeto Product en un diccionario (útil para jsonify)
-    def to_dict(self):
-        return {
-            "id_producto": self.id_producto,
-            "nombre": self.nombre,
-            "descripcion": self.descripcion,
-            "precio": self.precio,
-            "stock": self.stock,
-            "imagen_url": self.imagen_url
-        }
-
-# Configuración de la sesión local para interactuar con la base de datos
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Función para obtener una sesión de base de datos (se usa con Flask's `g` o `inject`)
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db # 'yield' permite que esta función sea usada como un context manager
-    finally:
-        db.close() # Cierra la sesión para liberar recursos
+        return repr(self._obtener()) if self._creado() else "<EngineDiferido (sin crear)>"
+
+
+engine = EngineDiferido()
+engine_streaming = EngineDiferido(obtener_engine_streaming, engine_streaming_creado)
+
+# Base, Product, SessionLocal y get_db viven en orm.py y se importan recién al pedirlos
+_NOMBRES_ORM = ("Base", "Product", "SessionLocal", "get_db")
+
+
+def __getattr__(nombre):
+    if nombre in _NOMBRES_ORM:
+        import orm
+        return getattr(orm, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
 
 # Función para crear todas las tablas definidas en los modelos (si no existen)
 def create_all_tables():
-    print("\n--- Iniciando conexión y verificación/creación de tablas en MySQL ---")
+    logger.info("Iniciando conexión y verificación/creación de tablas en MySQL")
+    # Registra en Base los modelos que no se importan en otro lado (clases y planes por las FK de reservas y suscripciones)
+    import modelos.clases
+    import modelos.reservas
+    import modelos.planes
+    import modelos.suscripciones
+    import modelos.checkins
+    import modelos.auditoria
+    from orm import Base
     try:
         # Intenta conectar y crear las tablas (si no existen)
-        Base.metadata.create_all(bind=engine)
-        print("--- Verificación/Creación de tablas completada exitosamente. ---")
+        Base.metadata.create_all(bind=obtener_engine())
+        logger.info("Verificación/Creación de tablas completada exitosamente.")
     except OperationalError as e:
-        print(f"\n!!! ERROR CRÍTICO DE CONEXIÓN A MySQL: {e} !!!")
-        print("Por favor, verifica:")
-        print("- Que el servidor MySQL (XAMPP/WAMP/etc.) esté corriendo.")
-        print(f"- Que la base de datos '{MYSQL_DB}' exista.")
-        print(f"- Que el usuario '{MYSQL_USER}' y la contraseña sean correctos en database.py.")
-        print(f"- Que el host '{MYSQL_HOST}' y el puerto '{MYSQL_PORT}' sean correctos.")
-        print("No se pudo establecer la conexión a la base de datos. Las operaciones CRUD fallarán.")
+        logger.critical(
+            "ERROR CRÍTICO DE CONEXIÓN A MySQL: %s. Verifica que el servidor MySQL esté corriendo, que la base de "
+            "datos '%s' exista, que el usuario '%s' y la contraseña sean correctos y que el host '%s' y el puerto "
+            "'%s' sean correctos. Las operaciones CRUD fallarán.", e, MYSQL_DB, MYSQL_USER, MYSQL_HOST, MYSQL_PORT
+        )
     except SQLAlchemyError as e:
-        print(f"\n!!! ERROR DE SQLAlchemy al crear tablas: {e} !!!")
-        print("Asegúrate de que la configuración de la base de datos sea correcta y que no haya problemas de permisos.")
+        logger.error(
+            "ERROR DE SQLAlchemy al crear tablas: %s. Asegúrate de que la configuración de la base de datos sea "
+            "correcta y que no haya problemas de permisos.", e
+        )
     except Exception as e:
-        print(f"\n!!! ERROR INESPERADO al intentar conectar o crear tablas: {e} !!!")
+        logger.error("ERROR INESPERADO al intentar conectar o crear tablas: %s", e)
+
 
+# Función para consultar el estado del pool de conexiones (usada por /api/metricas/pool)
+def obtener_estadisticas_pool():
+    return estadisticas_pool(engine, CONFIGURACION_POOL)
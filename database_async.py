@@ -0,0 +1,36 @@
+# database_async.py
+
+import os
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_PORT, MYSQL_DB, CONFIGURACION_POOL
+
+# --- Engine async (solo para el punto de entrada ASGI, ver asgi.py) ---
+# Misma base de datos que database.engine pero con aiomysql: mientras una consulta espera a MySQL
+# el event loop sigue atendiendo otras solicitudes, en vez de tener un worker bloqueado por consulta.
+# DATABASE_URL_ASYNC permite apuntar a otra base; para probar sin MySQL sirve
+# "sqlite+aiosqlite:///ruta.db" (requiere aiosqlite).
+#
+# En asgi.py conviven los dos engines: las lecturas async usan este pool y el resto de la API
+# (la app Flask montada) usa el de database.py. El maximo de conexiones por proceso es la suma
+# de ambos; el tamano de este pool se ajusta con DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW.
+DATABASE_URL_ASYNC = os.getenv("DATABASE_URL_ASYNC") or (
+    f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+)
+
+CONFIGURACION_POOL_ASYNC = {
+    **CONFIGURACION_POOL,
+    "pool_size": int(os.getenv("DB_ASYNC_POOL_SIZE", str(CONFIGURACION_POOL["pool_size"]))),
+    "max_overflow": int(os.getenv("DB_ASYNC_MAX_OVERFLOW", str(CONFIGURACION_POOL["max_overflow"]))),
+}
+
+
+def crear_engine_async(url: str = DATABASE_URL_ASYNC, **opciones):
+    """Crea un AsyncEngine; con MySQL aplica la configuracion de pool de CONFIGURACION_POOL_ASYNC."""
+    if url.startswith("mysql"):
+        opciones = {**CONFIGURACION_POOL_ASYNC, **opciones}
+    return create_async_engine(url, **opciones)
+
+
+engine_async = crear_engine_async()
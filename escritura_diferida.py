@@ -0,0 +1,168 @@
+# escritura_diferida.py
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# --- Escritura diferida (write-behind) por lotes ---
+# Para eventos de alto volumen que no hace falta confirmar en la solicitud (check-ins, auditoria):
+# la solicitud solo encola la fila en memoria y un hilo de fondo por buffer las inserta en la DB en
+# lotes de hasta tamano_lote filas, cada intervalo segundos o antes si ya se junto un lote completo.
+# Una sola transaccion con executemany por lote reemplaza cientos de INSERT con su ida y vuelta a
+# MySQL (mysqlconnector arma un INSERT multi-fila). La cola esta acotada para no agotar la memoria del
+# worker si la DB no responde. Con la cola llena:
+#   - espera_si_lleno = 0: la fila nueva se descarta y se cuenta (ver /api/metricas/escrituras),
+#   - espera_si_lleno > 0 (contrapresion): se despierta al hilo de escritura y la solicitud espera
+#     hasta esos segundos a que se libere lugar; solo si sigue llena se descarta.
+# Al salir del proceso (atexit, tambien en el apagado ordenado de los workers) se vacian todos los buffers.
+REINTENTOS_LOTE = 3
+
+_buffers = []
+_lock_registro = threading.Lock()
+
+
+class BufferEscritura:
+    """Cola acotada de filas que un hilo de fondo inserta en lotes con `sentencia` (text con parametros)."""
+
+    def __init__(self, nombre: str, sentencia, tamano_lote: int = 500, intervalo: float = 1.0,
+                 maximo_pendientes: int = 50000, espera_si_lleno: float = 0.0):
+        self.nombre = nombre
+        self.sentencia = sentencia
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.maximo_pendientes = maximo_pendientes
+        self.espera_si_lleno = espera_si_lleno
+        self._cola = queue.Queue(maximo_pendientes)
+        self._lote_fallido = None   # (lote, intentos) que se reintenta antes de leer la cola
+        self._lock = threading.Lock()
+        self._lock_vaciado = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self._estadisticas = {"encoladas": 0, "escritas": 0, "lotes": 0, "esperas": 0, "descartadas": 0,
+                              "perdidas": 0, "errores": 0, "ultimo_lote_ms": None}
+        with _lock_registro:
+            _buffers.append(self)
+
+    def agregar(self, fila: dict) -> bool:
+        """
+        Encola la fila. Solo bloquea si la cola esta llena y el buffer tiene espera_si_lleno.
+        Devuelve False si la fila se descarto.
+        """
+        self.iniciar()
+        try:
+            self._cola.put_nowait(fila)
+        except queue.Full:
+            if self.espera_si_lleno <= 0:
+                self._estadisticas["descartadas"] += 1
+                return False
+            self._estadisticas["esperas"] += 1
+            self._despertar.set()
+            try:
+                self._cola.put(fila, timeout=self.espera_si_lleno)
+            except queue.Full:
+                self._estadisticas["descartadas"] += 1
+                return False
+        self._estadisticas["encoladas"] += 1
+        if self._cola.qsize() >= self.tamano_lote:
+            self._despertar.set()
+        return True
+
+    def _tomar_lote(self) -> list:
+        lote = []
+        while len(lote) < self.tamano_lote:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _escribir(self, lote: list, intentos: int) -> bool:
+        inicio = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(self.sentencia, lote)
+        except Exception as e:
+            self._estadisticas["errores"] += 1
+            if intentos + 1 >= REINTENTOS_LOTE:
+                self._estadisticas["perdidas"] += len(lote)
+                logger.error(f"Buffer '{self.nombre}': se descarta un lote de {len(lote)} filas tras {REINTENTOS_LOTE} intentos: {e}")
+            else:
+                self._lote_fallido = (lote, intentos + 1)
+                logger.warning(f"Buffer '{self.nombre}': error al escribir {len(lote)} filas, se reintenta: {e}")
+            return False
+        self._estadisticas["escritas"] += len(lote)
+        self._estadisticas["lotes"] += 1
+        self._estadisticas["ultimo_lote_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        return True
+
+    def vaciar(self):
+        """Escribe todo lo encolado hasta ahora. Lo usa el hilo de fondo y el cierre del proceso."""
+        with self._lock_vaciado:
+            if self._lote_fallido is not None:
+                lote, intentos = self._lote_fallido
+                self._lote_fallido = None
+                if not self._escribir(lote, intentos):
+                    return
+            while True:
+                lote = self._tomar_lote()
+                if not lote or not self._escribir(lote, 0):
+                    return
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self.vaciar()
+
+    def iniciar(self):
+        """Arranca (una vez por proceso) el hilo de escritura. Seguro de llamar despues de un fork."""
+        pid = os.getpid()
+        if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+                return
+            self._pid = pid
+            self._hilo = threading.Thread(target=self._bucle, name=f"escritura-{self.nombre}", daemon=True)
+            self._hilo.start()
+
+    def _reiniciar_en_hijo(self):
+        # Las filas encoladas antes del fork las escribe el proceso padre: el hijo empieza con la cola vacia
+        self._cola = queue.Queue(self.maximo_pendientes)
+        self._lote_fallido = None
+        self._hilo = None
+        self._pid = None
+
+    def estadisticas(self) -> dict:
+        return {**self._estadisticas, "pendientes": self._cola.qsize()}
+
+
+def vaciar_todos():
+    """Escribe lo pendiente de todos los buffers (se llama al salir del proceso)."""
+    for buffer in list(_buffers):
+        try:
+            buffer.vaciar()
+        except Exception as e:
+            logger.error(f"Error al vaciar el buffer '{buffer.nombre}' al salir: {e}")
+
+
+def _reiniciar_en_hijo():
+    for buffer in _buffers:
+        buffer._reiniciar_en_hijo()
+
+
+def estadisticas_escrituras() -> dict:
+    return {buffer.nombre: buffer.estadisticas() for buffer in _buffers}
+
+
+atexit.register(vaciar_todos)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_en_hijo)
@@ -0,0 +1,89 @@
+# gunicorn.conf.py
+
+import os
+
+# --- Configuracion de gunicorn para produccion (la usa el Procfile) ---
+# Todas las opciones se pueden cambiar con variables de entorno sin tocar este archivo.
+#
+# Procesos e hilos: la API pasa casi todo el tiempo esperando a MySQL, asi que cada worker usa
+# hilos (gthread) y el numero de workers sale de los nucleos disponibles para el proceso
+# (2 x NUCLEOS + 1, hasta GUNICORN_MAX_WORKERS).
+#
+# Estado en memoria de cada worker y como se entera de las escrituras de los demas:
+#   - versiones de tabla (cache.py): memoria compartida creada en el master (preload_app) y heredada
+#     por todos los workers; una escritura en cualquiera invalida a todos al instante,
+#   - cache de lecturas del catalogo y ETags: validados contra esas versiones compartidas,
+#   - busqueda de productos (indice_productos.py) y molinete (socios_activos.py): se actualizan en el
+#     momento con las escrituras propias y se reconstruyen en segundo plano cuando la version muestra
+#     una escritura de otro worker; mientras tanto la busqueda va sin ETag y el molinete confirma en la DB,
+#   - autocompletado y horarios de clases: se reconstruyen cuando cambia la version compartida,
+#   - escritura diferida (escritura_diferida.py): cada worker vacia sus propios buffers, tambien al
+#     reciclarse (worker_exit); lo encolado en un worker que muere sin apagado ordenado se pierde.
+# Sin preload_app cada worker tendria sus propias versiones y solo se enteraria de las escrituras
+# ajenas por los TTL (CACHE_TTL_SEGUNDOS, INDICE_PRODUCTOS_TTL, SOCIOS_ACTIVOS_TTL...).
+# NUCLEOS sale de sched_getaffinity, que respeta el limite de CPU del contenedor (os.cpu_count() no).
+# Cada worker tiene su propio pool de conexiones (ver database.py): el total de conexiones a MySQL
+# puede llegar a workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_STREAMING_POOL_SIZE +
+# DB_STREAMING_MAX_OVERFLOW) y no debe superar el limite del plan
+# de Clever Cloud. Los hilos por worker no deberian superar DB_POOL_SIZE + DB_MAX_OVERFLOW.
+try:
+    NUCLEOS = len(os.sched_getaffinity(0))
+except AttributeError:  # macOS / Windows
+    NUCLEOS = os.cpu_count() or 1
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(NUCLEOS * 2 + 1, int(os.getenv("GUNICORN_MAX_WORKERS", "8"))))))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# preload: la app se importa una sola vez en el master y los workers la heredan con fork
+# (copy-on-write), en vez de importar Flask y SQLAlchemy en cada worker. Tambien es lo que hace que
+# los workers compartan las versiones de tabla (ver arriba). Lo que no se puede compartir entre
+# procesos se rehace en post_fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "si")
+
+# Reciclado: cada worker se reemplaza tras max_requests solicitudes (+ un azar de hasta
+# max_requests_jitter para que no se reinicien todos a la vez). Acota el crecimiento de memoria
+# de los caches e indices en memoria. El worker nuevo sale de un fork del master: hereda las versiones
+# compartidas y reconstruye sus caches e indices en el primer uso.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+
+def post_fork(server, worker):
+    # Las conexiones del pool abiertas en el master (si las hubo) son sockets compartidos con el
+    # hijo: se descartan sin cerrarlas (close=False no envia el cierre a MySQL, que las
+    # romperia tambien en el master) y cada worker abre las suyas. El engine se crea en el primer
+    # uso (ver database.py): si el master no lo llego a crear no hay nada que descartar.
+    import database
+    if database.engine_creado():
+        database.obtener_engine().dispose(close=False)
+    if database.engine_streaming_creado():
+        database.obtener_engine_streaming().dispose(close=False)
+
+    # Los hilos de fondo no sobreviven al fork: se arrancan aqui para que el primer request no
+    # pague la descarga de certificados ni espere al primer barrido.
+    from routes.auth_middleware import FIREBASE_VERIFICACION_LOCAL
+    from routes.claves_firma import almacen_claves
+    from vencimientos import barrido_vencimientos
+    if FIREBASE_VERIFICACION_LOCAL:
+        almacen_claves.iniciar()
+    barrido_vencimientos.iniciar()
+
+
+def worker_exit(server, worker):
+    # Apagado ordenado (reciclado por max_requests, SIGTERM): escribe los check-ins y la
+    # auditoria que quedaron en los buffers de escritura diferida
+    from escritura_diferida import vaciar_todos
+    vaciar_todos()
+
+
+def when_ready(server):
+    server.log.info(
+        f"gunicorn listo: {workers} workers x {threads} hilos ({worker_class}), {NUCLEOS} nucleos, "
+        f"preload={preload_app}, max_requests={max_requests}+{max_requests_jitter}"
+    )
@@ -0,0 +1,44 @@
+# handlers/autocompletado_handlers.py
+
+import logging
+from sqlalchemy.exc import SQLAlchemyError
+
+from autocompletado import indice_autocompletado
+from handlers.producto_handlers import obtener_todos_productos_sp
+from handlers.plan_handlers import obtener_todos_planes_sp
+from handlers.clase_handlers import obtener_todas_clases_sp
+
+logger = logging.getLogger(__name__)
+
+# tipo de sugerencia -> (lectura cacheada de la tabla, columna id)
+FUENTES = {
+    "producto": (obtener_todos_productos_sp, "id_producto"),
+    "plan": (obtener_todos_planes_sp, "id_plan"),
+    "clase": (obtener_todas_clases_sp, "id_clase"),
+}
+
+
+def _cargar_fuentes() -> dict:
+    fuentes = {}
+    for tipo, (obtener_todos, campo_id) in FUENTES.items():
+        registros = obtener_todos()
+        if isinstance(registros, dict) and "error" in registros:
+            # Sin esa tabla se sigue sugiriendo con las demas; se reintenta en la proxima reconstruccion
+            logger.warning(f"Autocompletado sin {tipo}s: {registros['error']}")
+            continue
+        fuentes[tipo] = (registros, campo_id)
+    return fuentes
+
+
+def sugerir_nombres(prefijo: str, k: int, tipos=None):
+    """Hasta k nombres de productos, planes y clases que empiezan con el prefijo (o alguna de sus palabras)."""
+    try:
+        indice_autocompletado.asegurar_actualizado(_cargar_fuentes)
+        return indice_autocompletado.sugerir(prefijo, k, tipos)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al construir el indice de autocompletado: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener sugerencias: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener sugerencias: {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener sugerencias: {e}"}
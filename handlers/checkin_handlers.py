@@ -0,0 +1,38 @@
+# handlers/checkin_handlers.py
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from socios_activos import socios_activos
+from escritura_diferida import BufferEscritura
+
+logger = logging.getLogger(__name__)
+
+# Las pasadas por el molinete se insertan en lotes desde un hilo de fondo: el check-in responde
+# apenas valida el plan en memoria, sin esperar el INSERT
+SQL_INSERTAR_CHECKINS = text(
+    "INSERT INTO checkins (id_usuario, fecha_hora, permitido) VALUES (:id_usuario, :fecha_hora, :permitido)"
+)
+buffer_checkins = BufferEscritura("checkins", SQL_INSERTAR_CHECKINS, tamano_lote=500, intervalo=1.0)
+
+
+def registrar_checkin(id_usuario: str):
+    """Valida que el socio tenga un plan vigente y encola el registro de la pasada (permitida o no)."""
+    ahora = datetime.now().replace(microsecond=0)
+    try:
+        vence = socios_activos.vencimiento(id_usuario, ahora)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al validar el check-in: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al validar el check-in: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al validar el check-in: {e}")
+        return {"error": f"Ocurrio un error inesperado al validar el check-in: {e}"}
+
+    buffer_checkins.agregar({"id_usuario": id_usuario, "fecha_hora": ahora, "permitido": vence is not None})
+    if vence is None:
+        return {"error": "No tienes un plan vigente.", "motivo": "sin_plan", "permitido": False}
+    return {"mensaje": "Bienvenido", "permitido": True, "fecha_hora": ahora, "plan_vence": vence}
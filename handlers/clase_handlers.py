@@ -1,76 +1,66 @@
-
+import logging
 from database import engine
-from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from cache import cacheado, incrementar_version
+# ejecutar_sp abre/cierra la conexion, hace commit/rollback y deja los tipos de la DB a proveedor_json
+from utils import TAMANO_LOTE_STREAMING, ejecutar_sp, sentencia_sp, flujo_filas_sp, consultar_por_ids
+from indice_horarios import indice_horarios
+from auditoria import registrar_auditoria
+
+logger = logging.getLogger(__name__)
+
+# Columnas devueltas por la consulta por lotes
+CAMPOS_CLASE = ("id_clase", "nombre", "descripcion", "instructor", "horario", "duracion", "cupo_maximo")
 
 # --- Handler para sp_ObtenerTodasClases ---
+@cacheado("clases")
 def obtener_todas_clases_sp():
     """
     Llama al procedimiento almacenado sp_ObtenerTodasClases y devuelve los resultados.
     """
-    conn = None # Inicializa la conexion a None
     try:
-        conn = engine.connect() # Establece la conexion
-        # Define la llamada al procedimiento almacenado
-        sql_call = text("CALL sp_ObtenerTodasClases()")
-
-        # Ejecuta la llamada al procedimiento
-        with conn.execute(sql_call) as resultado:
-            # Obtiene los nombres de las columnas del resultado
-            column_keys = resultado.keys()
-            # Obtiene todas las filas del resultado
-            filas = resultado.fetchall()
-
-        # Convierte cada fila a un diccionario usando los nombres de las columnas
-        lista_clases_dict = []
-        for fila in filas:
-            clase_dict = dict(zip(column_keys, fila))
-            # No necesitamos conversiones especiales para horario (VARCHAR) u otros tipos basicos serializables por JSON
-            lista_clases_dict.append(clase_dict)
-
-        # Si todo sale bien, devuelve la lista de diccionarios
-        return lista_clases_dict
+        # Ejecuta la llamada y convierte cada fila a un diccionario usando los nombres de las columnas
+        return ejecutar_sp("sp_ObtenerTodasClases", resultado="todos")
 
     except SQLAlchemyError as e:
         # Captura errores especificos de SQLAlchemy (errores de DB)
-        print(f"Error de DB al ejecutar sp_ObtenerTodasClases: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ObtenerTodasClases: {e}")
         # Intenta obtener el mensaje de error original de la base de datos si esta disponible
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
         return {"error": f"Error al obtener todas las clases: {error_mensaje_bd}"}
     except Exception as e:
         # Captura cualquier otro error inesperado
-        print(f"Error inesperado al ejecutar sp_ObtenerTodasClases: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerTodasClases: {e}")
         return {"error": f"Ocurrio un error inesperado al obtener todas las clases: {e}"}
-    finally:
-        # Asegura que la conexion se cierre, si se llego a abrir
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (obtener_todas_clases_sp): {e_close}")
+
+
+# --- Handler para consultas por franja horaria (indice de intervalos en memoria) ---
+def obtener_clases_en_horario(desde: int, hasta: int):
+    """
+    Clases que se dictan (total o parcialmente) entre desde y hasta, en minutos del dia.
+    El indice se arma con obtener_todas_clases_sp() y se reconstruye solo cuando cambian las clases.
+    """
+    try:
+        error = indice_horarios.actualizar_si_cambio(obtener_todas_clases_sp)
+        if error:
+            return error
+        return indice_horarios.consultar(desde, hasta)
+    except Exception as e:
+        logger.error(f"Error inesperado al buscar clases por horario: {e}")
+        return {"error": f"Ocurrio un error inesperado al buscar clases por horario: {e}"}
 
 
 # --- Handler para sp_ObtenerClasePorID ---
+@cacheado("clases")
 def obtener_clase_por_id_sp(id_clase: int):
     """
     Llama al procedimiento almacenado sp_ObtenerClasePorID y devuelve el resultado.
     """
-    conn = None
     try:
-        conn = engine.connect()
-        # Define la llamada al procedimiento con un parametro de entrada
-        sql_call = text("CALL sp_ObtenerClasePorID(:p_id_clase)")
-
-        # Ejecuta la llamada, pasando el parametro como un diccionario
-        with conn.execute(sql_call, {"p_id_clase": id_clase}) as resultado:
-             # Obtiene los nombres de las columnas
-            column_keys = resultado.keys()
-            # Obtiene la primera fila (solo esperamos una o ninguna)
-            fila = resultado.fetchone()
-
-        # Si se encontro una fila, convertirla a diccionario
-        if fila:
-            clase_dict = dict(zip(column_keys, fila))
+        # Ejecuta la llamada, pasando el parametro como un diccionario (solo esperamos una fila o ninguna)
+        clase_dict = ejecutar_sp("sp_ObtenerClasePorID", {"p_id_clase": id_clase}, resultado="uno")
+
+        if clase_dict:
             return clase_dict
         else:
             # Si no se encontro ninguna fila, la clase no existe (o el ID no es valido)
@@ -80,7 +70,7 @@ def obtener_clase_por_id_sp(id_clase: int):
 
 
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_ObtenerClasePorID para ID {id_clase}: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ObtenerClasePorID para ID {id_clase}: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
 
         # --- Manejo de errores SIGNAL de la DB ---
@@ -91,14 +81,8 @@ def obtener_clase_por_id_sp(id_clase: int):
         # Si no es un error SIGNAL conocido, devuelve el error generico de DB
         return {"error": f"Error al obtener clase por ID: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_ObtenerClasePorID para ID {id_clase}: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerClasePorID para ID {id_clase}: {e}")
         return {"error": f"Ocurrio un error inesperado al obtener la clase por ID: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (obtener_clase_por_id_sp): {e_close}")
 
 
 # --- Handler para sp_AgregarClase ---
@@ -106,12 +90,7 @@ def agregar_clase_sp(nombre: str, descripcion: str | None, instructor: str, hora
     """
     Llama al procedimiento almacenado sp_AgregarClase para agregar una nueva clase.
     """
-    conn = None
     try:
-        conn = engine.connect()
-        # Define la llamada al procedimiento con parametros de entrada
-        sql_call = text("CALL sp_AgregarClase(:p_nombre, :p_descripcion, :p_instructor, :p_horario, :p_duracion, :p_cupo_maximo)")
-
         # Define los parametros como un diccionario
         parametros = {
             "p_nombre": nombre,
@@ -122,21 +101,25 @@ def agregar_clase_sp(nombre: str, descripcion: str | None, instructor: str, hora
             "p_cupo_maximo": cupo_maximo
         }
 
-        # Ejecuta la llamada. No esperamos un SELECT de este procedimiento.
-        #conn.execute(sql_call, parametros) # Execute returns a ResultProxy
-        result = conn.execute(sql_call, parametros) # Execute returns a ResultProxy
+        # Ejecuta la llamada y confirma los cambios. No esperamos un SELECT de este procedimiento.
+        ejecutar_sp("sp_AgregarClase", parametros, commit=True)
+        incrementar_version("clases") # Invalida el cache de lecturas de clases
+        registrar_auditoria("clase", "crear", detalle={
+            "nombre": nombre, "descripcion": descripcion, "instructor": instructor,
+            "horario": horario, "duracion": duracion, "cupo_maximo": cupo_maximo
+        })
 
         # Dado que tu SP no devuelve explicitamente el ID de forma sencilla, solo confirmamos el exito.
         return {"message": "Clase agregada exitosamente."} # , "id_agregada": new_id # Si pudiste obtener el ID
 
     except IntegrityError as e:
          # Captura errores de integridad (ej: clave primaria duplicada si ID no es autoincremental y lo pasas, etc.)
-         print(f"Error de integridad al agregar clase: {e}")
+         logger.error(f"Error de integridad al agregar clase: {e}")
          error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
          return {"error": f"Error de datos al agregar clase: {error_mensaje_bd}"}
     except SQLAlchemyError as e:
         # Captura errores especificos de DB, incluyendo los de SIGNAL SQLSTATE
-        print(f"Error de DB al ejecutar sp_AgregarClase: {e}")
+        logger.error(f"Error de DB al ejecutar sp_AgregarClase: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
 
         # --- Manejo de errores SIGNAL de la DB ---
@@ -154,17 +137,8 @@ def agregar_clase_sp(nombre: str, descripcion: str | None, instructor: str, hora
         return {"error": f"Error al agregar clase: {error_mensaje_bd}"}
     except Exception as e:
         # Captura cualquier otro error inesperado
-        print(f"Error inesperado al ejecutar sp_AgregarClase: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_AgregarClase: {e}")
         return {"error": f"Ocurrio un error inesperado al agregar la clase: {e}"}
-    finally:
-        # Asegura que la conexion se cierre, si se llego a abrir
-        if conn:
-            try:
-                 # Para operaciones de modificacion (INSERT, UPDATE, DELETE), necesitas hacer commit
-                conn.commit() # Confirma los cambios en la base de datos
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (agregar_clase_sp): {e_close}")
 
 
 # --- Handler para sp_ActualizarClase ---
@@ -172,12 +146,7 @@ def actualizar_clase_sp(id_clase: int, nombre: str, descripcion: str | None, ins
     """
     Llama al procedimiento almacenado sp_ActualizarClase para actualizar una clase existente.
     """
-    conn = None
     try:
-        conn = engine.connect()
-        # Define la llamada al procedimiento con parametros de entrada
-        sql_call = text("CALL sp_ActualizarClase(:p_id_clase, :p_nombre, :p_descripcion, :p_instructor, :p_horario, :p_duracion, :p_cupo_maximo)")
-
         # Define los parametros como un diccionario
         parametros = {
             "p_id_clase": id_clase,
@@ -189,13 +158,14 @@ def actualizar_clase_sp(id_clase: int, nombre: str, descripcion: str | None, ins
             "p_cupo_maximo": cupo_maximo
         }
 
-        # Ejecuta la llamada. No esperamos un SELECT.
-        result = conn.execute(sql_call, parametros) # Execute returns a ResultProxy
-
-        # Puedes verificar result.rowcount despues de ejecutar para saber si se afecto 1 fila
-        # result.rowcount sera el numero de filas actualizadas por el UPDATE
-        # Si el SP tiene la validacion de ID no existente, result.rowcount sera 0 en ese caso,
-        # pero el SP con SIGNAL ya devuelve un error en ese caso, que capturamos abajo.
+        # Ejecuta la llamada y confirma los cambios. No esperamos un SELECT.
+        # Si el SP tiene la validacion de ID no existente, el SIGNAL devuelve un error que capturamos abajo.
+        ejecutar_sp("sp_ActualizarClase", parametros, commit=True)
+        incrementar_version("clases")
+        registrar_auditoria("clase", "actualizar", id_clase, {
+            "nombre": nombre, "descripcion": descripcion, "instructor": instructor,
+            "horario": horario, "duracion": duracion, "cupo_maximo": cupo_maximo
+        })
 
         # Si la ejecucion llega aqui sin excepcion, se considera exitosa.
         return {"message": f"Clase con ID {id_clase} actualizada exitosamente."}
@@ -203,7 +173,7 @@ def actualizar_clase_sp(id_clase: int, nombre: str, descripcion: str | None, ins
 
     except SQLAlchemyError as e:
         # Captura errores especificos de DB, incluyendo los de SIGNAL SQLSTATE
-        print(f"Error de DB al ejecutar sp_ActualizarClase para ID {id_clase}: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ActualizarClase para ID {id_clase}: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
 
         # --- Manejo de errores SIGNAL de la DB ---
@@ -219,15 +189,8 @@ def actualizar_clase_sp(id_clase: int, nombre: str, descripcion: str | None, ins
         return {"error": f"Error al actualizar clase: {error_mensaje_bd}"}
     except Exception as e:
         # Captura cualquier otro error inesperado
-        print(f"Error inesperado al ejecutar sp_ActualizarClase para ID {id_clase}: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_ActualizarClase para ID {id_clase}: {e}")
         return {"error": f"Ocurrio un error inesperado al actualizar la clase: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.commit() # Confirma los cambios
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (actualizar_clase_sp): {e_close}")
 
 
 # --- Handler para sp_EliminarClase ---
@@ -235,20 +198,17 @@ def eliminar_clase_sp(id_clase: int):
     """
     Llama al procedimiento almacenado sp_EliminarClase para eliminar una clase existente.
     """
-    conn = None
     try:
-        conn = engine.connect()
-        # Define la llamada al procedimiento con un parametro de entrada
-        sql_call = text("CALL sp_EliminarClase(:p_id_clase)")
-
-        # Ejecuta la llamada, pasando el parametro
-        result = conn.execute(sql_call, {"p_id_clase": id_clase}) # Execute returns a ResultProxy
+        # Ejecuta la llamada, pasando el parametro, y confirma la eliminacion
+        ejecutar_sp("sp_EliminarClase", {"p_id_clase": id_clase}, commit=True)
+        incrementar_version("clases")
+        registrar_auditoria("clase", "eliminar", id_clase)
 
         return {"message": f"Clase con ID {id_clase} eliminada exitosamente."}
 
     except SQLAlchemyError as e:
         # Captura errores especificos de DB, incluyendo los de SIGNAL SQLSTATE
-        print(f"Error de DB al ejecutar sp_EliminarClase para ID {id_clase}: {e}")
+        logger.error(f"Error de DB al ejecutar sp_EliminarClase para ID {id_clase}: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
 
          # --- Manejo de errores SIGNAL de la DB ---
@@ -262,12 +222,47 @@ def eliminar_clase_sp(id_clase: int):
         return {"error": f"Error al eliminar clase: {error_mensaje_bd}"}
     except Exception as e:
         # Captura cualquier otro error inesperado
-        print(f"Error inesperado al ejecutar sp_EliminarClase para ID {id_clase}: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_EliminarClase para ID {id_clase}: {e}")
         return {"error": f"Ocurrio un error inesperado al eliminar la clase: {e}"}
+
+
+# --- Handler en modo streaming para sp_ObtenerTodasClases ---
+def flujo_todas_clases_sp(tamano_lote: int = TAMANO_LOTE_STREAMING):
+    """
+    Igual que obtener_todas_clases_sp pero devuelve un FlujoFilas (diccionarios leidos por lotes) para
+    exportaciones grandes: el JSON se arma por partes. Quien lo usa debe llamar a su close().
+    """
+    try:
+        return flujo_filas_sp(sentencia_sp("sp_ObtenerTodasClases"), tamano_lote=tamano_lote)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al ejecutar sp_ObtenerTodasClases (streaming): {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener todas las clases: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerTodasClases (streaming): {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener todas las clases: {e}"}
+
+
+# --- Handler para la consulta por lotes de clases ---
+def obtener_clases_por_ids(ids: list):
+    """
+    Obtiene varias clases en una sola consulta (WHERE id_clase IN (...)).
+    Devuelve {"items": [...en el orden pedido...], "faltantes": [ids inexistentes]}.
+    """
+    conn = None
+    try:
+        conn = engine.connect()
+        return consultar_por_ids(conn, "clases", "id_clase", CAMPOS_CLASE, ids)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al obtener clases por lote: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener clases por lote: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener clases por lote: {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener clases por lote: {e}"}
     finally:
         if conn:
             try:
-                conn.commit() # Confirma la eliminacion
                 conn.close()
             except Exception as e_close:
-                print(f"Error al cerrar conexion (eliminar_clase_sp): {e_close}")
\ No newline at end of file
+                logger.warning(f"Error al cerrar conexion (obtener_clases_por_ids): {e_close}")
@@ -0,0 +1,81 @@
+#handlers/lectura_async_handlers.py
+
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from cache import obtener_o_cargar_async
+from database_async import engine_async
+from utils import CAMPOS_PRODUCTO, mapear_filas, sentencia_por_ids, ordenar_por_ids
+from handlers.plan_handlers import CAMPOS_PLAN
+from handlers.clase_handlers import CAMPOS_CLASE
+
+logger = logging.getLogger(__name__)
+
+# --- Lecturas del catalogo con el engine async (las usa asgi.py) ---
+# Mismas respuestas que los handlers sincronos de productos, planes y clases, pero con SELECT
+# simples sobre las columnas de CAMPOS_* en lugar de los procedimientos almacenados: aiomysql no
+# expone callproc de forma portable y un SELECT por clave primaria es lo mismo que hacen esos SP.
+# Usan el mismo cache versionado (cache.py) que las rutas Flask, bajo claves propias: una escritura
+# hecha por la app Flask montada en asgi.py invalida tambien estas lecturas.
+TABLAS = {
+    # tabla -> (columna id, columnas, mensaje si no existe, entidad para los mensajes de error)
+    "productos": ("id_producto", CAMPOS_PRODUCTO, "Producto con ID {} no encontrado.", "productos"),
+    "planes": ("id_plan", CAMPOS_PLAN, "Plan con ID {} no encontrado.", "planes"),
+    "clases": ("id_clase", CAMPOS_CLASE, "Clase con ID {} no encontrada.", "clases"),
+}
+
+
+def _error_bd(accion: str, e: Exception) -> dict:
+    if isinstance(e, SQLAlchemyError):
+        logger.error(f"Error de DB al {accion}: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al {accion}: {error_mensaje_bd}"}
+    logger.error(f"Error inesperado al {accion}: {e}")
+    return {"error": f"Ocurrio un error inesperado al {accion}: {e}"}
+
+
+async def _consultar(sql_call, parametros: dict | None = None) -> list:
+    async with engine_async.connect() as conn:
+        resultado = await conn.execute(sql_call, parametros or {})
+        return mapear_filas(tuple(resultado.keys()), resultado.fetchall())
+
+
+async def obtener_todos_async(tabla: str):
+    """Todas las filas de la tabla, ordenadas por id (lista, o {"error": ...})."""
+    columna_id, columnas, _, entidad = TABLAS[tabla]
+    sql_call = text(f"SELECT {', '.join(columnas)} FROM {tabla} ORDER BY {columna_id}")
+
+    async def cargar():
+        try:
+            return await _consultar(sql_call)
+        except Exception as e:
+            return _error_bd(f"obtener todos los {entidad}", e)
+
+    return await obtener_o_cargar_async(tabla, ("obtener_todos_async",), cargar)
+
+
+async def obtener_por_id_async(tabla: str, id_fila: int) -> dict:
+    """La fila con ese id, {"message": "... no encontrado."} si no existe o {"error": ...}."""
+    columna_id, columnas, no_encontrado, entidad = TABLAS[tabla]
+    sql_call = text(f"SELECT {', '.join(columnas)} FROM {tabla} WHERE {columna_id} = :p_id")
+
+    async def cargar():
+        try:
+            filas = await _consultar(sql_call, {"p_id": id_fila})
+        except Exception as e:
+            return _error_bd(f"obtener {entidad} por ID", e)
+        return filas[0] if filas else {"message": no_encontrado.format(id_fila)}
+
+    return await obtener_o_cargar_async(tabla, ("obtener_por_id_async", id_fila), cargar)
+
+
+async def obtener_por_ids_async(tabla: str, ids: list) -> dict:
+    """Varias filas en un solo SELECT ... IN: {"items": [...en el orden pedido...], "faltantes": [...]}."""
+    columna_id, columnas, _, entidad = TABLAS[tabla]
+    try:
+        async with engine_async.connect() as conn:
+            resultado = await conn.execute(sentencia_por_ids(tabla, columna_id, columnas), {"p_ids": ids})
+            return ordenar_por_ids(columna_id, tuple(resultado.keys()), resultado.fetchall(), ids)
+    except Exception as e:
+        return _error_bd(f"obtener {entidad} por lote", e)
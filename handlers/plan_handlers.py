@@ -1,11 +1,20 @@
 # handlers/plan_handlers.py
 
-from sqlalchemy import text # Para ejecutar SQL crudo
+import logging
 from sqlalchemy.exc import SQLAlchemyError # Importa el tipo base de error de SQLAlchemy
 from database import engine # Importa el engine (AJUSTA LA RUTA SI ES NECESARIO si no esta en la raiz)
-from decimal import Decimal # Para manejar Decimal en los resultados (precio)
+from decimal import Decimal # Para el tipo del parametro precio
+from cache import cacheado, incrementar_version # Cache de lecturas versionado por tabla
+from auditoria import registrar_auditoria # Registro de quien escribio, en lotes y fuera de la solicitud
+# ejecutar_sp abre/cierra la conexion y hace commit/rollback; el precio (Decimal) lo serializa proveedor_json
+from utils import TAMANO_LOTE_STREAMING, ejecutar_sp, sentencia_sp, flujo_filas_sp, consultar_por_ids
+
+logger = logging.getLogger(__name__)
 # No necesitamos 'datetime' ni 'timedelta' porque la tabla planes ya no tiene TIMESTAMP
 
+# Columnas devueltas por la consulta por lotes (mismas que expone sp_ObtenerPlanPorID)
+CAMPOS_PLAN = ("id_plan", "nombre", "descripcion", "precio", "duracion_dias")
+
 
 # --- Handler para sp_AgregarPlan ---
 def agregar_plan_sp(
@@ -15,100 +24,52 @@ def agregar_plan_sp(
     duracion_dias: int
 ):
     """Ejecuta el procedimiento almacenado sp_AgregarPlan."""
-    conn = None
     try:
-        conn = engine.connect()
-        sql_call = text("CALL sp_AgregarPlan(:p_nombre, :p_descripcion, :p_precio, :p_duracion_dias)")
-        conn.execute(sql_call, {
+        ejecutar_sp("sp_AgregarPlan", {
             "p_nombre": nombre, "p_descripcion": descripcion, "p_precio": precio,
             "p_duracion_dias": duracion_dias # Corregido el nombre del parametro a p_duracion_dias
+        }, commit=True) # ¡IMPORTANTE! Confirmar la transaccion para guardar los cambios
+        incrementar_version("planes") # Invalida el cache de lecturas de planes
+        registrar_auditoria("plan", "crear", detalle={
+            "nombre": nombre, "descripcion": descripcion, "precio": precio, "duracion_dias": duracion_dias
         })
-        conn.commit() # ¡IMPORTANTE! Confirmar la transaccion para guardar los cambios
         
         return {"mensaje": "Plan agregado con exito"}
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_AgregarPlan: {e}")
+        # ejecutar_sp ya revirtio la transaccion
+        logger.error(f"Error de DB al ejecutar sp_AgregarPlan: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
-        if conn:
-            conn.rollback() # Revertir la transaccion en caso de error
         return {"error": f"Error al agregar plan: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_AgregarPlan: {e}")
-        if conn:
-            conn.rollback() # Revertir la transaccion en caso de error
+        logger.error(f"Error inesperado al ejecutar sp_AgregarPlan: {e}")
         return {"error": f"Ocurrio un error inesperado al agregar plan: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (agregar_plan_sp): {e_close}")
 
 
 # --- Handler para sp_ObtenerTodosPlanes ---
+@cacheado("planes")
 def obtener_todos_planes_sp(): # Nombre de la funcion corregido
     """Ejecuta el procedimiento almacenado sp_ObtenerTodosPlanes."""
-    conn = None
     try:
-        conn = engine.connect()
-        sql_call = text("CALL sp_ObtenerTodosPlanes()")
-
-        lista_planes_dict = []
-        with conn.execute(sql_call) as resultado:
-            column_keys = resultado.keys()
-            filas = resultado.fetchall()
-
-        for fila in filas:
-            plan_dict = dict(zip(column_keys, fila))
-
-            # Convertir tipos de datos de DB a formatos compatibles con JSON
-            if isinstance(plan_dict.get('precio'), Decimal):
-                plan_dict['precio'] = str(plan_dict['precio']) # Convertir Decimal a string
-            
-            # Se elimina la logica para 'fecha_alta'
-            
-            lista_planes_dict.append(plan_dict)
-
-        return lista_planes_dict # Devuelve la lista de diccionarios
+        # Devuelve la lista de diccionarios (precio como Decimal: proveedor_json lo serializa como string)
+        return ejecutar_sp("sp_ObtenerTodosPlanes", resultado="todos")
 
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_ObtenerTodosPlanes: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ObtenerTodosPlanes: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
         return {"error": f"Error al obtener todos los planes: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_ObtenerTodosPlanes: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerTodosPlanes: {e}")
         return {"error": f"Ocurrio un error inesperado al obtener todos los planes: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (obtener_todos_planes_sp): {e_close}")
 
 
 # --- Handler para sp_ObtenerPlanPorID ---
+@cacheado("planes")
 def obtener_plan_por_id_sp(id_plan: int):
     """Ejecuta el procedimiento almacenado sp_ObtenerPlanPorID."""
-    conn = None
     try:
-        conn = engine.connect()
-        sql_call = text("CALL sp_ObtenerPlanPorID(:p_id_plan)")
-
-        fila = None # Inicializa fila fuera del 'with'
-        with conn.execute(sql_call, {"p_id_plan": id_plan}) as resultado:
-            column_keys = resultado.keys()
-            fila = resultado.fetchone() # Obtener la fila DENTRO del bloque 'with'
-
-        # Procesar el resultado (la 'fila' ya fue obtenida antes de salir del 'with')
-        if fila:
-            plan_dict = dict(zip(column_keys, fila))
-
-            # Convertir tipos de datos de DB a formatos compatibles con JSON
-            if isinstance(plan_dict.get('precio'), Decimal):
-                plan_dict['precio'] = str(plan_dict['precio']) # Convertir Decimal a string
-            
-            # Se elimina la logica para 'fecha_alta'
-            
+        plan_dict = ejecutar_sp("sp_ObtenerPlanPorID", {"p_id_plan": id_plan}, resultado="uno")
+
+        if plan_dict:
             return plan_dict # Devuelve el diccionario del plan
         else:
             # Si no se encontro ninguna fila, el plan no existe (o el ID no es valido)
@@ -116,21 +77,15 @@ def obtener_plan_por_id_sp(id_plan: int):
             return {"message": f"Plan con ID {id_plan} no encontrado."}
 
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_ObtenerPlanPorID: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ObtenerPlanPorID: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
         # Si el procedimiento usa SIGNAL SQLSTATE '45000' para ID invalido, el mensaje estara aqui.
         if "Se requiere un ID de plan valido." in error_mensaje_bd: # Mensaje del SIGNAL en el SP
             return {"error": "El ID de plan proporcionado no es valido."}
         return {"error": f"Error al obtener plan por ID: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_ObtenerPlanPorID: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerPlanPorID: {e}")
         return {"error": f"Ocurrio un error inesperado al obtener plan por ID: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (obtener_plan_por_id_sp): {e_close}")
 
 
 # --- Handler para sp_ActualizarPlan ---
@@ -142,61 +97,81 @@ def actualizar_plan_sp(
     duracion_dias: int
 ):
     """Ejecuta el procedimiento almacenado sp_ActualizarPlan."""
-    conn = None
     try:
-        conn = engine.connect()
-        sql_call = text("CALL sp_ActualizarPlan(:p_id_plan, :p_nombre, :p_descripcion, :p_precio, :p_duracion_dias)")
-        conn.execute(sql_call, {
+        ejecutar_sp("sp_ActualizarPlan", {
             "p_id_plan": id_plan, "p_nombre": nombre, "p_descripcion": descripcion,
             "p_precio": precio, "p_duracion_dias": duracion_dias
+        }, commit=True) # ¡IMPORTANTE! Confirmar la transaccion para guardar los cambios
+        incrementar_version("planes") # Invalida el cache de lecturas de planes
+        registrar_auditoria("plan", "actualizar", id_plan, {
+            "nombre": nombre, "descripcion": descripcion, "precio": precio, "duracion_dias": duracion_dias
         })
-        conn.commit() # ¡IMPORTANTE! Confirmar la transaccion para guardar los cambios
         
         return {"mensaje": "Plan actualizado con exito"}
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_ActualizarPlan: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ActualizarPlan: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
-        if conn:
-            conn.rollback() # Revertir la transaccion en caso de error
         return {"error": f"Error al actualizar plan: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_ActualizarPlan: {e}")
-        if conn:
-            conn.rollback() # Revertir la transaccion en caso de error
+        logger.error(f"Error inesperado al ejecutar sp_ActualizarPlan: {e}")
         return {"error": f"Ocurrio un error inesperado al actualizar plan: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (actualizar_plan_sp): {e_close}")
 
 
 # --- Handler para sp_EliminarPlan ---
 def eliminar_plan_sp(id_plan: int):
     """Ejecuta el procedimiento almacenado sp_EliminarPlan."""
-    conn = None
     try:
-        conn = engine.connect()
-        sql_call = text("CALL sp_EliminarPlan(:p_id_plan)")
-        conn.execute(sql_call, {"p_id_plan": id_plan})
-        conn.commit() # ¡IMPORTANTE! Confirmar la transaccion para guardar los cambios
+        ejecutar_sp("sp_EliminarPlan", {"p_id_plan": id_plan}, commit=True) # ¡IMPORTANTE! Confirmar la transaccion
+        incrementar_version("planes") # Invalida el cache de lecturas de planes
+        registrar_auditoria("plan", "eliminar", id_plan)
         
         return {"mensaje": "Plan eliminado con exito"}
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_EliminarPlan: {e}")
+        logger.error(f"Error de DB al ejecutar sp_EliminarPlan: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
-        if conn:
-            conn.rollback() # Revertir la transaccion en caso de error
         return {"error": f"Error al eliminar plan: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_EliminarPlan: {e}")
-        if conn:
-            conn.rollback() # Revertir la transaccion en caso de error
+        logger.error(f"Error inesperado al ejecutar sp_EliminarPlan: {e}")
         return {"error": f"Ocurrio un error inesperado al eliminar plan: {e}"}
+
+
+# --- Handler en modo streaming para sp_ObtenerTodosPlanes ---
+def flujo_todos_planes_sp(tamano_lote: int = TAMANO_LOTE_STREAMING):
+    """
+    Igual que obtener_todos_planes_sp pero devuelve un FlujoFilas (diccionarios leidos por lotes) para
+    exportaciones grandes: el JSON se arma por partes. Quien lo usa debe llamar a su close().
+    """
+    try:
+        return flujo_filas_sp(sentencia_sp("sp_ObtenerTodosPlanes"), tamano_lote=tamano_lote)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al ejecutar sp_ObtenerTodosPlanes (streaming): {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener todos los planes: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerTodosPlanes (streaming): {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener todos los planes: {e}"}
+
+
+# --- Handler para la consulta por lotes de planes ---
+def obtener_planes_por_ids(ids: list):
+    """
+    Obtiene varios planes en una sola consulta (WHERE id_plan IN (...)).
+    Devuelve {"items": [...en el orden pedido...], "faltantes": [ids inexistentes]}.
+    """
+    conn = None
+    try:
+        conn = engine.connect()
+        return consultar_por_ids(conn, "planes", "id_plan", CAMPOS_PLAN, ids)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al obtener planes por lote: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener planes por lote: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener planes por lote: {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener planes por lote: {e}"}
     finally:
         if conn:
             try:
                 conn.close()
             except Exception as e_close:
-                print(f"Error al cerrar conexion (eliminar_plan_sp): {e_close}")
+                logger.warning(f"Error al cerrar conexion (obtener_planes_por_ids): {e_close}")
@@ -1,9 +1,25 @@
 # handlers/producto_handlers.py
 
-from sqlalchemy import text
+import logging
+from sqlalchemy import text, table, column, insert, bindparam, Numeric
 from sqlalchemy.exc import SQLAlchemyError
 from database import engine
 from decimal import Decimal
+from cache import cacheado, incrementar_version
+from indice_productos import indice_productos
+from auditoria import registrar_auditoria
+from utils import (
+    CAMPOS_PRODUCTO, TAMANO_LOTE_STREAMING, ejecutar_sp, sentencia_sp, mapear_filas, flujo_filas_sp, consultar_por_ids
+)
+
+logger = logging.getLogger(__name__)
+
+# Tabla liviana (sin ORM) para el INSERT de varias filas en una sola sentencia
+tabla_productos = table(
+    "productos",
+    column("nombre"), column("descripcion"), column("precio", Numeric(10, 2)), column("stock"), column("imagen_url")
+)
+TAMANO_LOTE_BULK = 500
 
 # --- Handler para sp_AgregarProducto ---
 def agregar_producto_sp(
@@ -14,126 +30,77 @@ def agregar_producto_sp(
     imagen_url: str | None # ¡Añadimos imagen_url como parámetro!
 ):
     """Ejecuta el procedimiento almacenado sp_AgregarProducto."""
-    conn = None
     try:
-        conn = engine.connect()
-        # Modificamos la llamada al SP para incluir el nuevo parámetro
-        sql_call = text("CALL sp_AgregarProducto(:p_nombre, :p_descripcion, :p_precio, :p_stock, :p_imagen_url)")
-        conn.execute(sql_call, {
+        ejecutar_sp("sp_AgregarProducto", {
             "p_nombre": nombre,
             "p_descripcion": descripcion,
             "p_precio": precio,
             "p_stock": stock,
             "p_imagen_url": imagen_url # ¡Pasamos el nuevo parámetro!
+        }, commit=True) # ¡IMPORTANTE! Confirmar la transaccion para guardar los cambios
+        incrementar_version("productos") # Invalida el cache de lecturas del catalogo
+        indice_productos.registrar_altas() # La proxima busqueda indexa los productos nuevos
+        registrar_auditoria("producto", "crear", detalle={
+            "nombre": nombre, "descripcion": descripcion, "precio": precio, "stock": stock, "imagen_url": imagen_url
         })
-        conn.commit() # ¡IMPORTANTE! Confirmar la transaccion para guardar los cambios
         
         return {"mensaje": "Producto agregado con exito"}
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_AgregarProducto: {e}")
+        logger.error(f"Error de DB al ejecutar sp_AgregarProducto: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
-        if conn:
-            conn.rollback()
         return {"error": f"Error al agregar producto: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_AgregarProducto: {e}")
-        if conn:
-            conn.rollback()
+        logger.error(f"Error inesperado al ejecutar sp_AgregarProducto: {e}")
         return {"error": f"Ocurrio un error inesperado al agregar producto: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (agregar_producto_sp): {e_close}")
 
 
 # --- Handler para sp_ObtenerTodosProductos ---
+@cacheado("productos")
 def obtener_todos_productos_sp():
     """Ejecuta el procedimiento almacenado sp_ObtenerTodosProductos."""
-    conn = None
     try:
-        conn = engine.connect()
-        sql_call = text("CALL sp_ObtenerTodosProductos()")
-
-        lista_productos_dict = []
-        with conn.execute(sql_call) as resultado:
-            column_keys = resultado.keys()
-            filas = resultado.fetchall()
+        # precio llega como Decimal; proveedor_json lo serializa como string al responder
+        lista_productos_dict = ejecutar_sp("sp_ObtenerTodosProductos", resultado="todos")
 
-        for fila in filas:
-            producto_dict = dict(zip(column_keys, fila))
-
-            # Convertir tipos de datos de DB a formatos compatibles con JSON
-            if isinstance(producto_dict.get('precio'), Decimal):
-                producto_dict['precio'] = str(producto_dict['precio']) # Convertir Decimal a string
-            
-            # Asegurarse de que imagen_url esté presente (aunque sea None)
-            # o manejarla si no la devuelve el SP (lo ideal es que sí la devuelva)
-            # Si tu SP la devuelve, no necesitas esta línea, pero la dejo como seguridad.
-            # Si tu SP ya devuelve 'imagen_url', esta línea no causa problema.
-            producto_dict['imagen_url'] = producto_dict.get('imagen_url') 
-            
-            lista_productos_dict.append(producto_dict)
+        # Asegurarse de que imagen_url esté presente (aunque sea None) si el SP no la devuelve
+        if lista_productos_dict and 'imagen_url' not in lista_productos_dict[0]:
+            for producto_dict in lista_productos_dict:
+                producto_dict['imagen_url'] = None
 
         return lista_productos_dict
 
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_ObtenerTodosProductos: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ObtenerTodosProductos: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
         return {"error": f"Error al obtener todos los productos: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_ObtenerTodosProductos: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerTodosProductos: {e}")
         return {"error": f"Ocurrio un error inesperado al obtener todos los productos: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (obtener_todos_productos_sp): {e_close}")
 
 
 # --- Handler para sp_ObtenerProductoPorID ---
+@cacheado("productos")
 def obtener_producto_por_id_sp(id_producto: int):
     """Ejecuta el procedimiento almacenado sp_ObtenerProductoPorID."""
-    conn = None
     try:
-        conn = engine.connect()
-        sql_call = text("CALL sp_ObtenerProductoPorID(:p_id_producto)")
-
-        fila = None
-        with conn.execute(sql_call, {"p_id_producto": id_producto}) as resultado:
-            column_keys = resultado.keys()
-            fila = resultado.fetchone()
+        producto_dict = ejecutar_sp("sp_ObtenerProductoPorID", {"p_id_producto": id_producto}, resultado="uno")
 
-        if fila:
-            producto_dict = dict(zip(column_keys, fila))
-
-            if isinstance(producto_dict.get('precio'), Decimal):
-                producto_dict['precio'] = str(producto_dict['precio'])
-            
+        if producto_dict:
             # Asegurarse de que imagen_url esté presente
-            producto_dict['imagen_url'] = producto_dict.get('imagen_url')
-
+            producto_dict.setdefault('imagen_url', None)
             return producto_dict
         else:
             return {"message": f"Producto con ID {id_producto} no encontrado."}
 
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_ObtenerProductoPorID: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ObtenerProductoPorID: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
         if "Se requiere un ID de producto valido." in error_mensaje_bd:
             return {"error": "El ID de producto proporcionado no es valido."}
         return {"error": f"Error al obtener producto por ID: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_ObtenerProductoPorID: {e}")
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerProductoPorID: {e}")
         return {"error": f"Ocurrio un error inesperado al obtener producto por ID: {e}"}
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except Exception as e_close:
-                print(f"Error al cerrar conexion (obtener_producto_por_id_sp): {e_close}")
 
 
 # --- Handler para sp_ActualizarProducto ---
@@ -146,66 +113,276 @@ def actualizar_producto_sp(
     imagen_url: str | None # ¡Añadimos imagen_url como parámetro!
 ):
     """Ejecuta el procedimiento almacenado sp_ActualizarProducto."""
-    conn = None
     try:
-        conn = engine.connect()
-        # Modificamos la llamada al SP para incluir el nuevo parámetro
-        sql_call = text("CALL sp_ActualizarProducto(:p_id_producto, :p_nombre, :p_descripcion, :p_precio, :p_stock, :p_imagen_url)")
-        conn.execute(sql_call, {
+        ejecutar_sp("sp_ActualizarProducto", {
             "p_id_producto": id_producto,
             "p_nombre": nombre,
             "p_descripcion": descripcion,
             "p_precio": precio,
             "p_stock": stock,
             "p_imagen_url": imagen_url # ¡Pasamos el nuevo parámetro!
+        }, commit=True)
+        incrementar_version("productos")
+        indice_productos.actualizar_producto({
+            "id_producto": id_producto, "nombre": nombre, "descripcion": descripcion,
+            "precio": precio, "stock": stock, "imagen_url": imagen_url
+        })
+        registrar_auditoria("producto", "actualizar", id_producto, {
+            "nombre": nombre, "descripcion": descripcion, "precio": precio, "stock": stock, "imagen_url": imagen_url
         })
-        conn.commit()
         
         return {"mensaje": "Producto actualizado con exito"}
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_ActualizarProducto: {e}")
+        logger.error(f"Error de DB al ejecutar sp_ActualizarProducto: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
-        if conn:
-            conn.rollback()
         return {"error": f"Error al actualizar producto: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_ActualizarProducto: {e}")
-        if conn:
-            conn.rollback()
+        logger.error(f"Error inesperado al ejecutar sp_ActualizarProducto: {e}")
         return {"error": f"Ocurrio un error inesperado al actualizar producto: {e}"}
+
+
+# --- Handler para sp_EliminarProducto ---
+def eliminar_producto_sp(id_producto: int):
+    """Ejecuta el procedimiento almacenado sp_EliminarProducto."""
+    try:
+        ejecutar_sp("sp_EliminarProducto", {"p_id_producto": id_producto}, commit=True)
+        incrementar_version("productos")
+        indice_productos.eliminar_producto(id_producto)
+        registrar_auditoria("producto", "eliminar", id_producto)
+        
+        return {"mensaje": "Producto eliminado con exito"}
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al ejecutar sp_EliminarProducto: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al eliminar producto: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al ejecutar sp_EliminarProducto: {e}")
+        return {"error": f"Ocurrio un error inesperado al eliminar producto: {e}"}
+
+
+# --- Handler para el listado paginado de productos (keyset sobre id_producto) ---
+def obtener_productos_paginados(
+    limite: int,
+    despues_de_id: int | None = None,
+    campos: list | None = None,
+    precio_min: Decimal | None = None,
+    precio_max: Decimal | None = None,
+    solo_con_stock: bool = False
+):
+    """
+    Devuelve una pagina de productos ordenada por id_producto con los filtros aplicados en SQL.
+    Solo se leen limite + 1 filas (la extra indica si hay pagina siguiente), asi que la memoria
+    por solicitud depende del tamaño de pagina y no del tamaño del catalogo.
+    """
+    # id_producto siempre se selecciona porque es el cursor; los nombres vienen de CAMPOS_PRODUCTO
+    columnas = ["id_producto"] + [c for c in (campos or CAMPOS_PRODUCTO) if c != "id_producto"]
+    condiciones = []
+    parametros = {"p_limite": limite + 1}
+    if despues_de_id is not None:
+        condiciones.append("id_producto > :p_despues_de_id")
+        parametros["p_despues_de_id"] = despues_de_id
+    if precio_min is not None:
+        condiciones.append("precio >= :p_precio_min")
+        parametros["p_precio_min"] = precio_min
+    if precio_max is not None:
+        condiciones.append("precio <= :p_precio_max")
+        parametros["p_precio_max"] = precio_max
+    if solo_con_stock:
+        condiciones.append("stock > 0")
+
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = text(f"SELECT {', '.join(columnas)} FROM productos {where} ORDER BY id_producto LIMIT :p_limite")
+
+    conn = None
+    try:
+        conn = engine.connect()
+        with conn.execute(sql, parametros) as resultado:
+            column_keys = tuple(resultado.keys())
+            filas = resultado.fetchall()
+
+        items = mapear_filas(column_keys, filas[:limite])
+
+        siguiente = items[-1]["id_producto"] if len(filas) > limite else None
+        return {"items": items, "next": siguiente}
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al obtener la pagina de productos: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener productos: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener la pagina de productos: {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener productos: {e}"}
     finally:
         if conn:
             try:
                 conn.close()
             except Exception as e_close:
-                print(f"Error al cerrar conexion (actualizar_producto_sp): {e_close}")
+                logger.warning(f"Error al cerrar conexion (obtener_productos_paginados): {e_close}")
 
 
-# --- Handler para sp_EliminarProducto ---
-def eliminar_producto_sp(id_producto: int):
-    """Ejecuta el procedimiento almacenado sp_EliminarProducto."""
+# --- Handler en modo streaming para sp_ObtenerTodosProductos ---
+def flujo_todos_productos_sp(tamano_lote: int = TAMANO_LOTE_STREAMING):
+    """
+    Igual que obtener_todos_productos_sp pero devuelve un FlujoFilas (diccionarios leidos por lotes) para
+    exportaciones grandes: el JSON se arma por partes. Quien lo usa debe llamar a su close().
+    """
+    try:
+        return flujo_filas_sp(sentencia_sp("sp_ObtenerTodosProductos"), tamano_lote=tamano_lote)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al ejecutar sp_ObtenerTodosProductos (streaming): {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener todos los productos: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al ejecutar sp_ObtenerTodosProductos (streaming): {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener todos los productos: {e}"}
+
+
+# --- Handler para la consulta por lotes de productos ---
+def obtener_productos_por_ids(ids: list):
+    """
+    Obtiene varios productos en una sola consulta (WHERE id_producto IN (...)).
+    Devuelve {"items": [...en el orden pedido...], "faltantes": [ids inexistentes]}.
+    """
     conn = None
     try:
         conn = engine.connect()
-        sql_call = text("CALL sp_EliminarProducto(:p_id_producto)")
-        conn.execute(sql_call, {"p_id_producto": id_producto})
-        conn.commit()
-        
-        return {"mensaje": "Producto eliminado con exito"}
+        return consultar_por_ids(conn, "productos", "id_producto", CAMPOS_PRODUCTO, ids)
     except SQLAlchemyError as e:
-        print(f"Error de DB al ejecutar sp_EliminarProducto: {e}")
+        logger.error(f"Error de DB al obtener productos por lote: {e}")
         error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener productos por lote: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener productos por lote: {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener productos por lote: {e}"}
+    finally:
         if conn:
-            conn.rollback()
-        return {"error": f"Error al eliminar producto: {error_mensaje_bd}"}
+            try:
+                conn.close()
+            except Exception as e_close:
+                logger.warning(f"Error al cerrar conexion (obtener_productos_por_ids): {e_close}")
+
+
+# --- Handler para la carga masiva de productos ---
+def agregar_productos_bulk(productos: list, tamano_lote: int = TAMANO_LOTE_BULK):
+    """
+    Inserta todos los productos (ya validados) en una sola transaccion, usando un
+    INSERT ... VALUES (...), (...), ... por cada lote de `tamano_lote` filas.
+    Si algun lote falla se revierte todo y no queda ningun producto insertado.
+    """
+    conn = None
+    try:
+        conn = engine.connect()
+        with conn.begin():
+            for inicio in range(0, len(productos), tamano_lote):
+                conn.execute(insert(tabla_productos).values(productos[inicio:inicio + tamano_lote]))
+        incrementar_version("productos")
+        indice_productos.registrar_altas()
+        registrar_auditoria("producto", "crear_lote", detalle={"cantidad": len(productos)})
+
+        return {"mensaje": f"{len(productos)} productos agregados con exito", "insertados": len(productos)}
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB en la carga masiva de productos: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error en la carga masiva de productos: {error_mensaje_bd}"}
     except Exception as e:
-        print(f"Error inesperado al ejecutar sp_EliminarProducto: {e}")
+        logger.error(f"Error inesperado en la carga masiva de productos: {e}")
+        return {"error": f"Ocurrio un error inesperado en la carga masiva de productos: {e}"}
+    finally:
         if conn:
-            conn.rollback()
-        return {"error": f"Ocurrio un error inesperado al eliminar producto: {e}"}
+            try:
+                conn.close()
+            except Exception as e_close:
+                logger.warning(f"Error al cerrar conexion (agregar_productos_bulk): {e_close}")
+
+
+# --- Handler para ajustes atomicos de stock (punto de venta) ---
+class AjusteStockRechazado(Exception):
+    """Se lanza dentro de la transaccion para revertir todos los ajustes de la solicitud."""
+    def __init__(self, id_producto: int, motivo: str):
+        super().__init__(motivo)
+        self.id_producto = id_producto
+        self.motivo = motivo
+
+
+SQL_AJUSTAR_STOCK = text(
+    "UPDATE productos SET stock = stock + :p_delta "
+    "WHERE id_producto = :p_id_producto AND stock + :p_delta >= 0"
+)
+SQL_EXISTE_PRODUCTO = text("SELECT 1 FROM productos WHERE id_producto = :p_id_producto")
+SQL_STOCK_POR_IDS = text(
+    "SELECT id_producto, stock FROM productos WHERE id_producto IN :p_ids"
+).bindparams(bindparam("p_ids", expanding=True))
+
+
+def ajustar_stock_productos(ajustes: dict):
+    """
+    Aplica {id_producto: delta} en una sola transaccion con UPDATEs condicionales
+    (stock = stock + delta solo si el resultado no queda negativo), sin leer-modificar-escribir.
+    Los productos se actualizan en orden de id para que dos ventas concurrentes tomen los
+    bloqueos de fila en el mismo orden y no se produzcan deadlocks.
+    Si algun ajuste se rechaza (stock insuficiente o producto inexistente) no se aplica ninguno.
+    """
+    conn = None
+    try:
+        conn = engine.connect()
+        with conn.begin():
+            for id_producto in sorted(ajustes):
+                parametros = {"p_id_producto": id_producto, "p_delta": ajustes[id_producto]}
+                if conn.execute(SQL_AJUSTAR_STOCK, parametros).rowcount == 0:
+                    existe = conn.execute(SQL_EXISTE_PRODUCTO, {"p_id_producto": id_producto}).first()
+                    raise AjusteStockRechazado(id_producto, "stock_insuficiente" if existe else "no_encontrado")
+
+            filas = conn.execute(SQL_STOCK_POR_IDS, {"p_ids": sorted(ajustes)}).fetchall()
+        incrementar_version("productos")
+        indice_productos.actualizar_stock({fila[0]: fila[1] for fila in filas})
+        for fila in filas:
+            registrar_auditoria("producto", "ajustar_stock", fila[0], {"delta": ajustes[fila[0]], "stock": fila[1]})
+
+        return {
+            "mensaje": "Stock actualizado con exito",
+            "productos": [{"id_producto": fila[0], "stock": fila[1]} for fila in filas]
+        }
+    except AjusteStockRechazado as e:
+        if e.motivo == "no_encontrado":
+            mensaje = f"Producto con ID {e.id_producto} no encontrado."
+        else:
+            mensaje = f"Stock insuficiente para el producto con ID {e.id_producto}."
+        return {"error": mensaje, "motivo": e.motivo, "id_producto": e.id_producto}
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al ajustar stock: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al ajustar stock: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al ajustar stock: {e}")
+        return {"error": f"Ocurrio un error inesperado al ajustar stock: {e}"}
     finally:
         if conn:
             try:
                 conn.close()
             except Exception as e_close:
-                print(f"Error al cerrar conexion (eliminar_producto_sp): {e_close}")
\ No newline at end of file
+                logger.warning(f"Error al cerrar conexion (ajustar_stock_productos): {e_close}")
+
+
+# --- Handler para la busqueda de productos (indice invertido en memoria) ---
+SQL_PRODUCTOS_DESDE_ID = text(
+    f"SELECT {', '.join(CAMPOS_PRODUCTO)} FROM productos WHERE id_producto > :p_id ORDER BY id_producto"
+)
+
+
+def _productos_desde_id(id_producto: int):
+    """Productos con id mayor a id_producto, leidos por lotes (0 = todo el catalogo, para construir el indice)."""
+    return flujo_filas_sp(SQL_PRODUCTOS_DESDE_ID, {"p_id": id_producto})
+
+
+def buscar_productos(consulta: str, limite: int):
+    """Busca en nombre y descripcion (sin distinguir tildes ni mayusculas) con el indice invertido."""
+    try:
+        indice_productos.asegurar_actualizado(_productos_desde_id)
+        return indice_productos.buscar(consulta, limite)
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al construir el indice de busqueda de productos: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al buscar productos: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al buscar productos: {e}")
+        return {"error": f"Ocurrio un error inesperado al buscar productos: {e}"}
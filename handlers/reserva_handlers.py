@@ -0,0 +1,229 @@
+# handlers/reserva_handlers.py
+
+import logging
+import random
+import time
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DBAPIError
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# --- Reservas de clases con control de cupo ---
+# El cupo se controla con un contador por (clase, fecha) en ocupacion_clases. Reservar es un solo
+# UPDATE condicional (reservados + 1 solo si todavia es menor que cupo_maximo): la DB bloquea la fila
+# del contador y evalua la condicion con el valor vigente, asi que no hay carrera entre leer el cupo
+# y escribir la reserva, y nunca se sobrevende una clase aunque cientos de socios reserven a la vez.
+#
+# La fila del contador se crea fuera de la transaccion de la reserva, en una transaccion propia que
+# se confirma enseguida. En InnoDB (REPEATABLE READ) el UPDATE sobre una fila que no existe toma un
+# gap lock; si dos primeras reservas del dia insertaran el contador dentro de esa misma transaccion,
+# cada una esperaria el gap lock de la otra (deadlock 1213). Aun asi MySQL puede abortar una
+# transaccion por deadlock o por espera de lock (1213, 1205): se reintenta completa.
+REINTENTOS_BLOQUEO = 3
+ESPERA_REINTENTO_SEGUNDOS = 0.05   # espera maxima antes del primer reintento (crece con cada intento)
+_ERRORES_BLOQUEO = {1205, 1213}    # ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK
+SQL_TOMAR_CUPO = text(
+    "UPDATE ocupacion_clases SET reservados = reservados + 1 "
+    "WHERE id_clase = :p_id_clase AND fecha = :p_fecha "
+    "AND reservados < (SELECT cupo_maximo FROM clases WHERE id_clase = :p_id_clase)"
+)
+SQL_LIBERAR_CUPO = text(
+    "UPDATE ocupacion_clases SET reservados = reservados - 1 "
+    "WHERE id_clase = :p_id_clase AND fecha = :p_fecha AND reservados > 0"
+)
+SQL_INSERTAR_RESERVA = text(
+    "INSERT INTO reservas_clases (id_clase, id_usuario, fecha) VALUES (:p_id_clase, :p_id_usuario, :p_fecha)"
+)
+SQL_ELIMINAR_RESERVA = text(
+    "DELETE FROM reservas_clases WHERE id_clase = :p_id_clase AND id_usuario = :p_id_usuario AND fecha = :p_fecha"
+)
+SQL_CUPO_CLASE = text("SELECT cupo_maximo FROM clases WHERE id_clase = :p_id_clase")
+SQL_OCUPACION = text(
+    "SELECT reservados FROM ocupacion_clases WHERE id_clase = :p_id_clase AND fecha = :p_fecha"
+)
+SQL_EXISTE_RESERVA = text(
+    "SELECT 1 FROM reservas_clases WHERE id_clase = :p_id_clase AND id_usuario = :p_id_usuario AND fecha = :p_fecha"
+)
+
+# Crea la fila del contador si no existe, sin fallar si otra solicitud la creo primero
+_SQL_CREAR_OCUPACION = {
+    "mysql": "INSERT IGNORE INTO ocupacion_clases (id_clase, fecha, reservados) VALUES (:p_id_clase, :p_fecha, 0)",
+    "sqlite": "INSERT OR IGNORE INTO ocupacion_clases (id_clase, fecha, reservados) VALUES (:p_id_clase, :p_fecha, 0)",
+}
+_SQL_CREAR_OCUPACION_GENERICO = (
+    "INSERT INTO ocupacion_clases (id_clase, fecha, reservados) VALUES (:p_id_clase, :p_fecha, 0) "
+    "ON CONFLICT DO NOTHING"
+)
+
+
+def _sql_crear_ocupacion(dialecto: str):
+    return text(_SQL_CREAR_OCUPACION.get(dialecto, _SQL_CREAR_OCUPACION_GENERICO))
+
+
+class ReservaRechazada(Exception):
+    """Se lanza dentro de la transaccion para revertir el cupo tomado."""
+    def __init__(self, motivo: str):
+        super().__init__(motivo)
+        self.motivo = motivo
+
+
+def _es_bloqueo(e: DBAPIError) -> bool:
+    """True si MySQL aborto la sentencia por deadlock o por espera de lock (mysqlconnector: errno, pymysql: args[0])."""
+    codigo = getattr(e.orig, "errno", None)
+    if codigo is None and e.orig is not None and e.orig.args:
+        codigo = e.orig.args[0]
+    return codigo in _ERRORES_BLOQUEO
+
+
+def _con_reintentos(transaccion):
+    """Ejecuta transaccion() y la repite (hasta REINTENTOS_BLOQUEO veces) si MySQL la aborta por un lock."""
+    for intento in range(1, REINTENTOS_BLOQUEO + 1):
+        try:
+            return transaccion()
+        except DBAPIError as e:
+            if intento == REINTENTOS_BLOQUEO or not _es_bloqueo(e):
+                raise
+            logger.warning(f"Transaccion de reserva abortada por un lock (intento {intento}): {e.orig}")
+            time.sleep(random.uniform(0, ESPERA_REINTENTO_SEGUNDOS * intento))
+
+
+def _crear_ocupacion(conn, parametros: dict):
+    """Crea (en su propia transaccion) el contador de la clase en esa fecha si todavia no existe."""
+    with conn.begin():
+        if conn.execute(SQL_CUPO_CLASE, {"p_id_clase": parametros["p_id_clase"]}).first() is None:
+            raise ReservaRechazada("no_encontrada")
+        conn.execute(_sql_crear_ocupacion(conn.dialect.name), parametros)
+
+
+def _tomar_cupo_y_reservar(conn, parametros: dict, id_usuario: str):
+    """
+    Toma el cupo e inserta la reserva en una transaccion. Devuelve (reservados, cupo_maximo), o None
+    si todavia no existe el contador de esa fecha (la transaccion termina sin escribir nada).
+    """
+    with conn.begin():
+        if conn.execute(SQL_TOMAR_CUPO, parametros).rowcount == 0:
+            if conn.execute(SQL_OCUPACION, parametros).first() is None:
+                return None  # Primera reserva del dia (o clase inexistente)
+            # Clase llena; si el socio ya tenia reserva se le informa eso en su lugar
+            ya_reservada = conn.execute(SQL_EXISTE_RESERVA, {**parametros, "p_id_usuario": id_usuario}).first()
+            raise ReservaRechazada("duplicada" if ya_reservada else "clase_llena")
+        try:
+            conn.execute(SQL_INSERTAR_RESERVA, {**parametros, "p_id_usuario": id_usuario})
+        except IntegrityError:
+            raise ReservaRechazada("duplicada")
+        reservados = conn.execute(SQL_OCUPACION, parametros).scalar()
+        cupo_maximo = conn.execute(SQL_CUPO_CLASE, {"p_id_clase": parametros["p_id_clase"]}).scalar()
+    return reservados, cupo_maximo
+
+
+def reservar_clase(id_clase: int, id_usuario: str, fecha: date):
+    """
+    Reserva un cupo de la clase para el socio en esa fecha. En una sola transaccion toma el cupo con
+    el UPDATE condicional e inserta la reserva; la primera vez crea antes el contador, fuera de ella.
+    Si el socio ya tenia reserva, la restriccion unica hace fallar el INSERT y se devuelve el cupo.
+    """
+    parametros = {"p_id_clase": id_clase, "p_fecha": fecha}
+    conn = None
+    try:
+        conn = engine.connect()
+        ocupacion = _con_reintentos(lambda: _tomar_cupo_y_reservar(conn, parametros, id_usuario))
+        if ocupacion is None:
+            _con_reintentos(lambda: _crear_ocupacion(conn, parametros))
+            ocupacion = _con_reintentos(lambda: _tomar_cupo_y_reservar(conn, parametros, id_usuario))
+            if ocupacion is None:
+                raise ReservaRechazada("no_encontrada")  # el contador se borro entre medio
+        reservados, cupo_maximo = ocupacion
+
+        return {
+            "mensaje": "Reserva confirmada",
+            "id_clase": id_clase,
+            "fecha": fecha,
+            "reservados": reservados,
+            "disponibles": max(cupo_maximo - reservados, 0) if cupo_maximo is not None else None,
+        }
+    except ReservaRechazada as e:
+        mensajes = {
+            "no_encontrada": f"Clase con ID {id_clase} no encontrada.",
+            "clase_llena": f"La clase con ID {id_clase} no tiene cupos disponibles para {fecha}.",
+            "duplicada": f"Ya tienes una reserva para la clase con ID {id_clase} el {fecha}.",
+        }
+        return {"error": mensajes[e.motivo], "motivo": e.motivo, "id_clase": id_clase}
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al reservar la clase {id_clase}: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al reservar la clase: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al reservar la clase {id_clase}: {e}")
+        return {"error": f"Ocurrio un error inesperado al reservar la clase: {e}"}
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception as e_close:
+                logger.warning(f"Error al cerrar conexion (reservar_clase): {e_close}")
+
+
+def cancelar_reserva(id_clase: int, id_usuario: str, fecha: date):
+    """Elimina la reserva del socio y devuelve el cupo en la misma transaccion."""
+    parametros = {"p_id_clase": id_clase, "p_fecha": fecha}
+    conn = None
+
+    def eliminar_y_liberar():
+        with conn.begin():
+            eliminadas = conn.execute(SQL_ELIMINAR_RESERVA, {**parametros, "p_id_usuario": id_usuario}).rowcount
+            if eliminadas:
+                conn.execute(SQL_LIBERAR_CUPO, parametros)
+        return eliminadas
+
+    try:
+        conn = engine.connect()
+        eliminadas = _con_reintentos(eliminar_y_liberar)
+
+        if not eliminadas:
+            return {"error": f"No tienes una reserva para la clase con ID {id_clase} el {fecha}.", "motivo": "no_encontrada"}
+        return {"mensaje": "Reserva cancelada", "id_clase": id_clase, "fecha": fecha}
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al cancelar la reserva de la clase {id_clase}: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al cancelar la reserva: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al cancelar la reserva de la clase {id_clase}: {e}")
+        return {"error": f"Ocurrio un error inesperado al cancelar la reserva: {e}"}
+    finally:
+        if conn:
+            try:
+                conn.close()
+            except Exception as e_close:
+                logger.warning(f"Error al cerrar conexion (cancelar_reserva): {e_close}")
+
+
+def obtener_ocupacion_clase(id_clase: int, id_usuario: str, fecha: date):
+    """Cupo maximo, reservados y disponibles de la clase en esa fecha, y si el socio tiene reserva."""
+    parametros = {"p_id_clase": id_clase, "p_fecha": fecha}
+    try:
+        with engine.connect() as conn:
+            cupo_maximo = conn.execute(SQL_CUPO_CLASE, {"p_id_clase": id_clase}).first()
+            if cupo_maximo is None:
+                return {"error": f"Clase con ID {id_clase} no encontrada.", "motivo": "no_encontrada"}
+            cupo_maximo = cupo_maximo[0]
+            reservados = conn.execute(SQL_OCUPACION, parametros).scalar() or 0
+            tiene_reserva = conn.execute(SQL_EXISTE_RESERVA, {**parametros, "p_id_usuario": id_usuario}).first()
+
+        return {
+            "id_clase": id_clase,
+            "fecha": fecha,
+            "cupo_maximo": cupo_maximo,
+            "reservados": reservados,
+            "disponibles": max((cupo_maximo or 0) - reservados, 0),
+            "tengo_reserva": tiene_reserva is not None,
+        }
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al obtener la ocupacion de la clase {id_clase}: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener la ocupacion de la clase: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener la ocupacion de la clase {id_clase}: {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener la ocupacion de la clase: {e}"}
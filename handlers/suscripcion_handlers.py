@@ -0,0 +1,116 @@
+# handlers/suscripcion_handlers.py
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, column, DateTime
+from sqlalchemy.exc import SQLAlchemyError
+from cache import incrementar_version # Avisa a socios_activos de los demas workers
+from database import engine
+from vencimientos import barrido_vencimientos
+from socios_activos import socios_activos
+
+logger = logging.getLogger(__name__)
+
+# Columnas que se devuelven de cada suscripcion
+CAMPOS_SUSCRIPCION = ("id_suscripcion", "id_usuario", "id_plan", "fecha_inicio", "fecha_vencimiento", "estado")
+
+SQL_DURACION_PLAN = text("SELECT duracion_dias FROM planes WHERE id_plan = :p_id_plan")
+# Fin de la cobertura vigente del socio: una renovacion empieza cuando termina la suscripcion actual.
+# Los tipos de columna convierten las fechas a datetime tambien con drivers que las devuelven como texto
+SQL_VENCIMIENTO_VIGENTE = text(
+    "SELECT MAX(fecha_vencimiento) FROM suscripciones "
+    "WHERE id_usuario = :p_id_usuario AND estado = 'activa' AND fecha_vencimiento > :p_ahora"
+).columns(column("vigente", DateTime))
+SQL_INSERTAR_SUSCRIPCION = text(
+    "INSERT INTO suscripciones (id_usuario, id_plan, fecha_inicio, fecha_vencimiento, estado) "
+    "VALUES (:p_id_usuario, :p_id_plan, :p_fecha_inicio, :p_fecha_vencimiento, 'activa')"
+)
+SQL_SUSCRIPCIONES_USUARIO = text(
+    f"SELECT {', '.join(CAMPOS_SUSCRIPCION)} FROM suscripciones "
+    "WHERE id_usuario = :p_id_usuario ORDER BY fecha_vencimiento DESC"
+).columns(fecha_inicio=DateTime, fecha_vencimiento=DateTime)
+SQL_CANCELAR_SUSCRIPCION = text(
+    "UPDATE suscripciones SET estado = 'cancelada' "
+    "WHERE id_suscripcion = :p_id_suscripcion AND id_usuario = :p_id_usuario AND estado = 'activa'"
+)
+
+
+def crear_suscripcion(id_usuario: str, id_plan: int):
+    """
+    Suscribe al socio al plan por duracion_dias. Si ya tiene una suscripcion activa, la nueva empieza
+    cuando vence la actual (renovacion anticipada), asi no se pierden dias.
+    """
+    ahora = datetime.now().replace(microsecond=0)
+    try:
+        with engine.begin() as conn:
+            plan = conn.execute(SQL_DURACION_PLAN, {"p_id_plan": id_plan}).first()
+            if plan is None:
+                return {"error": f"Plan con ID {id_plan} no encontrado.", "motivo": "no_encontrado"}
+            if not plan.duracion_dias or plan.duracion_dias <= 0:
+                return {"error": f"El plan con ID {id_plan} no tiene una duracion valida.", "motivo": "plan_invalido"}
+
+            vigente = conn.execute(SQL_VENCIMIENTO_VIGENTE, {"p_id_usuario": id_usuario, "p_ahora": ahora}).scalar()
+            fecha_inicio = max(vigente, ahora) if vigente else ahora
+            fecha_vencimiento = fecha_inicio + timedelta(days=plan.duracion_dias)
+            id_suscripcion = conn.execute(SQL_INSERTAR_SUSCRIPCION, {
+                "p_id_usuario": id_usuario, "p_id_plan": id_plan,
+                "p_fecha_inicio": fecha_inicio, "p_fecha_vencimiento": fecha_vencimiento,
+            }).lastrowid
+
+        incrementar_version("suscripciones")
+        barrido_vencimientos.registrar(id_suscripcion, id_usuario, fecha_vencimiento)
+        socios_activos.registrar(id_usuario, fecha_vencimiento)
+        return {
+            "mensaje": "Suscripcion creada",
+            "id_suscripcion": id_suscripcion,
+            "id_usuario": id_usuario,
+            "id_plan": id_plan,
+            "fecha_inicio": fecha_inicio,
+            "fecha_vencimiento": fecha_vencimiento,
+            "estado": "activa",
+        }
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al crear la suscripcion al plan {id_plan}: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al crear la suscripcion: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al crear la suscripcion al plan {id_plan}: {e}")
+        return {"error": f"Ocurrio un error inesperado al crear la suscripcion: {e}"}
+
+
+def obtener_suscripciones_usuario(id_usuario: str):
+    """Suscripciones del socio, de la que vence mas tarde a la mas antigua."""
+    try:
+        with engine.connect() as conn:
+            filas = conn.execute(SQL_SUSCRIPCIONES_USUARIO, {"p_id_usuario": id_usuario})
+            return [dict(zip(CAMPOS_SUSCRIPCION, fila)) for fila in filas]
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al obtener las suscripciones del usuario: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al obtener las suscripciones: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al obtener las suscripciones del usuario: {e}")
+        return {"error": f"Ocurrio un error inesperado al obtener las suscripciones: {e}"}
+
+
+def cancelar_suscripcion(id_suscripcion: int, id_usuario: str):
+    """Cancela una suscripcion activa del socio. No hace falta sacarla del heap: el barrido la ignora."""
+    try:
+        with engine.begin() as conn:
+            canceladas = conn.execute(SQL_CANCELAR_SUSCRIPCION, {
+                "p_id_suscripcion": id_suscripcion, "p_id_usuario": id_usuario,
+            }).rowcount
+
+        if not canceladas:
+            return {"error": f"No tienes una suscripcion activa con ID {id_suscripcion}.", "motivo": "no_encontrado"}
+        incrementar_version("suscripciones")
+        socios_activos.olvidar(id_usuario)
+        return {"mensaje": "Suscripcion cancelada", "id_suscripcion": id_suscripcion}
+    except SQLAlchemyError as e:
+        logger.error(f"Error de DB al cancelar la suscripcion {id_suscripcion}: {e}")
+        error_mensaje_bd = str(e.orig) if hasattr(e, 'orig') and e.orig else str(e)
+        return {"error": f"Error al cancelar la suscripcion: {error_mensaje_bd}"}
+    except Exception as e:
+        logger.error(f"Error inesperado al cancelar la suscripcion {id_suscripcion}: {e}")
+        return {"error": f"Ocurrio un error inesperado al cancelar la suscripcion: {e}"}
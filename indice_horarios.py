@@ -0,0 +1,189 @@
+# indice_horarios.py
+
+import os
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+
+from cache import obtener_version
+
+# --- Indice de intervalos sobre el horario de las clases ---
+# Cada clase ocupa [horario, horario + duracion) en minutos del dia. Las que cruzan la medianoche
+# (ej. 23:30 + 60) se guardan partidas en [23:30, 24:00) y [00:00, 00:30). El arbol de intervalos
+# centrado responde "que clases se solapan con [desde, hasta)" en O(log n + k) sin recorrer todas.
+# El indice se reconstruye cuando cambia la version de la tabla clases (altas, cambios o bajas hechas
+# en cualquier worker: la version es compartida, ver cache.py) y, para incorporar escrituras hechas
+# fuera de la app, cada INDICE_HORARIOS_TTL segundos.
+# No depende de la ventana de TTL del cache: sin escrituras no se vuelve a leer la DB cada 30 s.
+MINUTOS_DIA = 24 * 60
+INDICE_HORARIOS_TTL = int(os.getenv("INDICE_HORARIOS_TTL", "300"))
+# Zona horaria del gimnasio para "ahora" (en Render el reloj del servidor esta en UTC), ej. America/Lima
+ZONA_HORARIA = os.getenv("ZONA_HORARIA")
+
+
+def a_minutos(valor) -> int | None:
+    """Minutos desde medianoche para time, timedelta (TIME de mysqlconnector) o 'HH:MM[:SS]'."""
+    if valor is None:
+        return None
+    if isinstance(valor, dt_time):
+        return valor.hour * 60 + valor.minute
+    if isinstance(valor, timedelta):
+        return int(valor.total_seconds() // 60) % MINUTOS_DIA
+    partes = str(valor).strip().split(":")
+    if len(partes) not in (2, 3) or not all(p.isdigit() for p in partes):
+        raise ValueError(f"Horario invalido: {valor!r}. Se espera HH:MM.")
+    horas, minutos = int(partes[0]), int(partes[1])
+    if horas > 23 or minutos > 59:
+        raise ValueError(f"Horario invalido: {valor!r}. Se espera HH:MM.")
+    return horas * 60 + minutos
+
+
+def minuto_actual() -> int:
+    """Minuto del dia actual en ZONA_HORARIA (o en la hora local del servidor si no esta configurada)."""
+    ahora = datetime.now(ZoneInfo(ZONA_HORARIA)) if ZONA_HORARIA else datetime.now()
+    return ahora.hour * 60 + ahora.minute
+
+
+class _Nodo:
+    __slots__ = ("centro", "por_inicio", "por_fin", "izquierda", "derecha")
+
+    def __init__(self, intervalos: list):
+        # Mediana de los puntos medios: al menos el intervalo de esa mediana contiene al centro,
+        # asi cada nodo se queda con uno o mas intervalos y la recursion siempre avanza
+        medios = sorted((inicio + fin) // 2 for inicio, fin, _ in intervalos)
+        self.centro = medios[len(medios) // 2]
+        izquierda, derecha, aqui = [], [], []
+        for intervalo in intervalos:
+            if intervalo[1] <= self.centro:
+                izquierda.append(intervalo)
+            elif intervalo[0] > self.centro:
+                derecha.append(intervalo)
+            else:
+                aqui.append(intervalo)
+        self.por_inicio = sorted(aqui, key=lambda i: i[0])
+        self.por_fin = sorted(aqui, key=lambda i: i[1], reverse=True)
+        self.izquierda = _Nodo(izquierda) if izquierda else None
+        self.derecha = _Nodo(derecha) if derecha else None
+
+    def solapados(self, desde: int, hasta: int, salida: list):
+        """Agrega a salida los intervalos [inicio, fin) que se solapan con [desde, hasta)."""
+        nodo = self
+        while nodo is not None:
+            if hasta <= nodo.centro:
+                # Solo pueden solaparse los que empiezan antes de 'hasta'
+                for intervalo in nodo.por_inicio:
+                    if intervalo[0] >= hasta:
+                        break
+                    salida.append(intervalo)
+                nodo = nodo.izquierda
+            elif desde > nodo.centro:
+                # Solo pueden solaparse los que terminan despues de 'desde'
+                for intervalo in nodo.por_fin:
+                    if intervalo[1] <= desde:
+                        break
+                    salida.append(intervalo)
+                nodo = nodo.derecha
+            else:
+                # El rango contiene al centro: todos los intervalos del nodo se solapan
+                salida.extend(nodo.por_inicio)
+                if nodo.izquierda is not None:
+                    nodo.izquierda.solapados(desde, hasta, salida)
+                nodo = nodo.derecha
+
+
+def _minutos_desde(inicio: int, clase: dict, desde: int) -> int:
+    """
+    Minutos entre 'desde' y el inicio de la clase, para ordenar el resultado: las que ya estaban
+    en curso quedan primero (negativo) y en 22:00-02:00 las de las 23:00 van antes que las de la 01:00.
+    """
+    desplazamiento = (inicio - desde) % MINUTOS_DIA
+    if desplazamiento > MINUTOS_DIA - int(clase.get("duracion") or 0):
+        desplazamiento -= MINUTOS_DIA
+    return desplazamiento
+
+
+class IndiceHorarios:
+    """Arbol de intervalos de las clases, reconstruido cuando cambia la version de 'clases'."""
+
+    def __init__(self):
+        # (raiz del arbol, {id(clase): minuto de inicio}); se reemplaza entero para que las lecturas concurrentes
+        # nunca mezclen un arbol nuevo con los inicios del anterior
+        self._estado = (None, {})
+        self._version = None
+        self._construido_en = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _intervalos(clases: list) -> list:
+        intervalos = []
+        for clase in clases:
+            try:
+                inicio = a_minutos(clase.get("horario"))
+            except ValueError:
+                continue # Horario mal cargado en la DB: la clase no aparece en las busquedas por horario
+            duracion = clase.get("duracion") or 0
+            if inicio is None or duracion <= 0:
+                continue
+            fin = inicio + min(int(duracion), MINUTOS_DIA)
+            if fin <= MINUTOS_DIA:
+                intervalos.append((inicio, fin, clase))
+            else:
+                intervalos.append((inicio, MINUTOS_DIA, clase))
+                intervalos.append((0, fin - MINUTOS_DIA, clase))
+        return intervalos
+
+    def construir(self, clases: list, version=None):
+        intervalos = self._intervalos(clases)
+        inicios = {}
+        for inicio, _, clase in intervalos:
+            inicios.setdefault(id(clase), inicio)  # el primer tramo de una clase partida es el de su inicio
+        self._estado = (_Nodo(intervalos) if intervalos else None, inicios)
+        self._version = version
+        self._construido_en = time.monotonic()
+
+    def _vigente(self, version: int) -> bool:
+        return (version == self._version and self._construido_en is not None
+                and time.monotonic() - self._construido_en < INDICE_HORARIOS_TTL)
+
+    def actualizar_si_cambio(self, cargar_clases):
+        """
+        Reconstruye el indice con cargar_clases() si cambio la version de 'clases' o si ya paso
+        INDICE_HORARIOS_TTL desde la ultima construccion.
+        """
+        version = obtener_version("clases")
+        if self._vigente(version):
+            return None
+        with self._lock:
+            if self._vigente(version):
+                return None
+            clases = cargar_clases()
+            if isinstance(clases, dict) and "error" in clases:
+                return clases
+            self.construir(clases, version)
+        return None
+
+    def consultar(self, desde: int, hasta: int) -> list:
+        """
+        Clases que se solapan con [desde, hasta) en minutos del dia, ordenadas por horario.
+        Si desde > hasta el rango cruza la medianoche (ej. 22:00 a 02:00).
+        """
+        raiz, inicios = self._estado
+        if raiz is None:
+            return []
+        encontrados = []
+        if desde < hasta:
+            raiz.solapados(desde, hasta, encontrados)
+        elif desde > hasta:
+            raiz.solapados(desde, MINUTOS_DIA, encontrados)
+            raiz.solapados(0, hasta, encontrados)
+        else:
+            # Un instante: las clases en curso en ese minuto
+            raiz.solapados(desde, desde + 1, encontrados)
+
+        # Una clase partida en la medianoche puede aparecer dos veces
+        unicas = {id(clase): clase for _, _, clase in encontrados}
+        return sorted(unicas.values(), key=lambda c: (_minutos_desde(inicios[id(c)], c, desde), c.get("id_clase") or 0))
+
+
+indice_horarios = IndiceHorarios()
@@ -0,0 +1,292 @@
+# indice_productos.py
+
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from cache import obtener_sello, hubo_escrituras_ajenas
+from utils import normalizar_texto, palabras_normalizadas
+
+logger = logging.getLogger(__name__)
+
+# --- Indice invertido de productos para /api/productos/search ---
+# palabra normalizada (sin tildes, minusculas) -> ids de los productos que la contienen en nombre o
+# descripcion. Las escrituras de este proceso lo actualizan en el momento (sin reconstruirlo):
+#   - actualizar/eliminar/ajustar stock tocan solo ese producto,
+#   - las altas se marcan y se leen en la siguiente busqueda con un SELECT ... WHERE id > max_id.
+# Las escrituras hechas por otros workers se detectan con la version compartida de 'productos' (ver
+# cache.hubo_escrituras_ajenas) y disparan una reconstruccion completa en segundo plano; mientras
+# corre se sigue respondiendo con el indice anterior, pero al_dia es False y la ruta de busqueda
+# responde sin ETag. Cada INDICE_PRODUCTOS_TTL segundos tambien se reconstruye, para las
+# escrituras hechas fuera de la app.
+INDICE_PRODUCTOS_TTL = int(os.getenv("INDICE_PRODUCTOS_TTL", "300"))
+REINTENTO_RECONSTRUCCION_SEGUNDOS = 10  # tras una reconstruccion fallida, antes de volver a intentarla
+MAXIMO_PALABRAS_PREFIJO = 200  # palabras del vocabulario que puede abarcar el prefijo de la ultima palabra
+PALABRAS_VACIAS = frozenset((
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los", "o", "para", "por", "un", "una", "y",
+))
+_patron_palabras = re.compile(r"[a-z0-9]+")
+
+
+def _palabras(texto_normalizado: str) -> set:
+    return set(_patron_palabras.findall(texto_normalizado)) - PALABRAS_VACIAS
+
+
+class IndiceProductos:
+    """Indice invertido en memoria sobre nombre y descripcion de los productos."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}         # palabra -> set(id_producto) con la palabra en nombre o descripcion
+        self._postings_nombre = {}  # palabra -> set(id_producto) con la palabra en el nombre
+        self._vocabulario = []      # palabras ordenadas, para buscar por prefijo con bisect
+        self._productos = {}        # id_producto -> dict del producto
+        self._palabras = {}         # id_producto -> (palabras del nombre, todas las palabras)
+        self._claves_orden = {}     # id_producto -> (nombre normalizado, id) para ordenar resultados
+        # Mayor id leido de la DB (construccion o lectura de altas). Las escrituras de un solo producto
+        # no lo mueven: un alta pendiente con id menor quedaria fuera del SELECT ... WHERE id > max_id.
+        self._max_id = 0
+        self._construido_en = None
+        self._sello = None          # cache.obtener_sello("productos") de antes de leer la DB
+        self._altas_pendientes = False
+        self._reconstruyendo = False
+        self._reintentar_desde = 0.0
+        # Escrituras locales hechas mientras corre una reconstruccion en segundo plano: se vuelven a
+        # aplicar sobre el indice nuevo, que puede haberse leido de la DB antes que ellas
+        self._escrituras_durante_reconstruccion = None
+
+    # --- Construccion ---
+    @staticmethod
+    def _armar(productos, sello=None) -> "IndiceProductos":
+        nuevo = IndiceProductos()
+        nuevo._sello = sello
+        for producto in productos:
+            nuevo._indexar(producto, insertar_en_vocabulario=False)
+            nuevo._max_id = max(nuevo._max_id, producto["id_producto"])
+        nuevo._vocabulario = sorted(nuevo._postings)
+        return nuevo
+
+    def _reemplazar(self, nuevo: "IndiceProductos"):
+        # Con self._lock tomado
+        self._postings, self._postings_nombre = nuevo._postings, nuevo._postings_nombre
+        self._vocabulario, self._productos = nuevo._vocabulario, nuevo._productos
+        self._palabras, self._claves_orden = nuevo._palabras, nuevo._claves_orden
+        self._max_id = nuevo._max_id
+        self._sello = nuevo._sello
+        self._construido_en = time.monotonic()
+        self._altas_pendientes = False
+
+    def construir(self, productos, sello=None):
+        """Arma un indice nuevo con un iterable de dicts de producto y reemplaza al actual."""
+        nuevo = self._armar(productos, sello)
+        with self._lock:
+            self._reemplazar(nuevo)
+
+    @property
+    def construido(self) -> bool:
+        return self._construido_en is not None
+
+    @property
+    def al_dia(self) -> bool:
+        """False si otro worker escribio productos despues de la ultima construccion."""
+        return self._sello is None or not hubo_escrituras_ajenas("productos", self._sello)
+
+    def asegurar_actualizado(self, cargar_desde_id):
+        """
+        Deja el indice listo para buscar. cargar_desde_id(id) devuelve un iterable con los productos
+        de id mayor a id (0 = todos). La primera vez se construye en esta solicitud; despues las altas
+        pendientes se leen de forma incremental y la reconstruccion (por escrituras de otros workers o
+        por TTL) corre en un hilo aparte.
+        """
+        if not self.construido:
+            with self._lock:
+                if not self.construido:
+                    sello = obtener_sello("productos")
+                    self.construir(cargar_desde_id(0), sello)
+            return
+
+        if self._altas_pendientes:
+            with self._lock:
+                if self._altas_pendientes:
+                    self._altas_pendientes = False
+                    for producto in cargar_desde_id(self._max_id):
+                        self._escribir(self._indexar_alta, producto)
+
+        ahora = time.monotonic()
+        vencido = ahora - self._construido_en >= INDICE_PRODUCTOS_TTL
+        desactualizado = ahora >= self._reintentar_desde and not self.al_dia
+        if (vencido or desactualizado) and not self._reconstruyendo:
+            self._reconstruyendo = True
+            threading.Thread(target=self._reconstruir, args=(cargar_desde_id,), daemon=True).start()
+
+    def _reconstruir(self, cargar_desde_id):
+        with self._lock:
+            self._escrituras_durante_reconstruccion = []
+        try:
+            sello = obtener_sello("productos")
+            nuevo = self._armar(cargar_desde_id(0), sello)
+            with self._lock:
+                escrituras = self._escrituras_durante_reconstruccion
+                self._escrituras_durante_reconstruccion = None
+                self._reemplazar(nuevo)
+                for aplicar, argumento in escrituras:
+                    aplicar(argumento)
+        except Exception as e:
+            logger.warning(f"Error al reconstruir el indice de productos: {e}")
+            self._construido_en = time.monotonic()  # se reintenta en el proximo TTL
+            self._reintentar_desde = time.monotonic() + REINTENTO_RECONSTRUCCION_SEGUNDOS
+        finally:
+            with self._lock:
+                self._escrituras_durante_reconstruccion = None
+            self._reconstruyendo = False
+
+    # --- Actualizaciones incrementales (las llaman los handlers despues del commit) ---
+    def _escribir(self, aplicar, argumento):
+        """Aplica una escritura local (con self._lock tomado) y la anota si hay una reconstruccion en curso."""
+        aplicar(argumento)
+        if self._escrituras_durante_reconstruccion is not None:
+            self._escrituras_durante_reconstruccion.append((aplicar, argumento))
+
+    def _indexar(self, producto: dict, insertar_en_vocabulario: bool = True):
+        id_producto = producto["id_producto"]
+        self._desindexar(id_producto)
+        nombre = normalizar_texto(producto.get("nombre"))
+        palabras_nombre = _palabras(nombre)
+        todas = palabras_nombre | _palabras(normalizar_texto(producto.get("descripcion")))
+        self._productos[id_producto] = producto
+        self._palabras[id_producto] = (palabras_nombre, todas)
+        self._claves_orden[id_producto] = (nombre, id_producto)
+        for palabra in todas:
+            ids = self._postings.get(palabra)
+            if ids is None:
+                ids = self._postings[palabra] = set()
+                if insertar_en_vocabulario:
+                    insort(self._vocabulario, palabra)
+            ids.add(id_producto)
+        for palabra in palabras_nombre:
+            self._postings_nombre.setdefault(palabra, set()).add(id_producto)
+
+    def _indexar_alta(self, producto: dict):
+        # Producto leido con cargar_desde_id(max_id): solo estos avanzan max_id
+        self._indexar(producto)
+        self._max_id = max(self._max_id, producto["id_producto"])
+
+    def _desindexar(self, id_producto: int):
+        entrada = self._palabras.pop(id_producto, None)
+        self._productos.pop(id_producto, None)
+        self._claves_orden.pop(id_producto, None)
+        if entrada is None:
+            return
+        for palabra in entrada[0]:
+            ids = self._postings_nombre.get(palabra)
+            if ids is not None:
+                ids.discard(id_producto)
+                if not ids:
+                    del self._postings_nombre[palabra]
+        for palabra in entrada[1]:
+            ids = self._postings.get(palabra)
+            if ids is None:
+                continue
+            ids.discard(id_producto)
+            if not ids:
+                del self._postings[palabra]
+                posicion = bisect_left(self._vocabulario, palabra)
+                if posicion < len(self._vocabulario) and self._vocabulario[posicion] == palabra:
+                    self._vocabulario.pop(posicion)
+
+    def _marcar_altas(self, _=None):
+        self._altas_pendientes = True
+
+    def _aplicar_stock(self, stocks: dict):
+        for id_producto, stock in stocks.items():
+            producto = self._productos.get(id_producto)
+            if producto is not None:
+                self._productos[id_producto] = {**producto, "stock": stock}
+
+    # Las escrituras toman el lock antes de mirar si el indice esta construido: una escritura que llega
+    # durante la primera construccion espera a que termine y se aplica sobre el indice nuevo.
+    def registrar_altas(self):
+        """Marca que hay productos nuevos: la proxima busqueda los lee con id > max_id."""
+        with self._lock:
+            self._escribir(self._marcar_altas, None)
+
+    def actualizar_producto(self, producto: dict):
+        with self._lock:
+            if self.construido:
+                self._escribir(self._indexar, producto)
+
+    def eliminar_producto(self, id_producto: int):
+        with self._lock:
+            if self.construido:
+                self._escribir(self._desindexar, id_producto)
+
+    def actualizar_stock(self, stocks: dict):
+        """{id_producto: stock} tras un ajuste de stock (no cambia las palabras indexadas)."""
+        with self._lock:
+            if self.construido:
+                self._escribir(self._aplicar_stock, stocks)
+
+    # --- Busqueda ---
+    def buscar(self, consulta: str, limite: int = 20) -> list:
+        """
+        Productos que contienen todas las palabras de la consulta (la ultima tambien como prefijo,
+        para buscar mientras se escribe). Primero los que tienen todas las palabras en el nombre;
+        dentro de cada grupo, por nombre. Todo son operaciones de conjuntos y un top-k, sin recorrer
+        los candidatos en Python.
+        """
+        palabras = [p for p in dict.fromkeys(palabras_normalizadas(consulta)) if p not in PALABRAS_VACIAS]
+        if not palabras:
+            return []
+        completas, prefijo = palabras[:-1], palabras[-1]
+
+        with self._lock:
+            # La ultima palabra: exacta o cualquier palabra del vocabulario que empiece con ella
+            inicio = bisect_left(self._vocabulario, prefijo)
+            con_prefijo = []
+            for palabra in self._vocabulario[inicio:inicio + MAXIMO_PALABRAS_PREFIJO]:
+                if not palabra.startswith(prefijo):
+                    break
+                con_prefijo.append(palabra)
+            if not con_prefijo:
+                return []
+
+            candidatos = self._interseccion(self._postings, completas, con_prefijo)
+            if not candidatos:
+                return []
+            en_nombre = self._interseccion(self._postings_nombre, completas, con_prefijo) & candidatos
+
+            clave = self._claves_orden.__getitem__
+            mejores = heapq.nsmallest(limite, en_nombre, key=clave)
+            if len(mejores) < limite:
+                mejores += heapq.nsmallest(limite - len(mejores), candidatos - en_nombre, key=clave)
+            return [self._productos[id_producto] for id_producto in mejores]
+
+    @staticmethod
+    def _interseccion(postings: dict, completas: list, con_prefijo: list) -> set:
+        """Ids que tienen todas las palabras completas y alguna de las palabras con el prefijo."""
+        conjuntos = [postings.get(palabra) for palabra in completas]
+        if any(conjunto is None for conjunto in conjuntos):
+            return set()
+        vacio = set()
+        if len(con_prefijo) == 1:
+            conjuntos.append(postings.get(con_prefijo[0], vacio))
+        else:
+            conjuntos.append(set().union(*(postings.get(palabra, vacio) for palabra in con_prefijo)))
+        conjuntos.sort(key=len)
+        return conjuntos[0].intersection(*conjuntos[1:])
+
+    def estadisticas(self) -> dict:
+        return {
+            "construido": self.construido,
+            "al_dia": self.al_dia,
+            "productos": len(self._productos),
+            "palabras": len(self._postings),
+            "antiguedad_s": round(time.monotonic() - self._construido_en, 1) if self.construido else None,
+        }
+
+
+indice_productos = IndiceProductos()
@@ -0,0 +1,71 @@
+# inicio_firebase.py
+
+import json
+import logging
+import os
+import threading
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# --- Inicialización de Firebase Admin SDK con Variables de Entorno y Fallback Local ---
+# Se hace en el primer uso (la primera verificación de un token o el primer /login) y no al
+# importar app.py: importar firebase_admin (google-auth, requests, cryptography) y parsear las
+# credenciales alargaba el arranque de cada worker. Con FIREBASE_PROJECT_ID configurado la
+# verificación local de tokens (routes/claves_firma.py) no necesita inicializar el SDK.
+_lock = threading.Lock()
+_estado = {"intentado": False, "inicializado": False}
+
+
+def asegurar_firebase() -> bool:
+    """Inicializa Firebase Admin SDK (una sola vez por proceso). Devuelve True si está inicializado."""
+    if not _estado["intentado"]:
+        with _lock:
+            if not _estado["intentado"]:
+                _estado["inicializado"] = _inicializar_firebase()
+                _estado["intentado"] = True
+    return _estado["inicializado"]
+
+
+def _modo_debug() -> bool:
+    return has_app_context() and current_app.debug
+
+
+def _inicializar_firebase() -> bool:
+    from firebase_admin import credentials, initialize_app
+
+    try:
+        # 1. Intenta leer el contenido JSON de las credenciales de Firebase desde una variable de entorno
+        #    (Esto es para entornos de despliegue como Render, donde configurarás FIREBASE_CREDENTIALS_JSON).
+        firebase_credentials_json_str = os.getenv("FIREBASE_CREDENTIALS_JSON")
+
+        if firebase_credentials_json_str:
+            cred_dict = json.loads(firebase_credentials_json_str)
+            cred = credentials.Certificate(cred_dict)
+            initialize_app(cred)
+            logger.info("Firebase Admin SDK inicializado exitosamente desde variables de entorno.")
+            return True
+        elif _modo_debug() and os.path.exists('firebase_credentials.json'):
+            # 2. Si la variable de entorno NO está configurada, PERO estamos en modo debug Y
+            #    el archivo 'firebase_credentials.json' existe localmente, úsalo.
+            #    (Esto es para facilitar el desarrollo local sin necesidad de variables de entorno).
+            cred = credentials.Certificate('firebase_credentials.json')
+            initialize_app(cred)
+            logger.info("Firebase Admin SDK inicializado exitosamente desde archivo local (modo debug).")
+            return True
+        else:
+            # 3. Si no se encuentra en ninguno de los dos casos, Firebase no se inicializará.
+            logger.warning(
+                "No se encontraron credenciales para Firebase Admin SDK; no se inicializará y las funciones de "
+                "autenticación fallarán. Configura 'FIREBASE_CREDENTIALS_JSON' en tu entorno de despliegue (Render) o "
+                "ten 'firebase_credentials.json' en la raíz de tu proyecto para desarrollo local (con debug=True)."
+            )
+            return False
+
+    except Exception as e:
+        logger.error(
+            "Error al inicializar Firebase Admin SDK: %s. Asegúrate de que 'FIREBASE_CREDENTIALS_JSON' esté bien formado "
+            "(JSON válido) en las variables de entorno, o que el archivo 'firebase_credentials.json' no esté corrupto.", e
+        )
+        return False
@@ -0,0 +1,124 @@
+# instrumentacion_sql.py
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# --- Instrumentacion de SQL basada en eventos del engine ---
+# Reemplaza echo=True (que imprimia TODAS las sentencias de forma sincrona) por:
+#   - un log solo de las consultas lentas (>= SQL_LENTO_MS) o de una fraccion muestreada (SQL_MUESTREO),
+#   - contadores y percentiles de latencia por sentencia / procedimiento (ver /api/metricas/sql).
+# El costo por sentencia es un perf_counter() al inicio y un append a un deque al final.
+SQL_INSTRUMENTACION = os.getenv("SQL_INSTRUMENTACION", "1").lower() in ("1", "true", "si")
+SQL_LENTO_MS = float(os.getenv("SQL_LENTO_MS", "500"))
+SQL_MUESTREO = float(os.getenv("SQL_MUESTREO", "0"))
+
+MUESTRAS_POR_SENTENCIA = 1024  # ultimas latencias guardadas por sentencia para calcular percentiles
+MAXIMO_SENTENCIAS = 500        # sentencias distintas que se agregan; el resto cae en "(otras)"
+LARGO_CLAVE = 120
+
+_lock = threading.Lock()
+_agregados = {}  # clave -> {"conteo", "errores", "total_s", "max_s", "muestras": deque}
+_patron_call = re.compile(r"^\s*CALL\s+(\w+)", re.IGNORECASE)
+_patron_espacios = re.compile(r"\s+")
+
+
+def _clave_sentencia(sentencia: str) -> str:
+    """Los CALL se agrupan por nombre de procedimiento; el resto por el texto (normalizado y recortado)."""
+    coincidencia = _patron_call.match(sentencia)
+    if coincidencia:
+        return f"CALL {coincidencia.group(1)}"
+    return _patron_espacios.sub(" ", sentencia).strip()[:LARGO_CLAVE]
+
+
+def _registrar(sentencia: str, segundos: float, error: bool):
+    clave = _clave_sentencia(sentencia)
+    with _lock:
+        agregado = _agregados.get(clave)
+        if agregado is None:
+            if len(_agregados) >= MAXIMO_SENTENCIAS:
+                clave = "(otras)"
+                agregado = _agregados.get(clave)
+            if agregado is None:
+                agregado = _agregados[clave] = {
+                    "conteo": 0, "errores": 0, "total_s": 0.0, "max_s": 0.0,
+                    "muestras": deque(maxlen=MUESTRAS_POR_SENTENCIA),
+                }
+        agregado["conteo"] += 1
+        agregado["errores"] += 1 if error else 0
+        agregado["total_s"] += segundos
+        if segundos > agregado["max_s"]:
+            agregado["max_s"] = segundos
+        agregado["muestras"].append(segundos)
+
+    milisegundos = segundos * 1000
+    if milisegundos >= SQL_LENTO_MS:
+        logger.warning("SQL LENTA (%.1f ms): %s", milisegundos, sentencia[:500], extra={"duracion_ms": round(milisegundos, 3)})
+    elif SQL_MUESTREO > 0 and random.random() < SQL_MUESTREO:
+        logger.info("SQL muestreada (%.1f ms): %s", milisegundos, sentencia[:500], extra={"duracion_ms": round(milisegundos, 3)})
+
+
+def _antes(conn, cursor, sentencia, parametros, contexto, executemany):
+    contexto._inicio_instrumentacion = time.perf_counter()
+
+
+def _despues(conn, cursor, sentencia, parametros, contexto, executemany):
+    inicio = getattr(contexto, "_inicio_instrumentacion", None)
+    if inicio is not None:
+        _registrar(sentencia, time.perf_counter() - inicio, False)
+
+
+def _error(contexto_excepcion):
+    contexto = contexto_excepcion.execution_context
+    inicio = getattr(contexto, "_inicio_instrumentacion", None) if contexto is not None else None
+    if inicio is not None and contexto_excepcion.statement:
+        _registrar(contexto_excepcion.statement, time.perf_counter() - inicio, True)
+
+
+def instrumentar_engine(engine):
+    """Registra los eventos de medicion en el engine (no hace nada si SQL_INSTRUMENTACION=0)."""
+    if not SQL_INSTRUMENTACION:
+        return
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _despues)
+    event.listen(engine, "handle_error", _error)
+
+
+def _percentil(ordenadas: list, fraccion: float) -> float:
+    indice = min(len(ordenadas) - 1, int(round(fraccion * (len(ordenadas) - 1))))
+    return ordenadas[indice]
+
+
+def estadisticas_sql() -> dict:
+    """Conteo, errores y latencias (promedio, max, p50/p95/p99 sobre las ultimas muestras) por sentencia."""
+    with _lock:
+        copia = {clave: (dict(agregado), list(agregado["muestras"])) for clave, agregado in _agregados.items()}
+
+    resultado = {
+        "configuracion": {
+            "instrumentacion": SQL_INSTRUMENTACION,
+            "lento_ms": SQL_LENTO_MS,
+            "muestreo": SQL_MUESTREO,
+        },
+        "sentencias": {},
+    }
+    for clave, (agregado, muestras) in sorted(copia.items(), key=lambda item: -item[1][0]["total_s"]):
+        ordenadas = sorted(muestras)
+        resultado["sentencias"][clave] = {
+            "conteo": agregado["conteo"],
+            "errores": agregado["errores"],
+            "promedio_ms": round(agregado["total_s"] * 1000 / agregado["conteo"], 3),
+            "max_ms": round(agregado["max_s"] * 1000, 3),
+            "p50_ms": round(_percentil(ordenadas, 0.50) * 1000, 3),
+            "p95_ms": round(_percentil(ordenadas, 0.95) * 1000, 3),
+            "p99_ms": round(_percentil(ordenadas, 0.99) * 1000, 3),
+        }
+    return resultado
@@ -0,0 +1,105 @@
+# metricas_pool.py
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# --- Metricas del pool de conexiones a MySQL ---
+# Sirven para dimensionar workers de gunicorn contra el limite de conexiones de Clever Cloud:
+# cuantas conexiones estan en uso, cuanto overflow se esta usando, cuanto espera una solicitud
+# para obtener una conexion y cuantas conexiones se abren/cierran (churn).
+
+# Limites superiores (ms) de los buckets del histograma de espera; el ultimo es "+Inf"
+BUCKETS_ESPERA_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+_lock = threading.Lock()
+_metricas = {
+    "checkouts": 0,
+    "checkins": 0,
+    "timeouts": 0,
+    "conexiones_abiertas": 0,
+    "conexiones_cerradas": 0,
+    "conexiones_invalidadas": 0,
+    "espera_total_s": 0.0,
+    "espera_max_s": 0.0,
+    "histograma": [0] * (len(BUCKETS_ESPERA_MS) + 1),
+}
+
+
+def _registrar_espera(segundos: float, timeout: bool):
+    milisegundos = segundos * 1000
+    indice = next((i for i, limite in enumerate(BUCKETS_ESPERA_MS) if milisegundos <= limite), len(BUCKETS_ESPERA_MS))
+    with _lock:
+        _metricas["histograma"][indice] += 1
+        _metricas["espera_total_s"] += segundos
+        if segundos > _metricas["espera_max_s"]:
+            _metricas["espera_max_s"] = segundos
+        if timeout:
+            _metricas["timeouts"] += 1
+
+
+def _contar(campo: str):
+    with _lock:
+        _metricas[campo] += 1
+
+
+class QueuePoolMedido(QueuePool):
+    """QueuePool que mide cuanto tarda cada checkout (espera en la cola + apertura de conexiones nuevas)."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        timeout = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timeout = True
+            raise
+        finally:
+            _registrar_espera(time.perf_counter() - inicio, timeout)
+
+
+def registrar_eventos_pool(engine):
+    """Escucha los eventos del pool del engine para contar checkouts y el churn de conexiones."""
+    event.listen(engine, "connect", lambda dbapi_conn, registro: _contar("conexiones_abiertas"))
+    event.listen(engine, "close", lambda dbapi_conn, registro: _contar("conexiones_cerradas"))
+    event.listen(engine, "close_detached", lambda dbapi_conn: _contar("conexiones_cerradas"))
+    event.listen(engine, "invalidate", lambda dbapi_conn, registro, excepcion: _contar("conexiones_invalidadas"))
+    event.listen(engine, "checkout", lambda dbapi_conn, registro, proxy: _contar("checkouts"))
+    event.listen(engine, "checkin", lambda dbapi_conn, registro: _contar("checkins"))
+
+
+def estadisticas_pool(engine, configuracion: dict) -> dict:
+    """Foto del estado del pool y de las metricas acumuladas desde que arranco el proceso."""
+    pool = engine.pool
+    with _lock:
+        metricas = dict(_metricas)
+        histograma = list(_metricas["histograma"])
+
+    esperas = sum(histograma)
+    etiquetas = [f"le_{limite}ms" for limite in BUCKETS_ESPERA_MS] + ["le_inf"]
+    return {
+        "configuracion": configuracion,
+        "pool": {
+            "tamano": pool.size() if hasattr(pool, "size") else None,
+            "en_uso": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "disponibles": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow_en_uso": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+        },
+        "checkouts": metricas["checkouts"],
+        "checkins": metricas["checkins"],
+        "timeouts": metricas["timeouts"],
+        "churn": {
+            "conexiones_abiertas": metricas["conexiones_abiertas"],
+            "conexiones_cerradas": metricas["conexiones_cerradas"],
+            "conexiones_invalidadas": metricas["conexiones_invalidadas"],
+        },
+        "espera_checkout": {
+            "conteo": esperas,
+            "promedio_ms": round(metricas["espera_total_s"] * 1000 / esperas, 3) if esperas else 0.0,
+            "max_ms": round(metricas["espera_max_s"] * 1000, 3),
+            "histograma": dict(zip(etiquetas, histograma)),
+        },
+    }
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index
+
+from database import Base
+
+
+class RegistroAuditoria(Base):
+    # Quien creo, modifico o elimino cada producto, plan o clase; se escribe en lotes desde escritura_diferida
+    __tablename__ = "auditoria"
+    __table_args__ = (Index("ix_auditoria_entidad", "entidad", "id_entidad"),)
+
+    id_auditoria = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True) # PK
+    fecha_hora = Column(DateTime, nullable=False, index=True)
+    id_usuario = Column(String(128), nullable=True, index=True) # UID de Firebase (NULL en rutas sin token)
+    entidad = Column(String(30), nullable=False) # producto | plan | clase
+    id_entidad = Column(Integer, nullable=True) # NULL cuando el SP no devuelve el ID (altas) o en cargas masivas
+    accion = Column(String(30), nullable=False) # crear | actualizar | eliminar | crear_lote | ajustar_stock
+    detalle = Column(Text, nullable=True) # JSON con los valores enviados
+
+    def __repr__(self):
+        return f"<RegistroAuditoria(id={self.id_auditoria}, id_usuario='{self.id_usuario}', accion='{self.accion}', entidad='{self.entidad}', id_entidad={self.id_entidad})>"
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Boolean, Index
+
+from database import Base
+
+
+class Checkin(Base):
+    # Una fila por pasada por el molinete (permitida o no); se escribe en lotes desde escritura_diferida
+    __tablename__ = "checkins"
+    __table_args__ = (Index("ix_checkins_usuario_fecha", "id_usuario", "fecha_hora"),)
+
+    id_checkin = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True) # PK
+    id_usuario = Column(String(128), nullable=False) # UID de Firebase del socio
+    fecha_hora = Column(DateTime, nullable=False, index=True)
+    permitido = Column(Boolean, nullable=False)
+
+    def __repr__(self):
+        return f"<Checkin(id={self.id_checkin}, id_usuario='{self.id_usuario}', fecha_hora='{self.fecha_hora}', permitido={self.permitido})>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, UniqueConstraint, func
+
+from database import Base
+
+
+class ReservaClase(Base):
+    __tablename__ = "reservas_clases"
+    # Un socio solo puede tener una reserva por clase y fecha; la DB lo garantiza aunque lleguen dos solicitudes a la vez
+    __table_args__ = (UniqueConstraint("id_clase", "id_usuario", "fecha", name="uq_reserva_clase_usuario_fecha"),)
+
+    id_reserva = Column(Integer, primary_key=True, autoincrement=True) # PK
+    id_clase = Column(Integer, ForeignKey("clases.id_clase", ondelete="CASCADE"), nullable=False)
+    id_usuario = Column(String(128), nullable=False, index=True) # UID de Firebase del socio
+    fecha = Column(Date, nullable=False) # Dia de la sesion reservada
+    fecha_reserva = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<ReservaClase(id={self.id_reserva}, id_clase={self.id_clase}, id_usuario='{self.id_usuario}', fecha='{self.fecha}')>"
+
+
+class OcupacionClase(Base):
+    # Contador de cupos tomados por clase y fecha: es la fila que se actualiza de forma atomica al reservar
+    __tablename__ = "ocupacion_clases"
+
+    id_clase = Column(Integer, ForeignKey("clases.id_clase", ondelete="CASCADE"), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    reservados = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<OcupacionClase(id_clase={self.id_clase}, fecha='{self.fecha}', reservados={self.reservados})>"
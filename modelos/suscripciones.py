@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func
+
+from database import Base
+
+
+class Suscripcion(Base):
+    __tablename__ = "suscripciones"
+    # El barrido de vencimientos lee "activas que vencen antes de X" en orden con el primer indice; la
+    # cobertura de un socio (renovacion y check-in) se resuelve con el segundo sin leer la fila
+    __table_args__ = (
+        Index("ix_suscripciones_estado_vencimiento", "estado", "fecha_vencimiento"),
+        Index("ix_suscripciones_usuario_estado_vencimiento", "id_usuario", "estado", "fecha_vencimiento"),
+    )
+
+    id_suscripcion = Column(Integer, primary_key=True, autoincrement=True) # PK
+    id_usuario = Column(String(128), nullable=False) # UID de Firebase del socio
+    id_plan = Column(Integer, ForeignKey("planes.id_plan"), nullable=False)
+    fecha_inicio = Column(DateTime, nullable=False)
+    fecha_vencimiento = Column(DateTime, nullable=False)
+    estado = Column(String(20), nullable=False, default="activa", server_default="activa") # activa | vencida | cancelada
+    fecha_alta = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<Suscripcion(id={self.id_suscripcion}, id_usuario='{self.id_usuario}', id_plan={self.id_plan}, fecha_vencimiento='{self.fecha_vencimiento}', estado='{self.estado}')>"
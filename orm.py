@@ -0,0 +1,54 @@
+# orm.py
+
+from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+from database import obtener_engine
+
+# --- Parte ORM de la base de datos ---
+# sqlalchemy.orm es la parte mas pesada de importar de SQLAlchemy y solo la usan los modelos de
+# modelos/ (create_all_tables) y las rutas /productos de app.py. Los handlers usan SQL plano con
+# text(), asi que este modulo se importa recien cuando algo pide database.Base, database.Product,
+# database.SessionLocal o database.get_db (ver __getattr__ en database.py).
+
+# Base declarativa para tus modelos de SQLAlchemy
+Base = declarative_base()
+
+# --- Definición del Modelo de Producto ---
+# Este modelo se mapeará a una tabla llamada 'productos' en tu base de datos MySQL.
+# Asegúrate de que los nombres de las columnas coincidan con los de tu tabla existente.
+class Product(Base):
+    __tablename__ = 'productos' # Nombre de tu tabla en la base de datos
+
+    id_producto = Column(Integer, primary_key=True, autoincrement=True)
+    nombre = Column(String(255), nullable=False)
+    descripcion = Column(String(255), nullable=True)
+    precio = Column(Float, nullable=False)
+    stock = Column(Integer, nullable=False)
+    imagen_url = Column(String(255), nullable=True)
+
+    def __repr__(self):
+        return f"<Product(id={self.id_producto}, nombre='{self.nombre}')>"
+
+    # Método para convertir el objeto Product en un diccionario (útil para jsonify)
+    def to_dict(self):
+        return {
+            "id_producto": self.id_producto,
+            "nombre": self.nombre,
+            "descripcion": self.descripcion,
+            "precio": self.precio,
+            "stock": self.stock,
+            "imagen_url": self.imagen_url
+        }
+
+# Configuración de la sesión local para interactuar con la base de datos
+# (importar este modulo crea el engine: solo se importa cuando se usa el ORM)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=obtener_engine())
+
+# Función para obtener una sesión de base de datos (se usa con Flask's `g` o `inject`)
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db # 'yield' permite que esta función sea usada como un context manager
+    finally:
+        db.close() # Cierra la sesión para liberar recursos
@@ -0,0 +1,74 @@
+# proveedor_json.py
+
+import json
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+# --- Serializacion JSON de las respuestas ---
+# Proveedor JSON de Flask que codifica directamente los tipos que devuelven MySQL y los modelos,
+# para que los handlers entreguen las filas tal cual (sin recorrerlas convirtiendo a string).
+# La salida es la misma que daba el DefaultJSONProvider de Flask, que es lo que ya reciben los clientes:
+#   - claves de los objetos ordenadas (sort_keys),
+#   - Decimal (precio)      -> string, para no perder precision ("19.99"),
+#   - date / datetime       -> fecha HTTP, como Flask ("Wed, 01 May 2024 10:30:00 GMT"),
+#   - time (Clase.horario)  -> "HH:MM:SS",
+#   - timedelta (TIME de mysqlconnector) -> "H:MM:SS", el mismo texto que se enviaba antes.
+# Usa orjson si esta instalado y, si no, el modulo json de la libreria estandar con las mismas reglas.
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin el, la salida es identica pero mas lenta
+    orjson = None
+
+
+def _por_defecto(valor):
+    """Tipos que ni orjson ni json saben codificar por si mismos."""
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (timedelta, dt_time)):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        # orjson los escribiria en ISO 8601: OPT_PASSTHROUGH_DATETIME los manda aqui
+        return http_date(valor)
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    raise TypeError(f"Objeto de tipo {type(valor).__name__} no es serializable a JSON")
+
+
+if orjson is not None:
+    _OPCIONES_ORJSON = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def a_json_bytes(obj) -> bytes:
+        """Serializa obj a JSON compacto (bytes UTF-8)."""
+        return orjson.dumps(obj, default=_por_defecto, option=_OPCIONES_ORJSON)
+
+    def desde_json(datos):
+        return orjson.loads(datos)
+else:
+    _codificador = json.JSONEncoder(default=_por_defecto, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+    def a_json_bytes(obj) -> bytes:
+        """Serializa obj a JSON compacto (bytes UTF-8)."""
+        return _codificador.encode(obj).encode("utf-8")
+
+    def desde_json(datos):
+        return json.loads(datos)
+
+
+class ProveedorJSONRapido(JSONProvider):
+    """Proveedor para app.json: lo usan jsonify(), request.get_json() y los retornos dict/list de las vistas."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return a_json_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return desde_json(s)
+
+    def response(self, *args, **kwargs):
+        # Igual que JSONProvider.response, pero entrega los bytes sin pasar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(a_json_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,118 @@
+# registro.py
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# --- Logging no bloqueante ---
+# Los modulos usan logging.getLogger(__name__). configurar_logging() instala en el logger raiz un
+# QueueHandler: el hilo de la solicitud solo arma el LogRecord y lo encola; un QueueListener en un
+# hilo de fondo lo formatea y lo escribe en stdout. Asi una solicitud nunca espera a que stdout
+# (el pipe de Render/gunicorn) acepte la escritura.
+#   LOG_LEVEL   DEBUG | INFO | WARNING | ERROR (por defecto INFO; en DEBUG se activan los logs de /login)
+#   LOG_FORMATO texto | json (json: un objeto por linea con los campos extra del registro)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMATO = os.getenv("LOG_FORMATO", "texto").lower()
+LOG_COLA_MAXIMA = int(os.getenv("LOG_COLA_MAXIMA", "10000"))
+
+# Atributos propios de LogRecord: todo lo demas viene de extra={...} y se incluye en el JSON
+_ATRIBUTOS_REGISTRO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_estado = {"cola": None, "listener": None, "descartados": 0}
+_lock = threading.Lock()
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una linea JSON por registro: ts, nivel, logger, mensaje, pid y los campos de extra={...}."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+            "pid": record.process,
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_REGISTRO and not clave.startswith("_"):
+                datos[clave] = valor
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class _QueueHandlerNoBloqueante(logging.handlers.QueueHandler):
+    """Si la cola esta llena (stdout atascado) descarta el registro en lugar de bloquear o fallar."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _estado["descartados"] += 1
+
+
+def _crear_handler_salida() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMATO == "json":
+        handler.setFormatter(FormateadorJSON())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"))
+    return handler
+
+
+def _iniciar_listener():
+    listener = logging.handlers.QueueListener(_estado["cola"], _crear_handler_salida(), respect_handler_level=False)
+    listener.start()
+    _estado["listener"] = listener
+
+
+def _reiniciar_en_hijo():
+    # Despues de un fork (workers de gunicorn con preload) el hilo del listener no existe en el hijo
+    if _estado["cola"] is not None:
+        _estado["cola"] = queue.Queue(LOG_COLA_MAXIMA)
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, _QueueHandlerNoBloqueante):
+                handler.queue = _estado["cola"]
+        _iniciar_listener()
+
+
+def detener_logging():
+    """Vacia la cola y detiene el hilo de escritura (se llama al salir del proceso)."""
+    listener = _estado["listener"]
+    if listener is not None:
+        _estado["listener"] = None
+        listener.stop()
+
+
+def configurar_logging():
+    """Configura el logger raiz con la cola y el hilo de escritura. Llamarla mas de una vez no hace nada."""
+    with _lock:
+        if _estado["cola"] is not None:
+            return
+        _estado["cola"] = queue.Queue(LOG_COLA_MAXIMA)
+        raiz = logging.getLogger()
+        for handler in list(raiz.handlers):
+            raiz.removeHandler(handler)
+        raiz.addHandler(_QueueHandlerNoBloqueante(_estado["cola"]))
+        raiz.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        _iniciar_listener()
+        atexit.register(detener_logging)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_reiniciar_en_hijo)
+
+
+def estadisticas_logging() -> dict:
+    """Nivel y formato configurados, registros pendientes en la cola y descartados por cola llena."""
+    cola = _estado["cola"]
+    return {
+        "nivel": logging.getLevelName(logging.getLogger().level),
+        "formato": LOG_FORMATO,
+        "en_cola": cola.qsize() if cola is not None else 0,
+        "descartados": _estado["descartados"],
+    }
@@ -1,12 +1,97 @@
 # src/app/routes/auth_middleware.py
 
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
 from flask import request, jsonify
 from functools import wraps
-from firebase_admin import auth # Asegúrate de que 'auth' está importado aquí
+
+from inicio_firebase import asegurar_firebase
+from .claves_firma import almacen_claves, AutenticacionNoDisponible
+
+logger = logging.getLogger(__name__)
+
+# --- Cache LRU de tokens ya verificados ---
+# El frontend envía el mismo ID token durante hasta una hora; verificar la firma RS256 en cada
+# solicitud es trabajo repetido. Guardamos el token decodificado (clave: SHA-256 del token, nunca
+# el token en claro) hasta su 'exp', con un máximo de entradas (se descartan las menos usadas).
+TOKENS_CACHE_MAXIMO = int(os.getenv("TOKENS_CACHE_MAXIMO", "2048"))
+
+_tokens_verificados = OrderedDict()  # sha256(token) -> (exp, token decodificado)
+_lock_tokens = threading.Lock()
+
+# Verificación local de la firma con certificados precargados (ver claves_firma.py).
+# Con FIREBASE_VERIFICACION_LOCAL=0, o si no se conoce el project id, se usa auth.verify_id_token.
+FIREBASE_VERIFICACION_LOCAL = os.getenv("FIREBASE_VERIFICACION_LOCAL", "1").lower() in ("1", "true", "si")
+
+# Custom claim de Firebase que habilita los endpoints de operacion (ej. /api/metricas). Se asigna
+# desde el Admin SDK: auth.set_custom_user_claims(uid, {"admin": True})
+CLAIM_ADMINISTRADOR = os.getenv("FIREBASE_CLAIM_ADMIN", "admin")
+
+
+def _obtener_project_id():
+    project_id = os.getenv("FIREBASE_PROJECT_ID")
+    if project_id:
+        return project_id
+    if not asegurar_firebase():
+        return None # Firebase Admin SDK no inicializado
+    import firebase_admin
+    try:
+        return firebase_admin.get_app().project_id
+    except ValueError:
+        return None
+
+
+def _verificar_firma(token: str) -> dict:
+    project_id = _obtener_project_id() if FIREBASE_VERIFICACION_LOCAL else None
+    if project_id:
+        return almacen_claves.verificar(token, project_id)
+    # firebase_admin se importa (y se inicializa) recien cuando hace falta
+    if not asegurar_firebase():
+        raise AutenticacionNoDisponible("Firebase Admin SDK no está inicializado.")
+    from firebase_admin import auth
+    return auth.verify_id_token(token)
+
+
+def verificar_token(token: str) -> dict:
+    """
+    Verifica un ID token de Firebase y devuelve el token decodificado.
+    Si el mismo token ya se verificó y no ha expirado, se devuelve sin volver a verificar la firma.
+    Lanza una excepción (ValueError o las de firebase_admin.auth) si el token no es válido, o
+    AutenticacionNoDisponible si no hay con qué verificarlo.
+    """
+    clave = hashlib.sha256(token.encode("utf-8")).digest()
+    ahora = time.time()
+    with _lock_tokens:
+        entrada = _tokens_verificados.get(clave)
+        if entrada is not None:
+            if entrada[0] > ahora:
+                _tokens_verificados.move_to_end(clave)
+                return entrada[1]
+            del _tokens_verificados[clave]
+
+    decoded_token = _verificar_firma(token)
+
+    exp = decoded_token.get('exp')
+    if exp and exp > ahora and TOKENS_CACHE_MAXIMO > 0:
+        with _lock_tokens:
+            _tokens_verificados[clave] = (exp, decoded_token)
+            _tokens_verificados.move_to_end(clave)
+            while len(_tokens_verificados) > TOKENS_CACHE_MAXIMO:
+                _tokens_verificados.popitem(last=False)
+    return decoded_token
+
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        # Las preflight CORS no llevan token: se dejan pasar sin verificar nada
+        if request.method == 'OPTIONS':
+            return f(*args, **kwargs)
+
         token = None
         # Firebase token se envía en el encabezado Authorization como 'Bearer <token>'
         if 'Authorization' in request.headers:
@@ -20,16 +105,31 @@ def token_required(f):
         try:
             # Verificar el token de Firebase
             # Esto decodifica el token y verifica su firma, expiración, etc.
-            decoded_token = auth.verify_id_token(token)
+            # (si el token ya se verificó antes y no expiró, sale del cache sin verificar la firma)
+            decoded_token = verificar_token(token)
             # El UID del usuario autenticado se almacena en el request context
             # para que las funciones de ruta puedan acceder a él.
             request.user_id = decoded_token['uid']
             request.user_email = decoded_token.get('email') # Opcional, si necesitas el email
+            request.user_claims = decoded_token
 
+        except AutenticacionNoDisponible as e:
+            logger.debug("Verificación de token sin Firebase disponible: %s", e)
+            return jsonify({'message': 'Servicio de autenticación no disponible'}), 503
         except Exception as e:
             # Manejo de varios errores que Firebase puede lanzar (token expirado, inválido, etc.)
-            print(f"Error al verificar el token de Firebase: {e}")
+            logger.debug("Error al verificar el token de Firebase: %s", e)
             return jsonify({'message': 'Token inválido o expirado!', 'error': str(e)}), 401 # Unauthorized
 
         return f(*args, **kwargs)
-    return decorated
\ No newline at end of file
+    return decorated
+
+
+def admin_required(f):
+    """Como token_required, pero ademas exige que el token tenga el claim CLAIM_ADMINISTRADOR en true (403 si no)."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.method != 'OPTIONS' and request.user_claims.get(CLAIM_ADMINISTRADOR) is not True:
+            return jsonify({'message': 'Se requieren permisos de administrador.'}), 403 # Forbidden
+        return f(*args, **kwargs)
+    return token_required(decorated)
@@ -0,0 +1,44 @@
+# routes/autocompletado_routes.py
+
+from flask import Blueprint, jsonify, request
+
+from handlers.autocompletado_handlers import FUENTES, sugerir_nombres
+
+from .auth_middleware import token_required
+
+# Blueprint del autocompletado del buscador: sugiere nombres de productos, planes y clases
+# mientras el usuario escribe. Responde desde un indice en memoria, sin ir a la DB por cada tecla.
+autocompletado_bp = Blueprint('autocompletado', __name__, url_prefix='/api/autocompletar')
+
+SUGERENCIAS_POR_DEFECTO = 10
+SUGERENCIAS_MAXIMO = 50
+LARGO_MAXIMO_PREFIJO = 100
+
+
+@autocompletado_bp.route("/", methods=["GET"]) # Se convierte en '/api/autocompletar/?q=prot&k=10&tipos=producto,plan'
+@token_required
+def get_autocompletar():
+    """Endpoint con las k primeras sugerencias (tipo, id y nombre) para el prefijo q."""
+    prefijo = request.args.get("q") or ""
+    if not prefijo.strip():
+        return jsonify([]), 200
+    if len(prefijo) > LARGO_MAXIMO_PREFIJO:
+        return jsonify({"error": f"q admite como maximo {LARGO_MAXIMO_PREFIJO} caracteres."}), 400
+    try:
+        k = int(request.args.get("k", SUGERENCIAS_POR_DEFECTO))
+    except ValueError:
+        return jsonify({"error": "k debe ser un numero entero."}), 400
+    if k < 1 or k > SUGERENCIAS_MAXIMO:
+        return jsonify({"error": f"k debe estar entre 1 y {SUGERENCIAS_MAXIMO}."}), 400
+
+    tipos = None
+    if request.args.get("tipos"):
+        tipos = {tipo.strip() for tipo in request.args["tipos"].split(",") if tipo.strip()}
+        desconocidos = tipos - FUENTES.keys()
+        if desconocidos:
+            return jsonify({"error": f"Tipos no validos: {', '.join(sorted(desconocidos))}. Usa {', '.join(FUENTES)}."}), 400
+
+    resultado = sugerir_nombres(prefijo, k, tipos)
+    if "error" in resultado:
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
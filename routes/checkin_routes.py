@@ -0,0 +1,22 @@
+# routes/checkin_routes.py
+
+from flask import Blueprint, jsonify, request
+
+from handlers.checkin_handlers import registrar_checkin
+
+from .auth_middleware import token_required
+
+# Blueprint del molinete de entrada: el socio presenta su token y se valida contra el mapa de socios activos
+checkin_bp = Blueprint('checkin', __name__, url_prefix='/api/checkin')
+
+
+@checkin_bp.route("/", methods=["POST"]) # Se convierte en '/api/checkin/'
+@token_required
+def post_checkin():
+    """Endpoint de check-in: 200 si el usuario tiene un plan vigente, 403 si no."""
+    resultado = registrar_checkin(request.user_id)
+    if "error" in resultado:
+        if resultado.get("motivo") == "sin_plan":
+            return jsonify(resultado), 403
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
@@ -1,6 +1,7 @@
 # src/app/routes/clase_routes.py
 
-from flask import Blueprint, jsonify, request # Importa Blueprint, jsonify, request
+from datetime import date
+from flask import Blueprint, jsonify, request, Response # Importa Blueprint, jsonify, request, Response
 
 # Importa las funciones handler especificas para clases
 from handlers.clase_handlers import (
@@ -8,29 +9,77 @@ from handlers.clase_handlers import (
     obtener_clase_por_id_sp,
     agregar_clase_sp,
     actualizar_clase_sp,
-    eliminar_clase_sp
+    eliminar_clase_sp,
+    flujo_todas_clases_sp,
+    obtener_clases_por_ids,
+    obtener_clases_en_horario
 )
+from indice_horarios import a_minutos, minuto_actual, MINUTOS_DIA
+from handlers.reserva_handlers import reservar_clase, cancelar_reserva, obtener_ocupacion_clase
+from utils import generar_json_array, parsear_ids
 
 # --- IMPORTANTE: Importa el decorador token_required ---
 from .auth_middleware import token_required
+from .etag_middleware import con_etag # ETag / If-None-Match para las lecturas
 
 clases_bp = Blueprint('clases', __name__, url_prefix='/api/clases')
 
+def _pide_en_curso() -> bool:
+    """?ahora=1: la respuesta depende de la hora actual y no lleva ETag."""
+    return request.args.get("ahora", "").lower() in ("1", "true", "si")
+
+
 # --- Rutas (Endpoints) definidas con el Blueprint ---
 # --- AHORA PROTEGIDAS CON @token_required ---
 
 @clases_bp.route("/", methods=["GET"]) # La ruta '/' aqui se convierte en '/api/clases/' por el url_prefix
 @token_required # <--- APLICA EL DECORADOR AQUÍ
+@con_etag("clases", excepto=_pide_en_curso) # Responde 304 si el cliente ya tiene la version actual
 def get_todas_clases():
-    """Endpoint para obtener todas las clases."""
+    """
+    Endpoint para obtener todas las clases (con ?stream=1 se envian por partes).
+    Con ?desde=HH:MM&hasta=HH:MM devuelve solo las que se dictan en esa franja (si desde > hasta
+    la franja cruza la medianoche) y con ?ahora=1 las que estan en curso.
+    """
     # Opcional: print(f"Usuario {request.user_email} (UID: {request.user_id}) solicitó todas las clases.")
+    if _pide_en_curso():
+        # Depende de la hora actual: sin ETag (no-store) para que nunca se responda con un 304 viejo
+        minuto = minuto_actual()
+        respuesta, status = _respuesta_horario(obtener_clases_en_horario(minuto, minuto))
+        respuesta.headers["Cache-Control"] = "no-store"
+        return respuesta, status
+    if "desde" in request.args or "hasta" in request.args:
+        try:
+            desde = a_minutos(request.args.get("desde") or "00:00")
+            hasta = a_minutos(request.args["hasta"]) if request.args.get("hasta") else MINUTOS_DIA
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return _respuesta_horario(obtener_clases_en_horario(desde, hasta))
+
+    if request.args.get("stream", "").lower() in ("1", "true", "si"):
+        # Modo streaming: el array JSON se emite por lotes a medida que se leen las filas
+        flujo = flujo_todas_clases_sp()
+        if isinstance(flujo, dict):
+            return jsonify(flujo), 500
+        respuesta = Response(generar_json_array(flujo), mimetype="application/json")
+        # Devuelve la conexion al pool aunque la respuesta nunca se llegue a iterar
+        respuesta.call_on_close(flujo.close)
+        return respuesta, 200
+
     resultado = obtener_todas_clases_sp() # Llama al handler de obtener todas
     if "error" in resultado:
         return jsonify(resultado), 500
     return jsonify(resultado), 200
+
+
+def _respuesta_horario(resultado):
+    if isinstance(resultado, dict) and "error" in resultado:
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
 #pp
 @clases_bp.route("/<int:id_clase>", methods=["GET"])
 @token_required # <--- APLICA EL DECORADOR AQUÍ
+@con_etag("clases")
 def get_clase_por_id(id_clase):
     """Endpoint para obtener una clase por su ID."""
     # Opcional: print(f"Usuario {request.user_email} (UID: {request.user_id}) solicitó clase ID: {id_clase}.")
@@ -101,4 +150,77 @@ def delete_clase(id_clase):
 
     if "error" in resultado:
         return jsonify(resultado), 500 # Error interno (ej: FK constraint)
-    return jsonify(resultado), 200 # OK
\ No newline at end of file
+    return jsonify(resultado), 200 # OK
+
+
+@clases_bp.route("/batch", methods=["GET"]) # Se convierte en '/api/clases/batch?ids=1,2,3'
+@token_required # <--- APLICA EL DECORADOR AQUÍ
+@con_etag("clases")
+def get_clases_por_lote():
+    """Endpoint para obtener varias clases por id en una sola consulta (?ids=1,2,3)."""
+    try:
+        ids = parsear_ids(request.args.get("ids"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    resultado = obtener_clases_por_ids(ids)
+    if "error" in resultado:
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
+
+
+# --- Reservas de cupos (el socio es el usuario del token) ---
+def _parsear_fecha(valor):
+    """'YYYY-MM-DD' -> date; sin valor se usa la fecha de hoy. Lanza ValueError si el formato es invalido."""
+    if not valor:
+        return date.today()
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError("La fecha debe tener formato YYYY-MM-DD.")
+
+
+def _respuesta_reserva(resultado, codigo_ok):
+    if "error" in resultado:
+        if resultado.get("motivo") == "no_encontrada":
+            return jsonify(resultado), 404
+        if resultado.get("motivo") in ("clase_llena", "duplicada"):
+            return jsonify(resultado), 409 # Conflict
+        return jsonify(resultado), 500
+    return jsonify(resultado), codigo_ok
+
+
+@clases_bp.route("/<int:id_clase>/reservas", methods=["POST"]) # Cuerpo opcional: {"fecha": "YYYY-MM-DD"}
+@token_required # <--- APLICA EL DECORADOR AQUÍ
+def post_reserva(id_clase):
+    """Endpoint para reservar un cupo de la clase. Responde 409 si la clase esta llena o ya hay reserva."""
+    datos = request.get_json(silent=True) or {}
+    try:
+        fecha = _parsear_fecha(datos.get("fecha") if isinstance(datos, dict) else None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fecha < date.today():
+        return jsonify({"error": "No se puede reservar una fecha pasada."}), 400
+    return _respuesta_reserva(reservar_clase(id_clase, request.user_id, fecha), 201)
+
+
+@clases_bp.route("/<int:id_clase>/reservas", methods=["DELETE"]) # '?fecha=YYYY-MM-DD' (por defecto hoy)
+@token_required # <--- APLICA EL DECORADOR AQUÍ
+def delete_reserva(id_clase):
+    """Endpoint para cancelar la reserva del usuario y liberar el cupo."""
+    try:
+        fecha = _parsear_fecha(request.args.get("fecha"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _respuesta_reserva(cancelar_reserva(id_clase, request.user_id, fecha), 200)
+
+
+@clases_bp.route("/<int:id_clase>/reservas", methods=["GET"]) # '?fecha=YYYY-MM-DD' (por defecto hoy)
+@token_required # <--- APLICA EL DECORADOR AQUÍ
+def get_reservas(id_clase):
+    """Endpoint con el cupo, los lugares disponibles y si el usuario ya tiene reserva."""
+    try:
+        fecha = _parsear_fecha(request.args.get("fecha"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _respuesta_reserva(obtener_ocupacion_clase(id_clase, request.user_id, fecha), 200)
@@ -0,0 +1,151 @@
+# routes/claves_firma.py
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# --- Verificación local de ID tokens de Firebase ---
+# Los ID tokens de Firebase se firman con RS256 usando claves cuyos certificados publica Google.
+# firebase_admin descarga esos certificados de forma perezosa, así que la solicitud que cae justo
+# cuando expira su cache paga una descarga remota. Aquí mantenemos los certificados en memoria,
+# los refrescamos en un hilo de fondo antes de que expiren (según el Cache-Control de Google) y
+# verificamos los tokens localmente, sin I/O en el camino de la solicitud.
+#
+# La primera descarga arranca al iniciar la app (app.py) y, con gunicorn, se reanuda en cada worker
+# (post_fork). Una solicitud que llega antes de que termine no la espera: se responde 503 de inmediato
+# (AutenticacionNoDisponible) y el cliente reintenta.
+URL_CERTIFICADOS = os.getenv(
+    "FIREBASE_CERTS_URL",
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+)
+EMISOR_FIREBASE = "https://securetoken.google.com/"
+FRACCION_REFRESCO = 0.8          # se refresca al 80% del max-age publicado
+MAX_AGE_POR_DEFECTO = 3600       # si la respuesta no trae Cache-Control
+REINTENTO_SEGUNDOS = 30          # espera antes de reintentar una descarga fallida
+
+_patron_max_age = re.compile(r"max-age=(\d+)")
+
+
+class AutenticacionNoDisponible(Exception):
+    """No hay forma de verificar tokens ahora: sin certificados, o sin project id y sin Firebase Admin SDK."""
+
+
+class AlmacenClavesFirma:
+    """Certificados de firma en memoria con refresco periódico en segundo plano."""
+
+    def __init__(self, url: str = URL_CERTIFICADOS):
+        self.url = url
+        self._certificados = {}
+        self._expira = 0.0
+        self._lock = threading.Lock()
+        self._cargado = threading.Event()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self._ultima_descarga = 0.0
+
+    def _descargar(self) -> tuple:
+        """Descarga {kid: certificado PEM} y devuelve (certificados, max_age en segundos)."""
+        with urllib.request.urlopen(self.url, timeout=10) as respuesta:
+            certificados = json.loads(respuesta.read().decode("utf-8"))
+            coincidencia = _patron_max_age.search(respuesta.headers.get("Cache-Control", ""))
+        max_age = int(coincidencia.group(1)) if coincidencia else MAX_AGE_POR_DEFECTO
+        return certificados, max_age
+
+    def refrescar(self) -> int:
+        """Descarga los certificados y los reemplaza en memoria. Devuelve el max-age recibido."""
+        self._ultima_descarga = time.time()
+        certificados, max_age = self._descargar()
+        with self._lock:
+            self._certificados = certificados
+            self._expira = time.time() + max_age
+        self._cargado.set()
+        return max_age
+
+    def _bucle_refresco(self):
+        # Si ya hay certificados vigentes (heredados del master tras el fork, o precargados) no se
+        # descargan de nuevo: se espera al refresco que les corresponde
+        vigencia = self._expira - time.time()
+        espera = vigencia * FRACCION_REFRESCO if self._cargado.is_set() and vigencia > REINTENTO_SEGUNDOS else 0
+        while True:
+            self._despertar.wait(espera)
+            self._despertar.clear()
+            try:
+                espera = max(self.refrescar() * FRACCION_REFRESCO, REINTENTO_SEGUNDOS)
+            except Exception as e:
+                logger.warning(f"Error al refrescar los certificados de Firebase: {e}")
+                espera = REINTENTO_SEGUNDOS
+
+    def iniciar(self):
+        """Arranca (una vez por proceso) el hilo de refresco. Seguro de llamar después de un fork."""
+        pid = os.getpid()
+        if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+            return
+        if self._pid is not None and self._pid != pid:
+            # Proceso hijo de un fork (worker de gunicorn con preload): los locks pueden haber quedado
+            # tomados por el hilo de refresco del padre, que aqui no existe. Los certificados que el
+            # padre ya habia descargado se conservan y sirven desde la primera solicitud.
+            self._lock = threading.Lock()
+            self._despertar = threading.Event()
+            self._cargado = threading.Event()
+            if self._certificados:
+                self._cargado.set()
+        with self._lock:
+            if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+                return
+            self._pid = pid
+            self._hilo = threading.Thread(target=self._bucle_refresco, name="refresco-claves-firebase", daemon=True)
+            self._hilo.start()
+
+    def solicitar_refresco(self):
+        """Pide al hilo de fondo una descarga inmediata (sin bloquear a quien llama), como máximo cada REINTENTO_SEGUNDOS."""
+        if time.time() - self._ultima_descarga >= REINTENTO_SEGUNDOS:
+            self._despertar.set()
+
+    def certificados(self) -> dict:
+        """Certificados en memoria. Lanza AutenticacionNoDisponible si la primera descarga no termino."""
+        self.iniciar()
+        if not self._cargado.is_set():
+            self.solicitar_refresco()
+            raise AutenticacionNoDisponible("Los certificados de Firebase todavía no se descargaron.")
+        return self._certificados
+
+    def verificar(self, token: str, project_id: str) -> dict:
+        """
+        Verifica firma, exp/iat, aud, iss y sub de un ID token con las mismas reglas que
+        firebase_admin.auth.verify_id_token, usando solo los certificados en memoria.
+        Lanza ValueError si el token no es válido y AutenticacionNoDisponible si aún no hay certificados.
+        """
+        from google.auth import jwt as google_jwt # Importado aqui: google.auth (cryptography) alarga el arranque
+
+        certificados = self.certificados()
+
+        header = google_jwt.decode_header(token)
+        if header.get("alg") != "RS256":
+            raise ValueError(f"El token tiene un algoritmo incorrecto: {header.get('alg')}. Se espera RS256.")
+        kid = header.get("kid")
+        if not kid:
+            raise ValueError('El token no tiene "kid".')
+        if kid not in certificados:
+            # Google rotó las claves antes de nuestro próximo refresco: se refresca en segundo plano
+            self.solicitar_refresco()
+            raise ValueError(f"No se encontró el certificado para el kid {kid}.")
+
+        claims = google_jwt.decode(token, certs=certificados, audience=project_id)
+
+        if claims.get("iss") != EMISOR_FIREBASE + project_id:
+            raise ValueError(f'El token tiene un "iss" incorrecto: {claims.get("iss")}.')
+        sub = claims.get("sub")
+        if not isinstance(sub, str) or not sub or len(sub) > 128:
+            raise ValueError('El token tiene un "sub" inválido.')
+        claims["uid"] = sub
+        return claims
+
+
+almacen_claves = AlmacenClavesFirma()
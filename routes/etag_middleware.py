@@ -0,0 +1,54 @@
+# routes/etag_middleware.py
+
+from functools import wraps
+
+from flask import request, make_response
+
+from cache import EPOCA_ARRANQUE, obtener_version
+
+# El ETag sale de la version de la tabla, no del cuerpo: revalidar cuesta leer un contador en
+# memoria y el 304 se responde sin llamar a la ruta ni a la DB. Las versiones son compartidas por
+# todos los workers de gunicorn (ver cache.py), asi que cualquier worker reconoce el ETag emitido
+# por otro; la epoca de arranque evita que un contador reiniciado tras un deploy repita un ETag viejo.
+#
+# El ETag solo cambia con escrituras que pasan por incrementar_version: una modificacion hecha
+# fuera de la app (SQL a mano, otro servicio) se vera en el ETag recien con la siguiente escritura
+# de la tabla o un reinicio.
+
+
+def calcular_etag(tabla: str) -> str:
+    """ETag fuerte derivado de la version compartida de la tabla, sin leer la DB."""
+    return f"{tabla}-{EPOCA_ARRANQUE}-{obtener_version(tabla)}"
+
+
+def con_etag(tabla: str, excepto=None):
+    """
+    Decorador para rutas GET: responde 304 si el If-None-Match del cliente coincide con la
+    version actual de la tabla (sin llamar a la ruta) y agrega el ETag a las respuestas 200.
+    `excepto` es una funcion sin argumentos que devuelve True para las solicitudes que no deben
+    llevar ETag (las que dependen de la hora actual, por ejemplo). Tampoco se agrega a las
+    respuestas que la ruta marca con Cache-Control: no-store.
+    """
+    def decorador(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if excepto is not None and excepto():
+                return f(*args, **kwargs)
+
+            # Se lee antes de ejecutar la ruta: si hay una escritura mientras tanto, el cuerpo es
+            # igual o mas nuevo que el ETag y la proxima revalidacion trae los datos nuevos
+            etag = calcular_etag(tabla)
+            if request.if_none_match.contains(etag):
+                respuesta = make_response("", 304)
+                respuesta.set_etag(etag)
+                respuesta.headers["Cache-Control"] = "private, no-cache"
+                return respuesta
+
+            respuesta = make_response(f(*args, **kwargs))
+            if respuesta.status_code == 200 and "no-store" not in respuesta.headers.get("Cache-Control", ""):
+                respuesta.set_etag(etag)
+                # Obliga al navegador a revalidar siempre con If-None-Match
+                respuesta.headers["Cache-Control"] = "private, no-cache"
+            return respuesta
+        return decorated
+    return decorador
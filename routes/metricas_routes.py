@@ -0,0 +1,82 @@
+# routes/metricas_routes.py
+
+from flask import Blueprint, jsonify
+
+from cache import estadisticas_cache
+from utils import estadisticas_sp
+from database import obtener_estadisticas_pool
+from instrumentacion_sql import estadisticas_sql
+from registro import estadisticas_logging
+from indice_productos import indice_productos
+from autocompletado import indice_autocompletado
+from vencimientos import barrido_vencimientos
+from socios_activos import socios_activos
+from escritura_diferida import estadisticas_escrituras
+
+from .auth_middleware import admin_required
+
+# Blueprint con endpoints de solo lectura para inspeccionar el estado interno del proceso
+# (cache, tiempos de procedimientos y sentencias SQL, pool de conexiones, cola de logs). No tocan la base de datos.
+# Exponen texto SQL, logs y el dimensionamiento del pool: todas requieren un token con el claim de
+# administrador (ver auth_middleware.admin_required) y app.py solo registra el blueprint con METRICAS_HABILITADAS=1.
+metricas_bp = Blueprint('metricas', __name__, url_prefix='/api/metricas')
+
+
+@metricas_bp.route("/cache", methods=["GET"])
+@admin_required
+def get_metricas_cache():
+    """Endpoint con los contadores de hits/misses y la version de cada tabla cacheada."""
+    return jsonify(estadisticas_cache()), 200
+
+
+@metricas_bp.route("/sp", methods=["GET"])
+@admin_required
+def get_metricas_sp():
+    """Endpoint con llamadas, errores y tiempos acumulados por procedimiento almacenado."""
+    return jsonify(estadisticas_sp()), 200
+
+
+@metricas_bp.route("/pool", methods=["GET"])
+@admin_required
+def get_metricas_pool():
+    """Endpoint con el uso del pool de conexiones: en uso, overflow, esperas de checkout y churn."""
+    return jsonify(obtener_estadisticas_pool()), 200
+
+
+@metricas_bp.route("/sql", methods=["GET"])
+@admin_required
+def get_metricas_sql():
+    """Endpoint con conteos y percentiles de latencia por sentencia SQL / procedimiento."""
+    return jsonify(estadisticas_sql()), 200
+
+
+@metricas_bp.route("/logs", methods=["GET"])
+@admin_required
+def get_metricas_logs():
+    """Endpoint con el nivel de log y el estado de la cola de escritura (pendientes y descartados)."""
+    return jsonify(estadisticas_logging()), 200
+
+
+@metricas_bp.route("/indices", methods=["GET"])
+@admin_required
+def get_metricas_indices():
+    """Endpoint con el tamano y la antiguedad de los indices de busqueda en memoria."""
+    return jsonify({
+        "productos": indice_productos.estadisticas(),
+        "autocompletado": indice_autocompletado.estadisticas(),
+        "socios_activos": socios_activos.estadisticas(),
+    }), 200
+
+
+@metricas_bp.route("/vencimientos", methods=["GET"])
+@admin_required
+def get_metricas_vencimientos():
+    """Endpoint con el estado del barrido de vencimientos: barridos, vencidas, heap en memoria y horizonte."""
+    return jsonify(barrido_vencimientos.estadisticas()), 200
+
+
+@metricas_bp.route("/escrituras", methods=["GET"])
+@admin_required
+def get_metricas_escrituras():
+    """Endpoint con los buffers de escritura diferida: encoladas, escritas, pendientes, descartadas y perdidas."""
+    return jsonify(estadisticas_escrituras()), 200
@@ -1,6 +1,6 @@
 # routes/plan_routes.py
 
-from flask import Blueprint, jsonify, request # Importa Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response # Importa Blueprint, jsonify, request, Response
 
 # Importa las funciones handler especificas para planes
 from handlers.plan_handlers import (
@@ -9,11 +9,15 @@ from handlers.plan_handlers import (
     obtener_plan_por_id_sp,
     agregar_plan_sp,
     actualizar_plan_sp,
-    eliminar_plan_sp
+    eliminar_plan_sp,
+    flujo_todos_planes_sp,
+    obtener_planes_por_ids
 )
+from utils import generar_json_array, parsear_ids
 
 # --- IMPORTANTE: Importa el decorador token_required ---
 from .auth_middleware import token_required
+from .etag_middleware import con_etag # ETag / If-None-Match para las lecturas
 
 # Crea un Blueprint para las rutas de planes
 # url_prefix es '/api/planes'
@@ -24,9 +28,20 @@ planes_bp = Blueprint('planes', __name__, url_prefix='/api/planes')
 
 @planes_bp.route("/", methods=["GET"]) # Se convierte en '/api/planes/'
 @token_required # <--- APLICA EL DECORADOR AQUÍ
+@con_etag("planes") # Responde 304 si el cliente ya tiene la version actual
 def get_todos_planes(): # Nombre de la funcion de ruta corregido
-    """Endpoint para obtener todos los planes."""
+    """Endpoint para obtener todos los planes (con ?stream=1 se envian por partes)."""
     # Opcional: print(f"Usuario {request.user_email} (UID: {request.user_id}) solicitó todos los planes.")
+    if request.args.get("stream", "").lower() in ("1", "true", "si"):
+        # Modo streaming: el array JSON se emite por lotes a medida que se leen las filas
+        flujo = flujo_todos_planes_sp()
+        if isinstance(flujo, dict):
+            return jsonify(flujo), 500
+        respuesta = Response(generar_json_array(flujo), mimetype="application/json")
+        # Devuelve la conexion al pool aunque la respuesta nunca se llegue a iterar
+        respuesta.call_on_close(flujo.close)
+        return respuesta, 200
+
     resultado = obtener_todos_planes_sp() # Llama al handler con el nombre corregido
     if "error" in resultado:
         return jsonify(resultado), 500
@@ -34,6 +49,7 @@ def get_todos_planes(): # Nombre de la funcion de ruta corregido
 
 @planes_bp.route("/<int:id_plan>", methods=["GET"]) # Se convierte en '/api/planes/<int:id_plan>'
 @token_required # <--- APLICA EL DECORADOR AQUÍ
+@con_etag("planes")
 def get_plan_por_id(id_plan):
     """Endpoint para obtener un plan por su ID."""
     # Opcional: print(f"Usuario {request.user_email} (UID: {request.user_id}) solicitó plan ID: {id_plan}.")
@@ -107,4 +123,20 @@ def delete_plan(id_plan):
 
     if "error" in resultado:
         return jsonify(resultado), 500 # Error interno (ej: FK)
-    return jsonify(resultado), 200 # OK
\ No newline at end of file
+    return jsonify(resultado), 200 # OK
+
+
+@planes_bp.route("/batch", methods=["GET"]) # Se convierte en '/api/planes/batch?ids=1,2,3'
+@token_required # <--- APLICA EL DECORADOR AQUÍ
+@con_etag("planes")
+def get_planes_por_lote():
+    """Endpoint para obtener varios planes por id en una sola consulta (?ids=1,2,3)."""
+    try:
+        ids = parsear_ids(request.args.get("ids"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    resultado = obtener_planes_por_ids(ids)
+    if "error" in resultado:
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
@@ -1,25 +1,61 @@
 
-from flask import Blueprint, jsonify, request, g
-from decimal import Decimal
+from flask import Blueprint, jsonify, request, g, Response
+from decimal import Decimal, InvalidOperation
+import json
 
 from handlers.producto_handlers import (
     obtener_todos_productos_sp,
     obtener_producto_por_id_sp,
     agregar_producto_sp,
     actualizar_producto_sp,
-    eliminar_producto_sp
+    eliminar_producto_sp,
+    obtener_productos_paginados,
+    flujo_todos_productos_sp,
+    obtener_productos_por_ids,
+    agregar_productos_bulk,
+    ajustar_stock_productos,
+    buscar_productos
 )
+from utils import usa_paginacion, parsear_parametros_paginacion, generar_json_array, parsear_ids
+from indice_productos import indice_productos # al_dia: la busqueda va sin ETag mientras se pone al dia
 
 from .auth_middleware import token_required
+from .etag_middleware import con_etag
 
 productos_bp = Blueprint('productos', __name__, url_prefix='/api/productos')
 #rutas publlicas 
 
 @productos_bp.route("/", methods=["GET"])
 #@token_required # <--- Aplica el decorador aquí para PROTEGER esta ruta
+@con_etag("productos") # Responde 304 si el cliente ya tiene la version actual
 def get_todos_productos():
-    """Endpoint para obtener todos los productos."""
+    """
+    Endpoint para obtener todos los productos.
+    Con ?limit=&after_id=&fields=&precio_min=&precio_max=&en_stock= devuelve una pagina
+    {"items": [...], "next": <after_id de la siguiente pagina o null>}.
+    Con ?stream=1 el listado completo se envia por partes, sin serializarlo entero de una vez.
+    """
     # Opcional: print(f"Usuario {request.user_email} (UID: {request.user_id}) solicitó todos los productos.")
+    if usa_paginacion(request.args):
+        try:
+            parametros = parsear_parametros_paginacion(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        resultado = obtener_productos_paginados(**parametros)
+        if "error" in resultado:
+            return jsonify(resultado), 500
+        return jsonify(resultado), 200
+
+    if request.args.get("stream", "").lower() in ("1", "true", "si"):
+        # Modo streaming: el array JSON se emite por lotes a medida que se leen las filas
+        flujo = flujo_todos_productos_sp()
+        if isinstance(flujo, dict):
+            return jsonify(flujo), 500
+        respuesta = Response(generar_json_array(flujo), mimetype="application/json")
+        # Devuelve la conexion al pool aunque la respuesta nunca se llegue a iterar
+        respuesta.call_on_close(flujo.close)
+        return respuesta, 200
+
     resultado = obtener_todos_productos_sp()
     if "error" in resultado:
         return jsonify(resultado), 500
@@ -27,6 +63,7 @@ def get_todos_productos():
 
 @productos_bp.route("/<int:id_producto>", methods=["GET"])
 #@token_required # <--- Aplica el decorador aquí para PROTEGER esta ruta
+@con_etag("productos")
 def get_producto_por_id(id_producto):
     """Endpoint para obtener un producto por su ID."""
     # Opcional: print(f"Usuario {request.user_email} (UID: {request.user_id}) solicitó producto ID: {id_producto}.")
@@ -122,4 +159,183 @@ def delete_producto(id_producto):
 
     if "error" in resultado:
         return jsonify(resultado), 500
-    return jsonify(resultado), 200
\ No newline at end of file
+    return jsonify(resultado), 200
+
+
+@productos_bp.route("/batch", methods=["GET"]) # Se convierte en '/api/productos/batch?ids=1,2,3'
+#@token_required # <--- Aplica el decorador aquí para PROTEGER esta ruta
+@con_etag("productos")
+def get_productos_por_lote():
+    """Endpoint para obtener varios productos por id en una sola consulta (?ids=1,2,3)."""
+    try:
+        ids = parsear_ids(request.args.get("ids"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    resultado = obtener_productos_por_ids(ids)
+    if "error" in resultado:
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
+
+
+# --- Busqueda ---
+LIMITE_BUSQUEDA_POR_DEFECTO = 20
+LIMITE_BUSQUEDA_MAXIMO = 100
+LARGO_MAXIMO_CONSULTA = 200
+
+
+@productos_bp.route("/search", methods=["GET"]) # Se convierte en '/api/productos/search?q=proteina&limit=20'
+#@token_required # <--- Aplica el decorador aquí para PROTEGER esta ruta
+@con_etag("productos")
+def get_buscar_productos():
+    """Endpoint de busqueda por nombre y descripcion, sin distinguir tildes ni mayusculas."""
+    consulta = (request.args.get("q") or "").strip()
+    if not consulta:
+        return jsonify({"error": "El parametro q es obligatorio."}), 400
+    if len(consulta) > LARGO_MAXIMO_CONSULTA:
+        return jsonify({"error": f"q admite como maximo {LARGO_MAXIMO_CONSULTA} caracteres."}), 400
+    try:
+        limite = int(request.args.get("limit", LIMITE_BUSQUEDA_POR_DEFECTO))
+    except ValueError:
+        return jsonify({"error": "limit debe ser un numero entero."}), 400
+    if limite < 1 or limite > LIMITE_BUSQUEDA_MAXIMO:
+        return jsonify({"error": f"limit debe estar entre 1 y {LIMITE_BUSQUEDA_MAXIMO}."}), 400
+
+    resultado = buscar_productos(consulta, limite)
+    if "error" in resultado:
+        return jsonify(resultado), 500
+    respuesta = jsonify(resultado)
+    if not indice_productos.al_dia:
+        # El indice se esta reconstruyendo con escrituras de otro worker: sin ETag, para que el
+        # cliente no guarde como vigente un resultado anterior a la version actual
+        respuesta.headers["Cache-Control"] = "no-store"
+    return respuesta, 200
+
+
+# --- Carga masiva ---
+MAXIMO_PRODUCTOS_BULK = 10000
+
+
+def _validar_producto(datos) -> tuple:
+    """Valida una fila de la carga masiva. Devuelve (producto_normalizado, None) o (None, mensaje_error)."""
+    if not isinstance(datos, dict):
+        return None, "Cada producto debe ser un objeto JSON."
+
+    nombre = datos.get("nombre")
+    if not isinstance(nombre, str) or not nombre.strip():
+        return None, "El nombre es obligatorio."
+    try:
+        precio = Decimal(str(datos.get("precio")))
+    except (InvalidOperation, ValueError, TypeError):
+        return None, "El precio debe ser un número válido."
+    if not precio.is_finite() or precio < 0:
+        return None, "El precio debe ser un número válido."
+    stock = datos.get("stock")
+    if isinstance(stock, bool) or not isinstance(stock, int) or stock < 0:
+        return None, "El stock debe ser un entero mayor o igual a 0."
+
+    return {
+        "nombre": nombre,
+        "descripcion": datos.get("descripcion"),
+        "precio": precio,
+        "stock": stock,
+        "imagen_url": datos.get("imagen_url"),
+    }, None
+
+
+def _leer_productos_bulk() -> list:
+    """Lee el cuerpo como array JSON o como NDJSON (un producto por linea). Lanza ValueError si no es valido."""
+    if "ndjson" in (request.content_type or ""):
+        cuerpo = request.get_data(as_text=True)
+        try:
+            return [json.loads(linea) for linea in cuerpo.splitlines() if linea.strip()]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"NDJSON invalido: {e}")
+
+    datos = request.get_json(silent=True)
+    if not isinstance(datos, list):
+        raise ValueError("Se espera un array JSON de productos (o NDJSON con Content-Type application/x-ndjson).")
+    return datos
+
+
+@productos_bp.route("/bulk", methods=["POST"])
+@token_required # <--- Aplica el decorador aquí para PROTEGER esta ruta
+def add_productos_bulk():
+    """
+    Endpoint para agregar muchos productos de una vez.
+    Todas las filas se validan antes de insertar: si alguna es invalida no se inserta ninguna.
+    """
+    try:
+        filas = _leer_productos_bulk()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not filas:
+        return jsonify({"error": "No se recibieron productos."}), 400
+    if len(filas) > MAXIMO_PRODUCTOS_BULK:
+        return jsonify({"error": f"Se permiten como maximo {MAXIMO_PRODUCTOS_BULK} productos por solicitud."}), 400
+
+    productos = []
+    resultados = []
+    for indice, datos in enumerate(filas):
+        producto, error = _validar_producto(datos)
+        if error:
+            resultados.append({"indice": indice, "estado": "error", "error": error})
+        else:
+            productos.append(producto)
+            resultados.append({"indice": indice, "estado": "valido"})
+
+    if len(productos) != len(filas):
+        return jsonify({
+            "error": "Hay productos invalidos; no se inserto ninguno.",
+            "insertados": 0,
+            "resultados": resultados
+        }), 400
+
+    resultado = agregar_productos_bulk(productos)
+    if "error" in resultado:
+        return jsonify(resultado), 500
+
+    resultado["resultados"] = [{"indice": indice, "estado": "insertado"} for indice in range(len(productos))]
+    return jsonify(resultado), 201
+
+
+# --- Ajustes de stock (ventas / reposiciones) ---
+MAXIMO_AJUSTES_STOCK = 500
+
+
+@productos_bp.route("/stock", methods=["POST"])
+@token_required # <--- Aplica el decorador aquí para PROTEGER esta ruta
+def ajustar_stock():
+    """
+    Endpoint para sumar/restar stock de forma atomica.
+    Cuerpo: {"ajustes": [{"id_producto": 1, "delta": -2}, ...]} (delta negativo = venta).
+    Responde 409 si algun producto quedaria con stock negativo; en ese caso no se aplica nada.
+    """
+    datos = request.get_json(silent=True)
+    ajustes_lista = datos.get("ajustes") if isinstance(datos, dict) else None
+    if not isinstance(ajustes_lista, list) or not ajustes_lista:
+        return jsonify({"error": "Se espera {\"ajustes\": [{\"id_producto\": ..., \"delta\": ...}]}."}), 400
+    if len(ajustes_lista) > MAXIMO_AJUSTES_STOCK:
+        return jsonify({"error": f"Se permiten como maximo {MAXIMO_AJUSTES_STOCK} ajustes por solicitud."}), 400
+
+    # Se agrupan los deltas por producto: un solo UPDATE por fila dentro de la transaccion
+    ajustes = {}
+    for ajuste in ajustes_lista:
+        id_producto = ajuste.get("id_producto") if isinstance(ajuste, dict) else None
+        delta = ajuste.get("delta") if isinstance(ajuste, dict) else None
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in (id_producto, delta)):
+            return jsonify({"error": "id_producto y delta deben ser enteros."}), 400
+        ajustes[id_producto] = ajustes.get(id_producto, 0) + delta
+    ajustes = {id_producto: delta for id_producto, delta in ajustes.items() if delta != 0}
+    if not ajustes:
+        return jsonify({"mensaje": "No hay cambios de stock que aplicar", "productos": []}), 200
+
+    resultado = ajustar_stock_productos(ajustes)
+    if "error" in resultado:
+        if resultado.get("motivo") == "no_encontrado":
+            return jsonify(resultado), 404
+        if resultado.get("motivo") == "stock_insuficiente":
+            return jsonify(resultado), 409
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
@@ -0,0 +1,58 @@
+# routes/suscripcion_routes.py
+
+from flask import Blueprint, jsonify, request
+
+from handlers.suscripcion_handlers import crear_suscripcion, obtener_suscripciones_usuario, cancelar_suscripcion
+from vencimientos import barrido_vencimientos
+
+from .auth_middleware import token_required
+
+# Blueprint de suscripciones: cada socio (request.user_id) ve, contrata y cancela sus propios planes
+suscripciones_bp = Blueprint('suscripciones', __name__, url_prefix='/api/suscripciones')
+
+
+@suscripciones_bp.before_app_request
+def _iniciar_barrido():
+    # El hilo de vencimientos arranca con la primera solicitud de cada worker (no en el proceso padre)
+    barrido_vencimientos.iniciar()
+
+
+@suscripciones_bp.route("/", methods=["GET"]) # Se convierte en '/api/suscripciones/'
+@token_required
+def get_mis_suscripciones():
+    """Endpoint con las suscripciones del usuario autenticado."""
+    resultado = obtener_suscripciones_usuario(request.user_id)
+    if "error" in resultado:
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
+
+
+@suscripciones_bp.route("/", methods=["POST"]) # Body: {"id_plan": 3}
+@token_required
+def post_suscripcion():
+    """Endpoint para suscribir al usuario a un plan (si ya tiene uno activo, se renueva a continuacion)."""
+    datos = request.get_json(silent=True)
+    id_plan = datos.get("id_plan") if isinstance(datos, dict) else None
+    if not isinstance(id_plan, int) or isinstance(id_plan, bool) or id_plan <= 0:
+        return jsonify({"error": "id_plan es obligatorio y debe ser un entero positivo."}), 400
+
+    resultado = crear_suscripcion(request.user_id, id_plan)
+    if "error" in resultado:
+        if resultado.get("motivo") == "no_encontrado":
+            return jsonify(resultado), 404
+        if resultado.get("motivo") == "plan_invalido":
+            return jsonify(resultado), 400
+        return jsonify(resultado), 500
+    return jsonify(resultado), 201
+
+
+@suscripciones_bp.route("/<int:id_suscripcion>", methods=["DELETE"]) # '/api/suscripciones/<id>'
+@token_required
+def delete_suscripcion(id_suscripcion):
+    """Endpoint para cancelar una suscripcion activa del usuario."""
+    resultado = cancelar_suscripcion(id_suscripcion, request.user_id)
+    if "error" in resultado:
+        if resultado.get("motivo") == "no_encontrado":
+            return jsonify(resultado), 404
+        return jsonify(resultado), 500
+    return jsonify(resultado), 200
@@ -0,0 +1,142 @@
+# socios_activos.py
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text, column, DateTime
+from cache import obtener_sello, hubo_escrituras_ajenas
+from database import engine
+from vencimientos import barrido_vencimientos
+
+logger = logging.getLogger(__name__)
+
+# --- Socios con plan vigente, en memoria, para el molinete ---
+# UID de Firebase -> fin de la cobertura (la fecha_vencimiento mas lejana de sus suscripciones activas).
+# Un check-in es un get() del dict y una comparacion de fechas: sin ir a MySQL.
+# Los UID son cadenas (no ids enteros densos), por eso un dict y no un bitmap.
+# Se mantiene al dia:
+#   - al suscribirse o cancelar en este worker (los handlers llaman a registrar / olvidar),
+#   - al vencer (oyente de barrido_vencimientos),
+#   - con una reconstruccion completa en segundo plano cuando otro worker escribe suscripciones
+#     (version compartida de 'suscripciones', ver cache.hubo_escrituras_ajenas) y cada
+#     SOCIOS_ACTIVOS_TTL segundos, para las escrituras hechas fuera de la app.
+# Un socio que no esta en el dict se consulta en la DB antes de negarle el paso (ej. se suscribio
+# hace un momento en otro worker); esa consulta solo ocurre para quienes no tienen plan vigente.
+# Mientras el mapa no refleja una escritura de otro worker (ej. una cancelacion) tambien se confirma
+# en la DB a quien si figura, asi nadie entra con un plan cancelado en otro worker.
+SOCIOS_ACTIVOS_TTL = int(os.getenv("SOCIOS_ACTIVOS_TTL", "300"))
+REINTENTO_RECONSTRUCCION_SEGUNDOS = 10  # tras una reconstruccion fallida, antes de volver a intentarla
+
+SQL_SOCIOS_ACTIVOS = text(
+    "SELECT id_usuario, MAX(fecha_vencimiento) AS vence FROM suscripciones "
+    "WHERE estado = 'activa' AND fecha_vencimiento > :p_ahora GROUP BY id_usuario"
+).columns(column("id_usuario"), column("vence", DateTime))
+SQL_VENCIMIENTO_SOCIO = text(
+    "SELECT MAX(fecha_vencimiento) FROM suscripciones "
+    "WHERE id_usuario = :p_id_usuario AND estado = 'activa' AND fecha_vencimiento > :p_ahora"
+).columns(column("vence", DateTime))
+
+
+class SociosActivos:
+    """Mapa UID -> fin de la cobertura de los socios con plan vigente."""
+
+    def __init__(self):
+        self._vencimientos = {}
+        self._construido_en = None
+        self._sello = None  # cache.obtener_sello("suscripciones") de antes de leer la DB
+        self._reconstruyendo = False
+        self._reintentar_desde = 0.0
+        self._lock = threading.Lock()
+
+    def construir(self, ahora: datetime | None = None):
+        sello = obtener_sello("suscripciones")
+        with engine.connect() as conn:
+            filas = conn.execute(SQL_SOCIOS_ACTIVOS, {"p_ahora": ahora or datetime.now()})
+            vencimientos = {fila.id_usuario: fila.vence for fila in filas}
+        self._vencimientos = vencimientos  # reemplazo atomico: las lecturas ven el dict viejo o el nuevo
+        self._sello = sello
+        self._construido_en = time.monotonic()
+
+    def _asegurar_actualizado(self) -> bool:
+        """Construye el mapa la primera vez. Devuelve False si le falta alguna escritura de otro worker."""
+        if self._construido_en is None:
+            with self._lock:
+                if self._construido_en is None:
+                    self.construir()
+            return True
+        al_dia = not hubo_escrituras_ajenas("suscripciones", self._sello)
+        ahora = time.monotonic()
+        vencido = ahora - self._construido_en >= SOCIOS_ACTIVOS_TTL
+        if (vencido or (not al_dia and ahora >= self._reintentar_desde)) and not self._reconstruyendo:
+            with self._lock:
+                if self._reconstruyendo:
+                    return al_dia
+                self._reconstruyendo = True
+            threading.Thread(target=self._reconstruir, daemon=True).start()
+        return al_dia
+
+    def _reconstruir(self):
+        try:
+            self.construir()
+        except Exception as e:
+            logger.warning(f"Error al reconstruir el mapa de socios activos: {e}")
+            self._construido_en = time.monotonic()  # se reintenta en el proximo TTL
+            self._reintentar_desde = time.monotonic() + REINTENTO_RECONSTRUCCION_SEGUNDOS
+        finally:
+            self._reconstruyendo = False
+
+    def vencimiento(self, id_usuario: str, ahora: datetime | None = None):
+        """Fin de la cobertura del socio si tiene un plan vigente, o None."""
+        al_dia = self._asegurar_actualizado()
+        ahora = ahora or datetime.now()
+        vence = self._vencimientos.get(id_usuario)
+        if al_dia and vence is not None and vence > ahora:
+            return vence
+        # No figura (o vencio), o el mapa todavia no refleja lo que escribio otro worker: se confirma en la DB
+        return self.recargar_usuario(id_usuario, ahora)
+
+    def recargar_usuario(self, id_usuario: str, ahora: datetime | None = None):
+        """Relee de la DB la cobertura de un socio que no tiene plan vigente en memoria."""
+        ahora = ahora or datetime.now()
+        with engine.connect() as conn:
+            vence = conn.execute(SQL_VENCIMIENTO_SOCIO, {"p_id_usuario": id_usuario, "p_ahora": ahora}).scalar()
+        if vence is None:
+            self._vencimientos.pop(id_usuario, None)
+        else:
+            self._vencimientos[id_usuario] = vence
+        return vence
+
+    def registrar(self, id_usuario: str, fecha_vencimiento: datetime):
+        """La llaman los handlers tras crear una suscripcion."""
+        if self._construido_en is None:
+            return
+        actual = self._vencimientos.get(id_usuario)
+        if actual is None or fecha_vencimiento > actual:
+            self._vencimientos[id_usuario] = fecha_vencimiento
+
+    def olvidar(self, id_usuario: str):
+        """Tras una cancelacion: el proximo check-in del socio se confirma en la DB."""
+        self._vencimientos.pop(id_usuario, None)
+
+    def quitar_vencidos(self, ids_usuario):
+        """Oyente de barrido_vencimientos: saca a los socios cuya cobertura ya termino."""
+        ahora = datetime.now()
+        for id_usuario in ids_usuario:
+            vence = self._vencimientos.get(id_usuario)
+            if vence is not None and vence <= ahora:
+                self._vencimientos.pop(id_usuario, None)
+
+    def estadisticas(self) -> dict:
+        return {
+            "construido": self._construido_en is not None,
+            "al_dia": self._sello is None or not hubo_escrituras_ajenas("suscripciones", self._sello),
+            "socios": len(self._vencimientos),
+            "antiguedad_s": round(time.monotonic() - self._construido_en, 1) if self._construido_en is not None else None,
+        }
+
+
+socios_activos = SociosActivos()
+barrido_vencimientos.al_vencer(socios_activos.quitar_vencidos)
@@ -0,0 +1,43 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event
+
+# Sin descarga de los certificados de Firebase al importar app (las pruebas de autenticacion la simulan)
+os.environ.setdefault("FIREBASE_VERIFICACION_LOCAL", "0")
+
+# Las pruebas importan los modulos de la raiz del proyecto (cache, utils, handlers...) igual que app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def engine_sqlite(tmp_path):
+    """SQLite en archivo con las tablas del catalogo y de reservas (en lugar de MySQL)."""
+    import database
+    import modelos.clases
+    import modelos.reservas
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'gimnasio.db'}", pool_size=10,
+                           connect_args={"timeout": 30, "check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _configurar(dbapi_conn, registro):
+        dbapi_conn.execute("PRAGMA journal_mode=WAL")
+
+    database.Base.metadata.create_all(engine, tables=[
+        database.Product.__table__, modelos.clases.Clase.__table__,
+        modelos.reservas.ReservaClase.__table__, modelos.reservas.OcupacionClase.__table__,
+    ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def token_valido(monkeypatch):
+    """token_required acepta cualquier 'Bearer <token>' como el socio 'socio-1'."""
+    from routes import auth_middleware
+    monkeypatch.setattr(auth_middleware, "verificar_token", lambda token: {"uid": "socio-1", "email": None})
+    return {"Authorization": "Bearer prueba"}
@@ -0,0 +1,61 @@
+# tests/test_ajuste_stock.py
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from handlers import producto_handlers
+from routes.producto_routes import productos_bp
+
+
+@pytest.fixture
+def cliente(engine_sqlite, token_valido, monkeypatch):
+    with engine_sqlite.begin() as conn:
+        conn.execute(text("INSERT INTO productos (id_producto, nombre, precio, stock) VALUES (:id, :nombre, 10, :stock)"),
+                     [{"id": 1, "nombre": "Proteina", "stock": 5}, {"id": 2, "nombre": "Creatina", "stock": 1}])
+    monkeypatch.setattr(producto_handlers, "engine", engine_sqlite)
+    auditados = []
+    monkeypatch.setattr(producto_handlers, "registrar_auditoria", lambda *args, **kwargs: auditados.append(args))
+    app = Flask(__name__)
+    app.register_blueprint(productos_bp)
+    cliente = app.test_client()
+    cliente.auditados = auditados
+    return cliente
+
+
+def _ajustar(cliente, ajustes, token):
+    return cliente.post("/api/productos/stock", json={"ajustes": ajustes}, headers=token)
+
+
+def _stocks(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT id_producto, stock FROM productos")).fetchall())
+
+
+def test_aplica_todos_los_ajustes(cliente, engine_sqlite, token_valido):
+    respuesta = _ajustar(cliente, [{"id_producto": 1, "delta": -2}, {"id_producto": 2, "delta": 3},
+                                   {"id_producto": 1, "delta": -1}], token_valido)
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["productos"] == [{"id_producto": 1, "stock": 2}, {"id_producto": 2, "stock": 4}]
+    assert _stocks(engine_sqlite) == {1: 2, 2: 4}
+    assert len(cliente.auditados) == 2
+
+
+def test_stock_insuficiente_responde_409_sin_aplicar_nada(cliente, engine_sqlite, token_valido):
+    respuesta = _ajustar(cliente, [{"id_producto": 1, "delta": -2}, {"id_producto": 2, "delta": -2}], token_valido)
+    assert respuesta.status_code == 409
+    assert respuesta.get_json()["id_producto"] == 2
+    assert _stocks(engine_sqlite) == {1: 5, 2: 1}
+    assert cliente.auditados == []
+
+
+def test_producto_inexistente_responde_404_sin_aplicar_nada(cliente, engine_sqlite, token_valido):
+    respuesta = _ajustar(cliente, [{"id_producto": 1, "delta": -1}, {"id_producto": 99, "delta": 1}], token_valido)
+    assert respuesta.status_code == 404
+    assert respuesta.get_json()["motivo"] == "no_encontrado"
+    assert _stocks(engine_sqlite) == {1: 5, 2: 1}
+
+
+def test_valida_el_cuerpo(cliente, token_valido):
+    assert _ajustar(cliente, [{"id_producto": 1, "delta": "2"}], token_valido).status_code == 400
+    assert cliente.post("/api/productos/stock", json={}, headers=token_valido).status_code == 400
@@ -0,0 +1,101 @@
+# tests/test_autenticacion.py
+
+import pytest
+from flask import Flask, jsonify
+
+import app as aplicacion
+from routes import auth_middleware
+
+
+@pytest.fixture
+def verificaciones(monkeypatch):
+    """Verificación local simulada; falla la prueba si se intenta inicializar Firebase Admin SDK."""
+    llamadas = []
+
+    def verificar(token, project_id):
+        llamadas.append((token, project_id))
+        if token == "admin":
+            return {"uid": "operador-1", "admin": True, "exp": 4102444800}
+        if token != "valido":
+            raise ValueError("Firma invalida")
+        return {"uid": "socio-1", "email": "socio@ejemplo.com", "exp": 4102444800}
+
+    monkeypatch.setattr(auth_middleware, "FIREBASE_VERIFICACION_LOCAL", True)
+    monkeypatch.setattr(auth_middleware.almacen_claves, "verificar", verificar)
+    monkeypatch.setattr(auth_middleware, "_tokens_verificados", auth_middleware.OrderedDict())
+    monkeypatch.setattr(auth_middleware, "asegurar_firebase", lambda: pytest.fail("no debe inicializar el SDK"))
+    return llamadas
+
+
+@pytest.fixture
+def cliente():
+    app = Flask(__name__)
+
+    @app.route("/protegida")
+    @aplicacion.token_required
+    def protegida():
+        from flask import request
+        return jsonify({"uid": request.user_id}), 200
+
+    return app.test_client()
+
+
+def test_con_project_id_verifica_localmente_sin_el_sdk(cliente, verificaciones, monkeypatch):
+    monkeypatch.setenv("FIREBASE_PROJECT_ID", "gimnasio")
+
+    for _ in range(2):
+        respuesta = cliente.get("/protegida", headers={"Authorization": "Bearer valido"})
+        assert respuesta.status_code == 200
+        assert respuesta.get_json() == {"uid": "socio-1"}
+    assert verificaciones == [("valido", "gimnasio")]  # la segunda sale del cache de tokens
+
+    assert cliente.get("/protegida", headers={"Authorization": "Bearer otro"}).status_code == 401
+
+
+def test_login_con_project_id_no_necesita_el_sdk(verificaciones, monkeypatch):
+    monkeypatch.setenv("FIREBASE_PROJECT_ID", "gimnasio")
+    respuesta = aplicacion.app.test_client().post("/login", json={"idToken": "valido"})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["uid"] == "socio-1"
+
+
+def test_sin_project_id_ni_sdk_responde_503(cliente, monkeypatch):
+    monkeypatch.delenv("FIREBASE_PROJECT_ID", raising=False)
+    monkeypatch.setattr(auth_middleware, "_tokens_verificados", auth_middleware.OrderedDict())
+    monkeypatch.setattr(auth_middleware, "asegurar_firebase", lambda: False)
+
+    assert cliente.get("/protegida", headers={"Authorization": "Bearer valido"}).status_code == 503
+    assert aplicacion.app.test_client().post("/login", json={"idToken": "valido"}).status_code == 503
+
+
+def test_metricas_exigen_el_claim_de_administrador(verificaciones, monkeypatch):
+    from routes.metricas_routes import metricas_bp
+    monkeypatch.setenv("FIREBASE_PROJECT_ID", "gimnasio")
+    app = Flask(__name__)
+    app.register_blueprint(metricas_bp)
+    cliente = app.test_client()
+
+    assert cliente.get("/api/metricas/cache").status_code == 401
+    assert cliente.get("/api/metricas/cache", headers={"Authorization": "Bearer valido"}).status_code == 403
+    assert cliente.get("/api/metricas/cache", headers={"Authorization": "Bearer admin"}).status_code == 200
+
+
+def test_sin_certificados_descargados_responde_503_sin_esperar(cliente, monkeypatch):
+    import threading
+    import time
+
+    from routes.claves_firma import AlmacenClavesFirma
+
+    liberar = threading.Event()
+    almacen = AlmacenClavesFirma()
+    monkeypatch.setattr(almacen, "_descargar", lambda: (liberar.wait(5), ({}, 3600))[1])
+    monkeypatch.setattr(auth_middleware, "almacen_claves", almacen)
+    monkeypatch.setattr(auth_middleware, "FIREBASE_VERIFICACION_LOCAL", True)
+    monkeypatch.setattr(auth_middleware, "_tokens_verificados", auth_middleware.OrderedDict())
+    monkeypatch.setenv("FIREBASE_PROJECT_ID", "gimnasio")
+
+    inicio = time.perf_counter()
+    respuesta = cliente.get("/protegida", headers={"Authorization": "Bearer valido"})
+    liberar.set()
+    assert respuesta.status_code == 503
+    assert time.perf_counter() - inicio < 1
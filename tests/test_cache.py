@@ -0,0 +1,110 @@
+# tests/test_cache.py
+
+import multiprocessing
+
+import pytest
+
+import cache
+
+
+@pytest.fixture(autouse=True)
+def cache_limpio(monkeypatch):
+    monkeypatch.setattr(cache, "_versiones", cache.VersionesCompartidas())
+    monkeypatch.setattr(cache, "_escrituras_propias", {})
+    monkeypatch.setattr(cache, "_entradas", {})
+    monkeypatch.setattr(cache, "_estadisticas", {})
+    monkeypatch.setattr(cache, "CACHE_TTL_SEGUNDOS", 30)
+
+
+def test_cacheado_carga_una_vez_por_version():
+    llamadas = []
+
+    @cache.cacheado("productos")
+    def obtener(id_producto):
+        llamadas.append(id_producto)
+        return {"id_producto": id_producto}
+
+    assert obtener(1) == {"id_producto": 1}
+    assert obtener(1) == {"id_producto": 1}
+    assert llamadas == [1]
+
+    cache.incrementar_version("productos")
+    obtener(1)
+    assert llamadas == [1, 1]
+    assert cache.estadisticas_cache()["productos"]["hits"] == 1
+
+
+def test_incrementar_version_solo_invalida_su_tabla():
+    cache.obtener_o_cargar("productos", "todos", lambda: ["p"])
+    cache.obtener_o_cargar("planes", "todos", lambda: ["q"])
+
+    cache.incrementar_version("productos")
+
+    assert cache.obtener_o_cargar("productos", "todos", lambda: ["p2"]) == ["p2"]
+    assert cache.obtener_o_cargar("planes", "todos", lambda: ["q2"]) == ["q"]
+
+
+def test_no_cachea_errores():
+    assert cache.obtener_o_cargar("clases", "todos", lambda: {"error": "sin DB"}) == {"error": "sin DB"}
+    assert cache.obtener_o_cargar("clases", "todos", lambda: ["c"]) == ["c"]
+
+
+def test_no_guarda_lo_cargado_durante_una_escritura():
+    def cargar():
+        cache.incrementar_version("planes")  # una escritura termina mientras se leia la DB
+        return ["viejo"]
+
+    assert cache.obtener_o_cargar("planes", "todos", cargar) == ["viejo"]
+    assert cache.obtener_o_cargar("planes", "todos", lambda: ["nuevo"]) == ["nuevo"]
+
+
+def test_las_entradas_caducan_con_la_ventana_de_ttl(monkeypatch):
+    ahora = [0.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: ahora[0])
+    cache.obtener_o_cargar("productos", "todos", lambda: ["a"])
+
+    ahora[0] = 29.0
+    assert cache.obtener_o_cargar("productos", "todos", lambda: ["b"]) == ["a"]
+    ahora[0] = 31.0
+    assert cache.obtener_o_cargar("productos", "todos", lambda: ["b"]) == ["b"]
+
+
+def test_no_cachea_no_encontrados():
+    assert cache.obtener_o_cargar("planes", ("por_id", 9), lambda: {"message": "no encontrado"}) == {"message": "no encontrado"}
+    assert cache.obtener_o_cargar("planes", ("por_id", 9), lambda: {"id_plan": 9}) == {"id_plan": 9}
+
+
+def test_cada_tabla_descarta_la_entrada_menos_usada(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAXIMO_ENTRADAS", 2)
+    cache.obtener_o_cargar("productos", 1, lambda: "uno")
+    cache.obtener_o_cargar("productos", 2, lambda: "dos")
+    cache.obtener_o_cargar("planes", 1, lambda: "plan")
+    cache.obtener_o_cargar("productos", 1, lambda: "otro")  # hit: 1 pasa a ser la mas reciente
+    cache.obtener_o_cargar("productos", 3, lambda: "tres")  # descarta 2
+
+    assert cache.estadisticas_cache()["productos"]["entradas"] == 2
+    assert cache.obtener_o_cargar("productos", 1, lambda: "otro") == "uno"
+    assert cache.obtener_o_cargar("productos", 2, lambda: "dos bis") == "dos bis"
+    assert cache.obtener_o_cargar("planes", 1, lambda: "otro") == "plan"
+
+
+def test_las_versiones_se_comparten_con_los_procesos_hijos():
+    contexto = multiprocessing.get_context("fork")
+    hijo = contexto.Process(target=cache.incrementar_version, args=("planes",))
+    hijo.start()
+    hijo.join()
+
+    assert hijo.exitcode == 0
+    assert cache.obtener_version("planes") == 1
+    assert cache.obtener_version("productos") == 0
+
+
+def test_sello_distingue_escrituras_propias_de_las_de_otro_worker():
+    sello = cache.obtener_sello("productos")
+    cache.incrementar_version("productos")
+    assert not cache.hubo_escrituras_ajenas("productos", sello)
+
+    # Otro worker incrementa la version compartida sin pasar por este proceso
+    cache._versiones.incrementar("productos")
+    assert cache.hubo_escrituras_ajenas("productos", sello)
+    assert not cache.hubo_escrituras_ajenas("productos", cache.obtener_sello("productos"))
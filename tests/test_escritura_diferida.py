@@ -0,0 +1,102 @@
+# tests/test_escritura_diferida.py
+
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import database
+import escritura_diferida
+import modelos.auditoria
+from auditoria import SQL_INSERTAR_AUDITORIA
+from escritura_diferida import BufferEscritura
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Proceso que encola filas de auditoria y termina enseguida: atexit debe escribirlas antes de salir
+HIJO = """
+import sys
+from sqlalchemy import create_engine
+import auditoria, escritura_diferida
+escritura_diferida.engine = create_engine("sqlite:///" + sys.argv[1])
+for i in range(int(sys.argv[2])):
+    auditoria.registrar_auditoria("producto", "actualizar", i, {"stock": i})
+"""
+
+
+def _fila(i):
+    return {"fecha_hora": datetime(2024, 1, 1), "id_usuario": "socio-1", "entidad": "producto",
+            "id_entidad": i, "accion": "actualizar", "detalle": None}
+
+
+def _crear_tabla(ruta):
+    engine = create_engine(f"sqlite:///{ruta}")
+    database.Base.metadata.create_all(engine, tables=[modelos.auditoria.RegistroAuditoria.__table__])
+    return engine
+
+
+def _contar(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM auditoria")).scalar()
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = _crear_tabla(tmp_path / "auditoria.db")
+    monkeypatch.setattr(escritura_diferida, "engine", engine)
+    monkeypatch.setattr(escritura_diferida, "_buffers", [])
+    yield engine
+    engine.dispose()
+
+
+def test_vaciar_todos_escribe_lo_pendiente_en_lotes(engine):
+    buffer = BufferEscritura("prueba", SQL_INSERTAR_AUDITORIA, tamano_lote=100, intervalo=60)
+    for i in range(250):
+        assert buffer.agregar(_fila(i))
+
+    escritura_diferida.vaciar_todos()
+
+    assert _contar(engine) == 250
+    estadisticas = buffer.estadisticas()
+    assert (estadisticas["escritas"], estadisticas["pendientes"]) == (250, 0)
+    assert estadisticas["lotes"] >= 3  # lotes de hasta 100 filas (el hilo de fondo puede haber escrito alguno)
+
+
+def test_cola_llena_sin_espera_descarta_y_cuenta(engine):
+    buffer = BufferEscritura("prueba", SQL_INSERTAR_AUDITORIA, tamano_lote=100, intervalo=60, maximo_pendientes=3)
+    resultados = [buffer.agregar(_fila(i)) for i in range(5)]
+
+    assert resultados == [True, True, True, False, False]
+    assert buffer.estadisticas()["descartadas"] == 2
+
+
+def test_lote_fallido_se_reintenta_y_luego_se_cuenta_como_perdido(engine, monkeypatch):
+    buffer = BufferEscritura("prueba", SQL_INSERTAR_AUDITORIA, tamano_lote=10, intervalo=60)
+    buffer.agregar(_fila(1))
+    monkeypatch.setattr(escritura_diferida, "engine", create_engine("sqlite://"))  # sin la tabla auditoria
+
+    buffer.vaciar()
+    assert buffer.estadisticas()["perdidas"] == 0  # queda para reintentar
+
+    monkeypatch.setattr(escritura_diferida, "engine", engine)
+    buffer.vaciar()
+    assert _contar(engine) == 1
+
+    monkeypatch.setattr(escritura_diferida, "engine", create_engine("sqlite://"))
+    buffer.agregar(_fila(2))
+    for _ in range(escritura_diferida.REINTENTOS_LOTE):
+        buffer.vaciar()
+    assert buffer.estadisticas()["perdidas"] == 1
+
+
+def test_al_salir_del_proceso_se_escribe_lo_encolado(tmp_path):
+    ruta = tmp_path / "salida.db"
+    _crear_tabla(ruta).dispose()
+
+    subprocess.run([sys.executable, "-c", HIJO, str(ruta), "1000"], cwd=RAIZ, check=True, timeout=60,
+                   env={**os.environ, "LOG_LEVEL": "ERROR"})
+
+    assert _contar(create_engine(f"sqlite:///{ruta}")) == 1000
@@ -0,0 +1,83 @@
+# tests/test_etag.py
+
+import pytest
+from flask import Flask, Response, jsonify
+
+import cache
+from routes import etag_middleware
+from routes.etag_middleware import con_etag
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(cache, "_versiones", cache.VersionesCompartidas())
+    datos = {"productos": [{"id_producto": 1, "nombre": "Proteina"}], "llamadas": 0}
+    app = Flask(__name__)
+
+    @app.route("/productos")
+    @con_etag("productos")
+    def productos():
+        datos["llamadas"] += 1
+        return jsonify(datos["productos"]), 200
+
+    @app.route("/stream")
+    @con_etag("productos")
+    def stream():
+        return Response(iter([b"[", b"]"]), mimetype="application/json"), 200
+
+    @app.route("/ahora")
+    @con_etag("clases", excepto=lambda: True)
+    def ahora():
+        respuesta = jsonify([])
+        respuesta.headers["Cache-Control"] = "no-store"
+        return respuesta, 200
+
+    cliente = app.test_client()
+    cliente.datos = datos
+    return cliente
+
+
+def test_responde_304_sin_ejecutar_la_ruta(cliente):
+    primera = cliente.get("/productos")
+    etag = primera.headers["ETag"]
+    assert primera.status_code == 200
+    assert etag.strip('"') == etag_middleware.calcular_etag("productos")
+
+    segunda = cliente.get("/productos", headers={"If-None-Match": etag})
+    assert segunda.status_code == 304
+    assert segunda.headers["ETag"] == etag
+    assert cliente.datos["llamadas"] == 1
+
+
+def test_una_escritura_cambia_el_etag(cliente):
+    etag = cliente.get("/productos").headers["ETag"]
+
+    cliente.datos["productos"].append({"id_producto": 2, "nombre": "Creatina"})
+    cache.incrementar_version("productos")
+    respuesta = cliente.get("/productos", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
+    assert len(respuesta.get_json()) == 2
+
+
+def test_el_etag_no_cambia_con_la_ventana_de_ttl(cliente, monkeypatch):
+    etag = cliente.get("/productos").headers["ETag"]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: 10 ** 9)
+    assert cliente.get("/productos", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_otro_arranque_no_acepta_el_etag(cliente, monkeypatch):
+    etag = cliente.get("/productos").headers["ETag"]
+    monkeypatch.setattr(etag_middleware, "EPOCA_ARRANQUE", "otra")
+    assert cliente.get("/productos", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_streaming_lleva_etag(cliente):
+    respuesta = cliente.get("/stream")
+    assert respuesta.headers["ETag"].strip('"') == etag_middleware.calcular_etag("productos")
+
+
+def test_sin_etag_en_las_solicitudes_excluidas(cliente):
+    respuesta = cliente.get("/ahora", headers={"If-None-Match": "*"})
+    assert respuesta.status_code == 200
+    assert "ETag" not in respuesta.headers
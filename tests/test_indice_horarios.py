@@ -0,0 +1,94 @@
+# tests/test_indice_horarios.py
+
+import random
+from datetime import time as dt_time, timedelta
+
+import pytest
+
+import cache
+import indice_horarios
+from indice_horarios import IndiceHorarios, MINUTOS_DIA, a_minutos
+
+
+def _clase(id_clase, horario, duracion):
+    return {"id_clase": id_clase, "horario": horario, "duracion": duracion}
+
+
+def _solapa(clase, desde, hasta):
+    """Referencia lineal: minutos del dia ocupados por la clase contra los del rango pedido."""
+    inicio = a_minutos(clase["horario"])
+    ocupados = {(inicio + m) % MINUTOS_DIA for m in range(min(clase["duracion"], MINUTOS_DIA))}
+    if desde == hasta:
+        pedidos = {desde}
+    elif desde < hasta:
+        pedidos = set(range(desde, hasta))
+    else:
+        pedidos = set(range(desde, MINUTOS_DIA)) | set(range(0, hasta))
+    return bool(ocupados & pedidos)
+
+
+def test_a_minutos_acepta_time_timedelta_y_texto():
+    assert a_minutos(dt_time(7, 30)) == 450
+    assert a_minutos(timedelta(hours=23, minutes=15)) == 1395
+    assert a_minutos("06:05:00") == 365
+    with pytest.raises(ValueError):
+        a_minutos("25:00")
+
+
+def test_consultar_coincide_con_el_filtro_lineal():
+    azar = random.Random(17)
+    clases = [_clase(i, timedelta(minutes=azar.randrange(MINUTOS_DIA)), azar.choice([30, 45, 60, 90, 120]))
+              for i in range(1, 200)]
+    indice = IndiceHorarios()
+    indice.construir(clases)
+
+    rangos = [(azar.randrange(MINUTOS_DIA), azar.randrange(MINUTOS_DIA)) for _ in range(60)]
+    for desde, hasta in rangos + [(1320, 120), (0, MINUTOS_DIA), (600, 600)]:
+        esperados = {c["id_clase"] for c in clases if _solapa(c, desde, hasta)}
+        assert {c["id_clase"] for c in indice.consultar(desde, hasta)} == esperados, (desde, hasta)
+
+
+def test_clase_que_cruza_la_medianoche_aparece_una_vez_y_en_orden():
+    indice = IndiceHorarios()
+    indice.construir([_clase(1, "23:30", 60), _clase(2, "00:15", 30), _clase(3, "22:00", 45), _clase(4, "12:00", 60)])
+
+    assert [c["id_clase"] for c in indice.consultar(a_minutos("23:00"), a_minutos("01:00"))] == [1, 2]
+    assert [c["id_clase"] for c in indice.consultar(a_minutos("00:20"), a_minutos("00:20"))] == [1, 2]
+    assert [c["id_clase"] for c in indice.consultar(a_minutos("22:30"), a_minutos("23:45"))] == [3, 1]
+
+
+def test_reconstruye_solo_cuando_cambia_la_version_o_vence_el_ttl(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: ahora[0])
+    monkeypatch.setattr(indice_horarios.time, "monotonic", lambda: ahora[0])
+    monkeypatch.setattr(cache, "_versiones", cache.VersionesCompartidas())
+    monkeypatch.setattr(indice_horarios, "INDICE_HORARIOS_TTL", 300)
+    cargas = []
+
+    def cargar():
+        cargas.append(ahora[0])
+        return [_clase(1, "07:00", 60)]
+
+    indice = IndiceHorarios()
+    indice.actualizar_si_cambio(cargar)
+    ahora[0] += 60  # cambia la ventana de TTL del cache, pero no hubo escrituras
+    indice.actualizar_si_cambio(cargar)
+    assert len(cargas) == 1
+
+    cache.incrementar_version("clases")
+    indice.actualizar_si_cambio(cargar)
+    assert len(cargas) == 2
+
+    ahora[0] += 300  # escrituras hechas fuera de la app: reconstruccion periodica
+    indice.actualizar_si_cambio(cargar)
+    assert len(cargas) == 3
+
+
+def test_no_reemplaza_el_indice_si_la_carga_falla(monkeypatch):
+    monkeypatch.setattr(cache, "_versiones", cache.VersionesCompartidas())
+    indice = IndiceHorarios()
+    indice.actualizar_si_cambio(lambda: [_clase(1, "07:00", 60)])
+    cache.incrementar_version("clases")
+
+    assert indice.actualizar_si_cambio(lambda: {"error": "sin DB"}) == {"error": "sin DB"}
+    assert [c["id_clase"] for c in indice.consultar(420, 421)] == [1]
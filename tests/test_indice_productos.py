@@ -0,0 +1,151 @@
+# tests/test_indice_productos.py
+
+import threading
+
+import pytest
+
+import cache
+import indice_productos as modulo
+from indice_productos import IndiceProductos
+
+
+def _producto(id_producto, nombre, descripcion="", stock=10):
+    return {"id_producto": id_producto, "nombre": nombre, "descripcion": descripcion, "stock": stock}
+
+
+class CatalogoFalso:
+    """Tabla productos en memoria: cargar_desde_id(id) devuelve los productos con id mayor, en orden."""
+
+    def __init__(self, productos):
+        self.productos = {p["id_producto"]: p for p in productos}
+        self.despues_de_leer = None
+
+    def cargar_desde_id(self, id_producto):
+        filas = [p for i, p in sorted(self.productos.items()) if i > id_producto]
+        if self.despues_de_leer is not None:
+            self.despues_de_leer(id_producto)
+        return filas
+
+
+@pytest.fixture(autouse=True)
+def versiones_limpias(monkeypatch):
+    monkeypatch.setattr(cache, "_versiones", cache.VersionesCompartidas())
+    monkeypatch.setattr(cache, "_escrituras_propias", {})
+
+
+@pytest.fixture
+def catalogo():
+    return CatalogoFalso([_producto(i, f"Producto {i}") for i in range(1, 101)])
+
+
+def _ids(indice, consulta, limite=20):
+    return [p["id_producto"] for p in indice.buscar(consulta, limite)]
+
+
+def test_busca_sin_tildes_por_prefijo_y_primero_por_nombre():
+    indice = IndiceProductos()
+    indice.construir([
+        _producto(1, "Proteína Whey", "Sabor chocolate"),
+        _producto(2, "Shaker", "Ideal para proteina en polvo"),
+        _producto(3, "Barra proteica"),
+    ])
+    assert _ids(indice, "PROTEINA") == [1, 2]
+    assert _ids(indice, "prote") == [3, 1, 2]
+    assert _ids(indice, "proteina choc") == [1]
+    assert _ids(indice, "de la") == []
+
+
+def test_alta_pendiente_no_se_pierde_tras_una_escritura_con_id_mayor(catalogo):
+    indice = IndiceProductos()
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+
+    # Alta por procedimiento (id 101, solo se marca) y luego alta por el ORM (id 102, se indexa en el momento)
+    catalogo.productos[101] = _producto(101, "Mancuerna hexagonal")
+    indice.registrar_altas()
+    catalogo.productos[102] = _producto(102, "Mancuerna ajustable")
+    indice.actualizar_producto(catalogo.productos[102])
+
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+    assert sorted(_ids(indice, "mancuerna")) == [101, 102]
+
+
+def test_actualizar_y_eliminar_no_mueven_max_id(catalogo):
+    indice = IndiceProductos()
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+    indice.actualizar_producto(_producto(500, "Producto importado"))
+    assert indice._max_id == 100
+
+    indice.eliminar_producto(500)
+    indice.actualizar_stock({1: 0})
+    assert _ids(indice, "importado") == []
+    assert indice.buscar("producto 1", 1)[0]["stock"] == 0
+
+
+def test_escrituras_durante_una_reconstruccion_no_se_pierden(catalogo, monkeypatch):
+    indice = IndiceProductos()
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+
+    leyendo, continuar = threading.Event(), threading.Event()
+
+    def pausar_lectura_completa(id_producto):
+        if id_producto == 0:
+            leyendo.set()
+            assert continuar.wait(5)
+
+    # La reconstruccion lee la DB antes de las escrituras locales siguientes
+    catalogo.despues_de_leer = pausar_lectura_completa
+    monkeypatch.setattr(modulo, "INDICE_PRODUCTOS_TTL", 0)
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+    assert leyendo.wait(5)
+    catalogo.despues_de_leer = None
+
+    catalogo.productos[5] = _producto(5, "Bicicleta fija")
+    indice.actualizar_producto(catalogo.productos[5])
+    del catalogo.productos[6]
+    indice.eliminar_producto(6)
+    indice.actualizar_stock({7: 0})
+    catalogo.productos[101] = _producto(101, "Colchoneta")
+    indice.registrar_altas()
+
+    continuar.set()
+    for _ in range(100):
+        if not indice._reconstruyendo:
+            break
+        threading.Event().wait(0.01)
+    assert not indice._reconstruyendo
+
+    assert _ids(indice, "bicicleta") == [5]
+    assert 6 not in _ids(indice, "producto", 200)
+    assert indice.buscar("producto 7", 1)[0]["stock"] == 0
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+    assert _ids(indice, "colchoneta") == [101]
+
+
+def _esperar_reconstruccion(indice):
+    for _ in range(100):
+        if not indice._reconstruyendo:
+            break
+        threading.Event().wait(0.01)
+    assert not indice._reconstruyendo
+
+
+def test_escritura_de_otro_worker_reconstruye_el_indice(catalogo):
+    indice = IndiceProductos()
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+
+    # Escritura propia: se aplica en el momento y no hace falta reconstruir
+    catalogo.productos[3] = _producto(3, "Banco plano")
+    indice.actualizar_producto(catalogo.productos[3])
+    cache.incrementar_version("productos")
+    assert indice.al_dia
+
+    # Otro worker renombra un producto: solo se entera por la version compartida
+    catalogo.productos[4] = _producto(4, "Rueda abdominal")
+    cache._versiones.incrementar("productos")
+    assert not indice.al_dia
+
+    indice.asegurar_actualizado(catalogo.cargar_desde_id)
+    _esperar_reconstruccion(indice)
+    assert indice.al_dia
+    assert _ids(indice, "rueda") == [4]
+    assert _ids(indice, "banco") == [3]
@@ -0,0 +1,18 @@
+# tests/test_paginacion.py
+
+import pytest
+
+from utils import parsear_parametros_paginacion
+
+
+def test_lee_los_precios_como_decimal():
+    parametros = parsear_parametros_paginacion({"precio_min": "10.5", "precio_max": "20"})
+    assert (str(parametros["precio_min"]), str(parametros["precio_max"])) == ("10.5", "20")
+
+
+@pytest.mark.parametrize("valor", ["NaN", "nan", "sNaN", "Infinity", "inf", "-inf"])
+def test_rechaza_precios_no_finitos(valor):
+    with pytest.raises(ValueError):
+        parsear_parametros_paginacion({"precio_min": valor})
+    with pytest.raises(ValueError):
+        parsear_parametros_paginacion({"precio_max": valor})
@@ -0,0 +1,38 @@
+# tests/test_proveedor_json.py
+
+import importlib
+import sys
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import proveedor_json
+
+FILA = {
+    "precio": Decimal("19.90"), "fecha_hora": datetime(2024, 5, 1, 10, 30), "fecha": date(2024, 5, 1),
+    "horario": time(7, 0), "duracion": timedelta(hours=1, minutes=30), "nombre": "Spinning", "id_clase": 3,
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def modulo(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setitem(sys.modules, "orjson", None)  # import orjson -> ImportError
+        yield importlib.reload(proveedor_json)
+        monkeypatch.undo()
+        importlib.reload(proveedor_json)
+    else:
+        if proveedor_json.orjson is None:
+            pytest.skip("orjson no esta instalado")
+        yield proveedor_json
+
+
+def test_misma_salida_que_el_proveedor_de_flask(modulo):
+    # El proveedor de Flask no sabe codificar time/timedelta: los handlers los enviaban con str()
+    esperado = DefaultJSONProvider(Flask(__name__)).dumps(
+        {**FILA, "horario": "07:00:00", "duracion": "1:30:00"}, separators=(",", ":"))
+    assert modulo.a_json_bytes(FILA).decode("utf-8") == esperado
+    assert modulo.desde_json(modulo.a_json_bytes([FILA]))[0]["fecha"] == "Wed, 01 May 2024 00:00:00 GMT"
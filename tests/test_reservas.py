@@ -0,0 +1,95 @@
+# tests/test_reservas.py
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from handlers import reserva_handlers
+
+CUPO = 5
+FECHA = date.today() + timedelta(days=1)
+
+
+@pytest.fixture
+def engine(engine_sqlite, monkeypatch):
+    with engine_sqlite.begin() as conn:
+        conn.execute(text("INSERT INTO clases (id_clase, nombre, instructor, duracion, cupo_maximo) "
+                          "VALUES (1, 'Spinning', 'Ana', 45, :cupo)"), {"cupo": CUPO})
+    monkeypatch.setattr(reserva_handlers, "engine", engine_sqlite)
+    return engine_sqlite
+
+
+def _contar(engine):
+    with engine.connect() as conn:
+        reservas = conn.execute(text("SELECT COUNT(*) FROM reservas_clases")).scalar()
+        reservados = conn.execute(text("SELECT reservados FROM ocupacion_clases WHERE id_clase = 1")).scalar()
+    return reservas, reservados
+
+
+def test_reservas_concurrentes_no_sobrevenden(engine):
+    with ThreadPoolExecutor(8) as pool:
+        resultados = list(pool.map(lambda i: reserva_handlers.reservar_clase(1, f"socio-{i}", FECHA), range(40)))
+
+    motivos = Counter(r.get("motivo", "confirmada") for r in resultados)
+    assert motivos == {"confirmada": CUPO, "clase_llena": 40 - CUPO}
+    assert _contar(engine) == (CUPO, CUPO)
+
+
+def test_reserva_duplicada_no_consume_cupo(engine):
+    assert reserva_handlers.reservar_clase(1, "socio-1", FECHA)["reservados"] == 1
+    assert reserva_handlers.reservar_clase(1, "socio-1", FECHA)["motivo"] == "duplicada"
+    assert _contar(engine) == (1, 1)
+
+
+def test_cancelar_libera_el_cupo(engine):
+    for i in range(CUPO):
+        reserva_handlers.reservar_clase(1, f"socio-{i}", FECHA)
+    assert reserva_handlers.reservar_clase(1, "socio-extra", FECHA)["motivo"] == "clase_llena"
+
+    assert "error" not in reserva_handlers.cancelar_reserva(1, "socio-0", FECHA)
+    assert reserva_handlers.reservar_clase(1, "socio-extra", FECHA)["disponibles"] == 0
+    assert _contar(engine) == (CUPO, CUPO)
+
+
+def test_clase_inexistente(engine):
+    assert reserva_handlers.reservar_clase(99, "socio-1", FECHA)["motivo"] == "no_encontrada"
+
+
+class _ErrorMySQL(Exception):
+    def __init__(self, errno: int):
+        super().__init__(errno, "simulado")
+        self.errno = errno
+
+
+def _fallar_una_vez(engine, prefijo: str, errno: int) -> list:
+    """Hace fallar la primera sentencia que empieza con prefijo como lo haria MySQL con ese errno."""
+    fallos = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def provocar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.startswith(prefijo) and not fallos:
+            fallos.append(sentencia)
+            raise OperationalError(sentencia, parametros, _ErrorMySQL(errno))
+
+    return fallos
+
+
+def test_reintenta_la_transaccion_abortada_por_deadlock(engine, monkeypatch):
+    monkeypatch.setattr(reserva_handlers, "ESPERA_REINTENTO_SEGUNDOS", 0)
+    fallos = _fallar_una_vez(engine, "INSERT INTO reservas_clases", 1213)
+
+    assert reserva_handlers.reservar_clase(1, "socio-1", FECHA)["reservados"] == 1
+    assert len(fallos) == 1
+    assert _contar(engine) == (1, 1)  # el cupo tomado en el intento abortado se revirtio
+
+
+def test_no_reintenta_otros_errores_y_el_contador_queda_creado(engine):
+    _fallar_una_vez(engine, "INSERT INTO reservas_clases", 1146)
+
+    assert "error" in reserva_handlers.reservar_clase(1, "socio-1", FECHA)
+    # El contador se confirmo en su propia transaccion, antes de la de la reserva
+    assert _contar(engine) == (0, 0)
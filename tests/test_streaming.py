@@ -0,0 +1,58 @@
+# tests/test_streaming.py
+
+import json
+
+import pytest
+from flask import Flask, Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+import database
+from utils import flujo_filas_sp, generar_json_array
+
+SQL_PRODUCTOS = text("SELECT id_producto, nombre FROM productos ORDER BY id_producto")
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalogo.db'}", poolclass=QueuePool, pool_size=2, max_overflow=0)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE productos (id_producto INTEGER PRIMARY KEY, nombre VARCHAR(255))"))
+        conn.execute(text("INSERT INTO productos (nombre) VALUES (:nombre)"),
+                     [{"nombre": f"Producto {i}"} for i in range(25)])
+    monkeypatch.setattr(database, "engine_streaming", engine)
+    yield engine
+    engine.dispose()
+
+
+def test_lee_todas_las_filas_por_lotes_y_libera_la_conexion(engine):
+    flujo = flujo_filas_sp(SQL_PRODUCTOS, tamano_lote=10)
+    assert engine.pool.checkedout() == 1
+    filas = list(flujo)
+    assert [f["id_producto"] for f in filas] == list(range(1, 26))
+    assert engine.pool.checkedout() == 0
+
+
+def test_close_sin_iterar_libera_la_conexion(engine):
+    flujo = flujo_filas_sp(SQL_PRODUCTOS)
+    flujo.close()
+    flujo.close()
+    assert engine.pool.checkedout() == 0
+
+
+@pytest.mark.parametrize("metodo", ["GET", "HEAD"])
+def test_la_respuesta_libera_la_conexion(engine, metodo):
+    app = Flask(__name__)
+
+    @app.route("/productos", methods=["GET", "HEAD"])
+    def productos():
+        flujo = flujo_filas_sp(SQL_PRODUCTOS, tamano_lote=10)
+        respuesta = Response(generar_json_array(flujo), mimetype="application/json")
+        respuesta.call_on_close(flujo.close)
+        return respuesta
+
+    respuesta = app.test_client().open("/productos", method=metodo)
+    if metodo == "GET":
+        assert len(json.loads(respuesta.get_data())) == 25
+    respuesta.close()
+    assert engine.pool.checkedout() == 0
@@ -1,29 +1,136 @@
 # utils.py
 
-from sqlalchemy.orm import Session
-from sqlalchemy import text # Importa text para ejecutar SQL plano
+import logging
+import re
+import threading
+import time
+import unicodedata
+from typing import TYPE_CHECKING
+from sqlalchemy import text, bindparam # Importa text para ejecutar SQL plano
+from decimal import Decimal
 
-def ejecutar_stored_procedure(db: Session, sp_name: str, params: list = None):
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session # Solo para las anotaciones: sqlalchemy.orm es lento de importar
+
+from proveedor_json import a_json_bytes
+
+logger = logging.getLogger(__name__)
+
+
+# --- Capa unica de ejecucion de procedimientos almacenados ---
+# Todos los handlers llaman a los SP a traves de ejecutar_sp(), que:
+#   - reutiliza el mismo text("CALL ...") por procedimiento (no se reconstruye en cada llamada),
+#   - convierte las filas a dict usando una sola tupla de columnas por resultado,
+#   - entrega los valores tal cual (Decimal, TIME, DATETIME): los codifica el proveedor JSON de la app,
+#   - acumula tiempos por procedimiento (ver estadisticas_sp()).
+_sentencias_sp = {}  # (sp_name, nombres de parametros) -> TextClause
+_tiempos_sp = {}     # sp_name -> [llamadas, errores, segundos_totales, segundos_max]
+_lock_tiempos = threading.Lock()
+
+
+def sentencia_sp(sp_name: str, nombres_param: tuple = ()):
+    """Devuelve (y cachea) el text() de 'CALL sp_name(:p1, :p2, ...)' para esos parametros."""
+    clave = (sp_name, nombres_param)
+    sentencia = _sentencias_sp.get(clave)
+    if sentencia is None:
+        placeholders = ", ".join(f":{nombre}" for nombre in nombres_param)
+        sentencia = text(f"CALL {sp_name}({placeholders})")
+        _sentencias_sp[clave] = sentencia
+    return sentencia
+
+
+def mapear_filas(column_keys: tuple, filas) -> list:
+    """
+    Convierte filas en diccionarios usando una sola tupla de columnas. No convierte tipos:
+    Decimal, time/timedelta y datetime los serializa proveedor_json al responder.
+    """
+    return [dict(zip(column_keys, fila)) for fila in filas]
+
+
+def _registrar_tiempo(sp_name: str, segundos: float, error: bool):
+    with _lock_tiempos:
+        tiempos = _tiempos_sp.get(sp_name)
+        if tiempos is None:
+            tiempos = _tiempos_sp[sp_name] = [0, 0, 0.0, 0.0]
+        tiempos[0] += 1
+        tiempos[1] += 1 if error else 0
+        tiempos[2] += segundos
+        if segundos > tiempos[3]:
+            tiempos[3] = segundos
+
+
+def ejecutar_sp(sp_name: str, parametros: dict = None, resultado: str = "ninguno", commit: bool = False):
+    """
+    Ejecuta un procedimiento almacenado con su propia conexion del pool.
+      resultado="ninguno" -> None (INSERT/UPDATE/DELETE)
+      resultado="uno"     -> dict de la primera fila o None
+      resultado="todos"   -> lista de dicts
+    Con commit=True confirma la transaccion; si algo falla hace rollback y relanza la excepcion
+    (los handlers la capturan para armar su mensaje de error).
+    """
+    # Importado aqui para que utils no dependa de la configuracion del engine al importarse
+    from database import engine
+
+    parametros = parametros or {}
+    sql_call = sentencia_sp(sp_name, tuple(parametros))
+    inicio = time.perf_counter()
+    error = False
+    conn = engine.connect()
+    try:
+        with conn.execute(sql_call, parametros) as cursor:
+            if resultado == "todos":
+                salida = mapear_filas(tuple(cursor.keys()), cursor.fetchall())
+            elif resultado == "uno":
+                fila = cursor.fetchone()
+                salida = mapear_filas(tuple(cursor.keys()), [fila])[0] if fila else None
+            else:
+                salida = None
+        if commit:
+            conn.commit()
+        return salida
+    except Exception:
+        error = True
+        if commit:
+            conn.rollback()
+        raise
+    finally:
+        try:
+            conn.close()
+        except Exception as e_close:
+            logger.warning(f"Error al cerrar conexion ({sp_name}): {e_close}")
+        _registrar_tiempo(sp_name, time.perf_counter() - inicio, error)
+
+
+def estadisticas_sp() -> dict:
+    """Llamadas, errores y tiempos (ms) acumulados por procedimiento almacenado."""
+    with _lock_tiempos:
+        return {
+            sp_name: {
+                "llamadas": llamadas,
+                "errores": errores,
+                "total_ms": round(total * 1000, 3),
+                "promedio_ms": round(total * 1000 / llamadas, 3) if llamadas else 0.0,
+                "max_ms": round(maximo * 1000, 3),
+            }
+            for sp_name, (llamadas, errores, total, maximo) in sorted(_tiempos_sp.items())
+        }
+
+
+def ejecutar_stored_procedure(db: "Session", sp_name: str, params: list = None):
     """
     Ejecuta un procedimiento almacenado que NO ESPERA resultados (INSERT, UPDATE, DELETE).
     """
     if params is None:
         params = []
 
-    # Construye la llamada al procedimiento almacenado con placeholders para los parametros
-    param_placeholders = ','.join([':param' + str(i) for i in range(len(params))])
-    
-    # Crea un diccionario de parametros para pasar a text()
+    # Crea un diccionario de parametros para pasar a text() (el CALL se reutiliza via sentencia_sp)
     param_dict = {f'param{i}': param for i, param in enumerate(params)}
 
-    # Construye la llamada SQL completa
-    sql_call = text(f"CALL {sp_name}({param_placeholders})")
-
     # Ejecuta el procedimiento almacenado
-    db.execute(sql_call, param_dict)
+    db.execute(sentencia_sp(sp_name, tuple(param_dict)), param_dict)
 
 
-def ejecutar_stored_procedure_for_select(db: Session, sp_name: str, params: list = None):
+def ejecutar_stored_procedure_for_select(db: "Session", sp_name: str, params: list = None):
     """
     Ejecuta un procedimiento almacenado que ESPERA resultados (SELECT).
     Retorna un objeto que puede ser usado con .fetchone() o .fetchall().
@@ -31,14 +138,216 @@ def ejecutar_stored_procedure_for_select(db: Session, sp_name: str, params: list
     if params is None:
         params = []
 
-    # Construye la llamada al procedimiento almacenado con placeholders para los parametros
-    param_placeholders = ','.join([':param' + str(i) for i in range(len(params))])
-    
-    # Crea un diccionario de parametros para pasar a text()
+    # Crea un diccionario de parametros para pasar a text() (el CALL se reutiliza via sentencia_sp)
     param_dict = {f'param{i}': param for i, param in enumerate(params)}
 
-    # Construye la llamada SQL completa
-    sql_call = text(f"CALL {sp_name}({param_placeholders})")
-
     # Ejecuta el procedimiento almacenado y retorna el resultado
-    return db.execute(sql_call, param_dict)
+    return db.execute(sentencia_sp(sp_name, tuple(param_dict)), param_dict)
+
+
+# --- Paginacion por cursor (keyset) y filtros del listado de productos ---
+# Columnas que el cliente puede pedir con ?fields= (lista blanca: nunca se interpola otra cosa en el SQL)
+CAMPOS_PRODUCTO = ("id_producto", "nombre", "descripcion", "precio", "stock", "imagen_url")
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+PARAMETROS_PAGINACION = ("limit", "after_id", "fields", "precio_min", "precio_max", "en_stock")
+
+
+def usa_paginacion(args) -> bool:
+    """True si la solicitud pide paginacion, proyeccion o filtros (sin ellos se conserva el listado completo)."""
+    return any(nombre in args for nombre in PARAMETROS_PAGINACION)
+
+
+def parsear_parametros_paginacion(args) -> dict:
+    """
+    Lee ?limit=&after_id=&fields=&precio_min=&precio_max=&en_stock= de la query string.
+    Lanza ValueError con un mensaje para el cliente si algun valor no es valido.
+    """
+    try:
+        limite = int(args.get("limit", LIMITE_POR_DEFECTO))
+        despues_de_id = int(args["after_id"]) if args.get("after_id") else None
+        precio_min = Decimal(args["precio_min"]) if args.get("precio_min") else None
+        precio_max = Decimal(args["precio_max"]) if args.get("precio_max") else None
+    except (ValueError, ArithmeticError):
+        raise ValueError("limit, after_id, precio_min y precio_max deben ser numeros validos.")
+    # Decimal acepta "NaN", "Infinity" y "-inf": compararlos con precio en SQL termina en un 500
+    if any(precio is not None and not precio.is_finite() for precio in (precio_min, precio_max)):
+        raise ValueError("precio_min y precio_max deben ser numeros finitos.")
+
+    if limite < 1 or limite > LIMITE_MAXIMO:
+        raise ValueError(f"limit debe estar entre 1 y {LIMITE_MAXIMO}.")
+
+    campos = None
+    if args.get("fields"):
+        campos = [c.strip() for c in args["fields"].split(",") if c.strip()]
+        invalidos = [c for c in campos if c not in CAMPOS_PRODUCTO]
+        if invalidos:
+            raise ValueError(f"Campos no validos en fields: {', '.join(invalidos)}.")
+
+    return {
+        "limite": limite,
+        "despues_de_id": despues_de_id,
+        "campos": campos,
+        "precio_min": precio_min,
+        "precio_max": precio_max,
+        "solo_con_stock": args.get("en_stock", "").lower() in ("1", "true", "si"),
+    }
+
+
+# --- Lectura por lotes (streaming) de procedimientos que devuelven muchas filas ---
+TAMANO_LOTE_STREAMING = 500
+
+
+class FlujoFilas:
+    """
+    Iterador de diccionarios leidos con fetchmany() de un resultado abierto.
+    close() devuelve la conexion al pool aunque la iteracion nunca haya empezado: las rutas lo
+    registran con Response.call_on_close, que Werkzeug llama al terminar la respuesta tambien si
+    el cliente se desconecto antes del primer fragmento o si la solicitud era HEAD.
+    """
+
+    def __init__(self, conn, resultado, tamano_lote: int):
+        self._conn = conn
+        self._resultado = resultado
+        self._tamano_lote = tamano_lote
+        self._filas = self._generar()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._filas)
+
+    def _generar(self):
+        column_keys = tuple(self._resultado.keys())
+        while True:
+            filas = self._resultado.fetchmany(self._tamano_lote)
+            if not filas:
+                break
+            yield from mapear_filas(column_keys, filas)
+        self.close()
+
+    def close(self):
+        """Cierra el resultado y devuelve la conexion al pool (se puede llamar mas de una vez)."""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            self._resultado.close()
+        finally:
+            conn.close()
+
+
+def flujo_filas_sp(sql_call, parametros: dict = None, tamano_lote: int = TAMANO_LOTE_STREAMING) -> FlujoFilas:
+    """
+    Ejecuta sql_call en el engine de streaming y devuelve un FlujoFilas que entrega diccionarios
+    leidos con fetchmany() de un cursor del lado del servidor.
+    La consulta se ejecuta aqui mismo (los errores de DB se lanzan antes de empezar a responder);
+    la conexion se cierra al agotar el flujo o al llamar a su close().
+    """
+    # Importado aqui para que utils no dependa de la configuracion del engine al importarse
+    from database import engine_streaming
+
+    conn = engine_streaming.connect()
+    try:
+        # Con pymysql stream_results abre un SSCursor: MySQL envia las filas a medida que fetchmany()
+        # las pide y el proceso nunca tiene el resultado entero en memoria (ver database.py)
+        resultado = conn.execution_options(stream_results=True).execute(sql_call, parametros or {})
+    except Exception:
+        conn.close()
+        raise
+
+    return FlujoFilas(conn, resultado, tamano_lote)
+
+
+def generar_json_array(filas, tamano_lote: int = TAMANO_LOTE_STREAMING):
+    """Convierte un iterable de dicts en fragmentos (bytes) de un array JSON ('[', filas separadas por ',', ']')."""
+    yield b"["
+    primero = True
+    fragmento = []
+    for fila in filas:
+        fragmento.append(a_json_bytes(fila))
+        if len(fragmento) >= tamano_lote:
+            yield (b"" if primero else b",") + b",".join(fragmento)
+            primero = False
+            fragmento = []
+    if fragmento:
+        yield (b"" if primero else b",") + b",".join(fragmento)
+    yield b"]"
+
+
+# --- Consulta por lotes de ids (un solo IN (...) en lugar de una llamada por id) ---
+MAXIMO_IDS_POR_LOTE = 200
+
+
+def parsear_ids(cadena: str | None, maximo: int = MAXIMO_IDS_POR_LOTE) -> list:
+    """
+    Convierte '1,2,3' en [1, 2, 3] conservando el orden y quitando repetidos.
+    Lanza ValueError con un mensaje para el cliente si la lista no es valida.
+    """
+    if not cadena:
+        raise ValueError("El parametro ids es requerido (ej: ?ids=1,2,3).")
+    try:
+        ids = [int(parte) for parte in cadena.split(",") if parte.strip()]
+    except ValueError:
+        raise ValueError("ids debe ser una lista de enteros separados por comas.")
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError("El parametro ids es requerido (ej: ?ids=1,2,3).")
+    if len(ids) > maximo:
+        raise ValueError(f"Se permiten como maximo {maximo} ids por solicitud.")
+    return ids
+
+
+def sentencia_por_ids(tabla: str, columna_id: str, columnas: tuple):
+    """
+    SELECT columnas FROM tabla WHERE columna_id IN :p_ids (lista expandida al ejecutar).
+    `tabla`, `columna_id` y `columnas` son constantes del codigo, nunca datos del cliente.
+    """
+    return text(
+        f"SELECT {', '.join(columnas)} FROM {tabla} WHERE {columna_id} IN :p_ids"
+    ).bindparams(bindparam("p_ids", expanding=True))
+
+
+def ordenar_por_ids(columna_id: str, column_keys: tuple, filas, ids: list) -> dict:
+    """Arma {"items": [...en el orden de ids...], "faltantes": [...]} con las filas de sentencia_por_ids."""
+    por_id = {fila_dict[columna_id]: fila_dict for fila_dict in mapear_filas(column_keys, filas)}
+
+    return {
+        "items": [por_id[i] for i in ids if i in por_id],
+        "faltantes": [i for i in ids if i not in por_id],
+    }
+
+
+def consultar_por_ids(conn, tabla: str, columna_id: str, columnas: tuple, ids: list) -> dict:
+    """
+    Busca todas las filas de `ids` con un solo SELECT ... WHERE columna_id IN (...).
+    Devuelve {"items": [...en el orden de ids...], "faltantes": [ids no encontrados]}.
+    """
+    with conn.execute(sentencia_por_ids(tabla, columna_id, columnas), {"p_ids": ids}) as resultado:
+        column_keys = tuple(resultado.keys())
+        filas = resultado.fetchall()
+
+    return ordenar_por_ids(columna_id, column_keys, filas, ids)
+
+
+# --- Normalizacion de texto para busquedas (sin tildes ni mayusculas) ---
+_patron_palabras = re.compile(r"[a-z0-9]+")
+
+
+def normalizar_texto(texto: str | None) -> str:
+    """
+    Minusculas y sin diacriticos: 'Proteína Ñandú' -> 'proteina nandu'. Se descompone con NFKD y se
+    descarta todo lo que no es ASCII (las marcas de tilde y simbolos que de todos modos no se indexan).
+    """
+    if not texto:
+        return ""
+    texto = str(texto).casefold()
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+def palabras_normalizadas(texto: str | None) -> list:
+    """Palabras (letras y digitos) del texto, normalizado con normalizar_texto."""
+    return _patron_palabras.findall(normalizar_texto(texto))
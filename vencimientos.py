@@ -0,0 +1,166 @@
+# vencimientos.py
+
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, bindparam, DateTime
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# --- Vencimiento de suscripciones ---
+# En vez de recorrer todas las suscripciones una vez al dia, se mantiene en memoria un heap con las
+# activas que vencen dentro del horizonte (VENCIMIENTOS_HORIZONTE_MINUTOS), leidas en orden con el
+# indice (estado, fecha_vencimiento). Cada barrido saca del heap solo las que ya vencieron y las marca
+# 'vencida' con UPDATE ... WHERE id IN (...) por lotes. Cuando el reloj alcanza el horizonte se lee la
+# siguiente ventana. La memoria queda acotada por VENCIMIENTOS_MAXIMO_EN_MEMORIA: si en la ventana hay
+# mas, el horizonte se acorta hasta la ultima fila leida y el resto se lee en la siguiente recarga.
+#
+# El UPDATE vuelve a exigir estado = 'activa' y fecha_vencimiento <= ahora, asi que es idempotente:
+# una suscripcion cancelada o renovada despues de entrar al heap no se marca, y varios workers (o el
+# hilo y la ejecucion por linea de comandos) pueden barrer a la vez sin pisarse.
+VENCIMIENTOS_HORIZONTE_MINUTOS = int(os.getenv("VENCIMIENTOS_HORIZONTE_MINUTOS", "60"))
+VENCIMIENTOS_MAXIMO_EN_MEMORIA = int(os.getenv("VENCIMIENTOS_MAXIMO_EN_MEMORIA", "20000"))
+VENCIMIENTOS_INTERVALO_SEGUNDOS = int(os.getenv("VENCIMIENTOS_INTERVALO_SEGUNDOS", "60"))
+# Con 0 el hilo no arranca y los vencimientos se procesan solo con 'python -m vencimientos' (ej. un cron)
+VENCIMIENTOS_AUTOMATICOS = os.getenv("VENCIMIENTOS_AUTOMATICOS", "1").lower() in ("1", "true", "si")
+TAMANO_LOTE_VENCIMIENTOS = 1000
+
+SQL_PROXIMOS_VENCIMIENTOS = text(
+    "SELECT id_suscripcion, id_usuario, fecha_vencimiento FROM suscripciones "
+    "WHERE estado = 'activa' AND fecha_vencimiento < :p_limite "
+    "ORDER BY fecha_vencimiento LIMIT :p_maximo"
+).columns(fecha_vencimiento=DateTime)  # datetime tambien con drivers que la devuelven como texto
+SQL_MARCAR_VENCIDAS = text(
+    "UPDATE suscripciones SET estado = 'vencida' "
+    "WHERE id_suscripcion IN :p_ids AND estado = 'activa' AND fecha_vencimiento <= :p_ahora"
+).bindparams(bindparam("p_ids", expanding=True))
+
+
+class BarridoVencimientos:
+    """Heap de los proximos vencimientos y barrido por lotes, en un hilo de fondo por proceso."""
+
+    def __init__(self):
+        self._heap = []          # (fecha_vencimiento, id_suscripcion, id_usuario)
+        self._horizonte = None   # el heap tiene todas las activas que vencen antes de esta fecha
+        self._lock = threading.Lock()
+        self._lock_barrido = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self._oyentes = []
+        self._estadisticas = {"barridos": 0, "vencidas": 0, "recargas": 0, "errores": 0, "ultimo_barrido_ms": None}
+
+    def al_vencer(self, oyente):
+        """Registra oyente(ids_usuario) para enterarse de las suscripciones que se marcaron vencidas."""
+        self._oyentes.append(oyente)
+
+    def _recargar(self, ahora: datetime):
+        limite = ahora + timedelta(minutes=VENCIMIENTOS_HORIZONTE_MINUTOS)
+        with engine.connect() as conn:
+            filas = conn.execute(SQL_PROXIMOS_VENCIMIENTOS, {
+                "p_limite": limite, "p_maximo": VENCIMIENTOS_MAXIMO_EN_MEMORIA,
+            }).all()
+        # Las filas llegan ordenadas por vencimiento: la lista ya cumple la propiedad de heap
+        heap = [(fila.fecha_vencimiento, fila.id_suscripcion, fila.id_usuario) for fila in filas]
+        if len(heap) >= VENCIMIENTOS_MAXIMO_EN_MEMORIA:
+            # Ventana recortada: solo esta completa hasta la ultima fila leida
+            limite = heap[-1][0]
+        with self._lock:
+            self._heap = heap
+            self._horizonte = limite
+        self._estadisticas["recargas"] += 1
+
+    def registrar(self, id_suscripcion: int, id_usuario: str, fecha_vencimiento: datetime):
+        """La llaman los handlers tras crear una suscripcion; solo entra al heap si vence dentro del horizonte."""
+        with self._lock:
+            if self._horizonte is not None and fecha_vencimiento < self._horizonte:
+                heapq.heappush(self._heap, (fecha_vencimiento, id_suscripcion, id_usuario))
+
+    def barrer(self, ahora: datetime | None = None) -> int:
+        """Marca como vencidas las suscripciones activas cuyo vencimiento ya paso. Devuelve cuantas marco."""
+        with self._lock_barrido:
+            inicio = time.perf_counter()
+            ahora = ahora or datetime.now()
+            marcadas = 0
+            try:
+                while True:
+                    if self._horizonte is None or ahora >= self._horizonte:
+                        self._recargar(ahora)
+                    with self._lock:
+                        vencidas = []
+                        while self._heap and self._heap[0][0] <= ahora:
+                            vencidas.append(heapq.heappop(self._heap))
+                    for i in range(0, len(vencidas), TAMANO_LOTE_VENCIMIENTOS):
+                        lote = vencidas[i:i + TAMANO_LOTE_VENCIMIENTOS]
+                        with engine.begin() as conn:
+                            marcadas += conn.execute(SQL_MARCAR_VENCIDAS, {
+                                "p_ids": [id_suscripcion for _, id_suscripcion, _ in lote], "p_ahora": ahora,
+                            }).rowcount
+                        self._avisar({id_usuario for _, _, id_usuario in lote})
+                    # Si la ventana estaba recortada puede haber mas vencidas despues de las leidas
+                    if ahora < self._horizonte:
+                        break
+            except Exception as e:
+                self._estadisticas["errores"] += 1
+                self._horizonte = None  # las que quedaron sin marcar siguen activas: la proxima recarga las vuelve a leer
+                logger.error(f"Error al procesar vencimientos de suscripciones: {e}")
+            finally:
+                self._estadisticas["barridos"] += 1
+                self._estadisticas["vencidas"] += marcadas
+                self._estadisticas["ultimo_barrido_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+            if marcadas:
+                logger.info("Suscripciones vencidas en este barrido: %d", marcadas)
+            return marcadas
+
+    def _avisar(self, ids_usuario: set):
+        for oyente in self._oyentes:
+            try:
+                oyente(ids_usuario)
+            except Exception as e:
+                logger.warning(f"Error en oyente de vencimientos: {e}")
+
+    def _bucle(self):
+        while True:
+            self.barrer()
+            self._despertar.wait(VENCIMIENTOS_INTERVALO_SEGUNDOS)
+            self._despertar.clear()
+
+    def iniciar(self):
+        """Arranca (una vez por proceso) el hilo de barrido. Seguro de llamar despues de un fork."""
+        if not VENCIMIENTOS_AUTOMATICOS:
+            return
+        pid = os.getpid()
+        if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._hilo is not None and self._hilo.is_alive():
+                return
+            self._pid = pid
+            self._hilo = threading.Thread(target=self._bucle, name="barrido-vencimientos", daemon=True)
+            self._hilo.start()
+
+    def estadisticas(self) -> dict:
+        return {
+            **self._estadisticas,
+            "en_memoria": len(self._heap),
+            "horizonte": self._horizonte,
+            "proximo": self._heap[0][0] if self._heap else None,
+        }
+
+
+barrido_vencimientos = BarridoVencimientos()
+
+
+if __name__ == "__main__":
+    # Barrido unico, para ejecutarlo desde un cron con VENCIMIENTOS_AUTOMATICOS=0:
+    #   python -m vencimientos
+    from registro import configurar_logging
+
+    configurar_logging()
+    barrido_vencimientos.barrer()
+    logger.info("Barrido de vencimientos: %s", barrido_vencimientos.estadisticas())